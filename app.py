@@ -1,18 +1,115 @@
-from flask import Flask, request, jsonify
+import time
 
-from geo.factor_builder import build_factors
-from geo.arable_classifier import is_arable_land
-from engine.rule_engine import evaluate_rules
-from engine.erosion_risk_engine import compute_erosion_risk
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+
+from geo.aio import RUNTIME
+from geo.arable_classifier import landcover_catalog
+from geo.landcover_mask import get_landcover_mask
+from geo.http_client import http_metrics
+from geo.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    REQUEST_SECONDS,
+    begin_request,
+    request_stages,
+    server_timing,
+    stage
+)
+from geo.providers import PROVIDERS
+from geo.resilience import breaker_states
+from engine.pipeline import BATCH_MAX_ITEMS, analyze_batch, analyze_point, analyze_point_async
+from engine.region import (
+    RegionJob,
+    analyze_region,
+    parse_region,
+    to_geotiff,
+    to_npz,
+    to_rle_json
+)
+from engine.streaming import (
+    BATCH_STREAM_MAX_ITEMS,
+    NDJSON_MIMETYPE,
+    check_stream_size,
+    ndjson_lines,
+    parse_ndjson,
+    stream_batch,
+    stream_region
+)
+from engine.traffic import TRAFFIC
 
 RULES_FILE = "rules/icar_table_4_1_mechanical_measures.json"
 
 app = Flask(__name__)
 
+# Open and index the land cover tiles once per process
+# (the precomputed mask, when built, is mapped once and shared)
+try:
+    if get_landcover_mask() is None:
+        landcover_catalog()
+except Exception as e:
+    print("Land cover catalog unavailable:", e)
+
+
+def wants_stream():
+    """
+    NDJSON streaming is requested with ?stream=1 or Accept: application/x-ndjson.
+    """
+    if request.args.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def timed_json(body, status=200):
+    """
+    jsonify, timed as the "serialize" stage.
+    """
+    with stage("serialize"):
+        return jsonify(body), status
+
+
+@app.before_request
+def start_timing():
+    g.request_start = time.perf_counter()
+    begin_request()
+
+
+@app.after_request
+def finish_timing(response):
+    """
+    Per-stage timings go out as Server-Timing; the request as a whole
+    feeds the latency histogram (streamed bodies are timed up to their
+    first byte).
+    """
+    elapsed = time.perf_counter() - g.get("request_start", time.perf_counter())
+    stages = request_stages() + [("total", elapsed * 1000)]
+    response.headers["Server-Timing"] = server_timing(stages)
+
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, status=response.status_code)
+    return response
+
+
+def ndjson_response(records):
+    return Response(
+        stream_with_context(ndjson_lines(records)),
+        mimetype=NDJSON_MIMETYPE,
+        headers={"X-Accel-Buffering": "no"}
+    )
+
 
 @app.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "ok"}), 200
+    return jsonify({
+        "status": "ok",
+        "upstreams": breaker_states(),
+        "providers": PROVIDERS.describe(),
+        "http": http_metrics()
+    }), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
 
 
 @app.route("/analyze", methods=["POST"])
@@ -35,75 +132,202 @@ def analyze():
             "message": "lat, lon and land_use are required"
         }), 400
 
-    # -----------------------------
-    # Build factors (OBJECT)
-    # -----------------------------
-    factors = build_factors(
-        lat=lat,
-        lon=lon,
-        land_use=land_use
-    )
+    TRAFFIC.record("/analyze", data)
 
-    # -----------------------------
-    # Arability check (LOCKED)
-    # -----------------------------
-    is_arable, reason = is_arable_land(
-        lat=lat,
-        lon=lon,
-        slope_percent=factors.slope_percent
-    )
+    body = analyze_point(lat, lon, land_use, RULES_FILE)
+    return timed_json(body)
+
+
+@app.route("/analyze/async", methods=["POST"])
+async def analyze_async():
+    """
+    /analyze on the shared async runtime: upstream calls of all requests
+    are multiplexed on one event loop, and sensors still running at the
+    factor deadline are cancelled, aborting their upstream requests.
+
+    Flask runs each async view to completion in a worker thread, so a
+    client disconnect does not cancel the analysis.
+    """
+    data = request.get_json(silent=True)
+
+    if not data:
+        return jsonify({
+            "status": "ERROR",
+            "message": "Invalid or missing JSON payload"
+        }), 400
 
-    if not is_arable:
+    lat = data.get("lat")
+    lon = data.get("lon")
+    land_use = data.get("land_use")
+
+    if lat is None or lon is None or land_use is None:
         return jsonify({
-            "status": "NON_ARABLE",
-            "reason": reason,
-            "message": "System works only for arable agricultural land",
-            "input": {
-                "lat": lat,
-                "lon": lon,
-                "land_use": land_use
-            }
-        }), 200
-
-    # -----------------------------
-    # ICAR rules
-    # -----------------------------
-    mechanical_measures = evaluate_rules(
-    factors=factors,
-    rule_file=RULES_FILE
+            "status": "ERROR",
+            "message": "lat, lon and land_use are required"
+        }), 400
 
+    TRAFFIC.record("/analyze/async", data)
+
+    body = await RUNTIME.run_async(
+        analyze_point_async(lat, lon, land_use, RULES_FILE)
     )
+    return timed_json(body)
+
+
+def _record_batch(records):
+    TRAFFIC.record_many("/analyze/batch", records)
+
+
+@app.route("/analyze/batch", methods=["POST"])
+def analyze_batch_endpoint():
+    """
+    Body: {"items": [{"lat", "lon", "land_use"}, ...]} (or a bare list).
+    Results come back in input order with a per-item status.
+
+    Streaming (see wants_stream): one NDJSON line per item, then a
+    summary line; the body may itself be NDJSON (one record per line).
+    """
+    if request.mimetype == NDJSON_MIMETYPE:
+        records = parse_ndjson(request.stream)
+        return ndjson_response(stream_batch(
+            records, RULES_FILE, max_items=BATCH_STREAM_MAX_ITEMS, on_chunk=_record_batch
+        ))
+
+    data = request.get_json(silent=True)
+    records = data.get("items") if isinstance(data, dict) else data
+
+    if not isinstance(records, list) or not records:
+        return jsonify({
+            "status": "ERROR",
+            "message": "items must be a non-empty list"
+        }), 400
 
-    # -----------------------------
-    # Erosion risk (READ-ONLY)
-    # -----------------------------
-    erosion_risk = compute_erosion_risk({
-        "rainfall_mm": factors.rainfall_mm,
-        "slope_percent": factors.slope_percent,
-        "soil_depth": factors.soil_depth,
-        "drainage": factors.drainage
+    if wants_stream():
+        return ndjson_response(stream_batch(
+            records, RULES_FILE, max_items=BATCH_STREAM_MAX_ITEMS, on_chunk=_record_batch
+        ))
+
+    if len(records) > BATCH_MAX_ITEMS:
+        return jsonify({
+            "status": "ERROR",
+            "message": f"At most {BATCH_MAX_ITEMS} items per batch"
+        }), 400
+
+    _record_batch(records)
+
+    batch = analyze_batch(records, RULES_FILE)
+
+    return timed_json({
+        "status": "OK",
+        **batch
     })
 
-    # -----------------------------
-    # Final response (MANUAL SERIALIZATION)
-    # -----------------------------
-    return jsonify({
+
+@app.route("/analyze_region", methods=["POST"])
+def analyze_region_endpoint():
+    """
+    Gridded analysis of a bbox or GeoJSON polygon.
+
+    Body: {"bbox": [w, s, e, n]} or {"polygon": GeoJSON},
+          "resolution_m", "land_use", optional "format": json | npz | geotiff
+
+    Streaming (see wants_stream): a header line, one NDJSON line per
+    row strip, then a summary line.
+    """
+    data = request.get_json(silent=True)
+
+    if not data:
+        return jsonify({
+            "status": "ERROR",
+            "message": "Invalid or missing JSON payload"
+        }), 400
+
+    land_use = data.get("land_use")
+    resolution_m = data.get("resolution_m")
+    fmt = data.get("format", "json")
+
+    if land_use is None or resolution_m is None:
+        return jsonify({
+            "status": "ERROR",
+            "message": "resolution_m and land_use are required"
+        }), 400
+
+    if fmt not in ("json", "npz", "geotiff"):
+        return jsonify({
+            "status": "ERROR",
+            "message": "format must be json, npz or geotiff"
+        }), 400
+
+    try:
+        resolution = float(resolution_m)
+    except (TypeError, ValueError):
+        return jsonify({
+            "status": "ERROR",
+            "message": "resolution_m must be a number"
+        }), 400
+
+    try:
+        bbox, rings = parse_region(data)
+
+        if wants_stream():
+            job = RegionJob(
+                bbox=bbox,
+                resolution_m=resolution,
+                land_use=land_use,
+                rule_file=RULES_FILE,
+                rings=rings
+            )
+            check_stream_size(job)
+            return ndjson_response(stream_region(job))
+
+        result = analyze_region(
+            bbox=bbox,
+            resolution_m=resolution,
+            land_use=land_use,
+            rule_file=RULES_FILE,
+            rings=rings
+        )
+    except ValueError as e:
+        return jsonify({
+            "status": "ERROR",
+            "message": str(e)
+        }), 400
+
+    if fmt == "npz":
+        with stage("serialize"):
+            payload = to_npz(result)
+        return Response(
+            payload,
+            mimetype="application/octet-stream",
+            headers={"Content-Disposition": "attachment; filename=region.npz"}
+        )
+
+    if fmt == "geotiff":
+        with stage("serialize"):
+            payload = to_geotiff(result)
+        return Response(
+            payload,
+            mimetype="image/tiff",
+            headers={"Content-Disposition": "attachment; filename=region.tif"}
+        )
+
+    try:
+        with stage("serialize"):
+            region = to_rle_json(result)
+    except ValueError as e:
+        return jsonify({
+            "status": "ERROR",
+            "message": str(e)
+        }), 400
+
+    return timed_json({
         "status": "OK",
         "input": {
-            "lat": lat,
-            "lon": lon,
-            "land_use": land_use
+            "land_use": land_use,
+            "resolution_m": resolution_m
         },
-        "factors": {
-            "rainfall_mm": factors.rainfall_mm,
-            "slope_percent": factors.slope_percent,
-            "soil_depth": factors.soil_depth,
-            "drainage": factors.drainage,
-            "land_use": land_use
-        },
-        "mechanical_measures": mechanical_measures,
-        "erosion_risk": erosion_risk
-    }), 200
+        "region": region
+    })
 
 
 if __name__ == "__main__":
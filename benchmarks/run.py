@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+benchmarks/run.py
+
+Usage:
+  # all scenarios, concurrency 1 and 8, results to a JSON file
+  python benchmarks/run.py --out bench_results.json
+
+  # only the HTTP scenarios, 20 ms of simulated upstream latency
+  python benchmarks/run.py --scenario analyze --scenario analyze_async \\
+      --concurrency 1,8,32 --latency-ms 20
+
+  # compare with an earlier run (exit code 1 on regressions)
+  python benchmarks/run.py --out new.json --compare old.json
+
+This script:
+ - runs the analysis stack fully offline (benchmarks/stubs.py): stub
+   Terrain-RGB / POWER servers (or recorded fixtures) and synthetic
+   land cover, with fresh caches
+ - measures latency percentiles, throughput, per-stage timings
+   (Server-Timing) and memory of /analyze, /analyze/async,
+   /analyze/batch, /analyze_region and the vectorized engine functions
+ - runs every scenario and concurrency level in a fresh process, so
+   each reports its own peak RSS
+ - writes everything as JSON so runs can be compared between commits
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.stubs import offline_environment, sample_points  # noqa: E402
+
+RULES_FILE = os.path.join(PROJECT_ROOT, "rules", "icar_table_4_1_mechanical_measures.json")
+LAND_USES = ("PADDY", "MAIZE", "WHEAT", "TEA")
+
+# Metrics compared by --compare, and whether higher is better
+COMPARED = {
+    "p50_ms": False,
+    "p99_ms": False,
+    "throughput_per_s": True,
+}
+
+
+# ------------------------------------------------------------------
+# MEASUREMENT
+# ------------------------------------------------------------------
+
+def rss_mb():
+    """
+    Current and peak resident set size (MB) of this process.
+    """
+    current = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = peak / 2**20 if sys.platform == "darwin" else peak / 1024
+    return {
+        "rss_mb": None if current is None else round(current, 1),
+        "peak_rss_mb": round(peak, 1)
+    }
+
+
+def latency_summary(latencies_s, wall_s, errors=0):
+    ms = np.asarray(latencies_s) * 1000
+    summary = {
+        "calls": len(ms),
+        "errors": errors,
+        "wall_s": round(wall_s, 3),
+        "throughput_per_s": round(len(ms) / wall_s, 2) if wall_s > 0 else None,
+    }
+    if len(ms):
+        summary.update({
+            "mean_ms": round(float(ms.mean()), 3),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p90_ms": round(float(np.percentile(ms, 90)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            "max_ms": round(float(ms.max()), 3),
+        })
+    return summary
+
+
+def parse_server_timing(header):
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, dur = part.strip().partition(";dur=")
+        if name and dur:
+            stages[name] = float(dur)
+    return stages
+
+
+def stage_summary(per_call):
+    """
+    Mean and p90 (ms) of each Server-Timing stage over all calls.
+    """
+    names = sorted({name for stages in per_call for name in stages})
+    summary = {}
+    for name in names:
+        values = np.array([stages[name] for stages in per_call if name in stages])
+        summary[name] = {
+            "mean_ms": round(float(values.mean()), 3),
+            "p90_ms": round(float(np.percentile(values, 90)), 3),
+        }
+    return summary
+
+
+def run_load(call, items, concurrency):
+    """
+    call(item) for every item on `concurrency` threads.
+
+    Returns:
+        latency summary (+ "stages" when calls return Server-Timing dicts)
+    """
+    latencies = []
+    stages = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(item):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            timing = call(item)
+            failed = False
+        except Exception as e:
+            print("Benchmark call failed:", e)
+            timing, failed = None, True
+        elapsed = time.perf_counter() - start
+
+        with lock:
+            if failed:
+                errors += 1
+                return
+            latencies.append(elapsed)
+            if timing:
+                stages.append(timing)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, items))
+    wall = time.perf_counter() - start
+
+    summary = latency_summary(latencies, wall, errors)
+    if stages:
+        summary["stages"] = stage_summary(stages)
+    return summary
+
+
+# ------------------------------------------------------------------
+# SCENARIOS
+# ------------------------------------------------------------------
+
+def _client_factory():
+    import app
+
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = app.app.test_client()
+        return local.client
+    return client
+
+
+def _post(client, path, body):
+    response = client().post(path, json=body)
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} returned {response.status_code}")
+    return parse_server_timing(response.headers.get("Server-Timing"))
+
+
+def bench_analyze(env, args, concurrency, path="/analyze"):
+    client = _client_factory()
+    points = sample_points(env["bounds"], args.requests, seed=args.seed)
+    items = [
+        {"lat": lat, "lon": lon, "land_use": LAND_USES[k % len(LAND_USES)]}
+        for k, (lat, lon) in enumerate(points)
+    ]
+    return run_load(lambda body: _post(client, path, body), items, concurrency)
+
+
+def bench_analyze_async(env, args, concurrency):
+    return bench_analyze(env, args, concurrency, path="/analyze/async")
+
+
+def bench_batch(env, args, concurrency):
+    client = _client_factory()
+    batches = []
+    for b in range(max(1, args.requests // args.batch_size)):
+        points = sample_points(env["bounds"], args.batch_size, seed=args.seed + 1000 + b)
+        batches.append({"items": [
+            {"lat": lat, "lon": lon, "land_use": LAND_USES[k % len(LAND_USES)]}
+            for k, (lat, lon) in enumerate(points)
+        ]})
+    summary = run_load(lambda body: _post(client, "/analyze/batch", body), batches, concurrency)
+    summary["items_per_s"] = round(summary["throughput_per_s"] * args.batch_size, 2) \
+        if summary.get("throughput_per_s") else None
+    return summary
+
+
+def bench_region(env, args, concurrency):
+    client = _client_factory()
+    west, south, east, north = env["bounds"]
+    # A quarter of the land cover extent, offset per call
+    w, h = (east - west) / 4, (north - south) / 4
+    bodies = [
+        {
+            "bbox": [west + w * (k % 3 + 0.5), south + h * (k // 3 % 3 + 0.5),
+                     west + w * (k % 3 + 1.5), south + h * (k // 3 % 3 + 1.5)],
+            "resolution_m": args.region_resolution_m,
+            "land_use": "PADDY"
+        }
+        for k in range(max(1, args.requests // 20))
+    ]
+    return run_load(lambda body: _post(client, "/analyze_region", body), bodies, concurrency)
+
+
+def bench_engine(env, args, concurrency):
+    """
+    Pure engine functions (no I/O): scalar rules and erosion risk per
+    point, and the vectorized versions over --engine-points columns.
+    """
+    from engine.erosion_risk_engine import compute_erosion_risk, compute_erosion_risk_array
+    from engine.factor_arrays import encode_categories
+    from engine.rule_engine import evaluate_rules, evaluate_rules_array, get_rule_set
+    from geo.location_contract import LocationFactors
+
+    rng = np.random.default_rng(args.seed)
+    n = args.engine_points
+    slope = rng.uniform(0, 40, n).round(2)
+    rainfall = rng.uniform(200, 3500, n).round(1)
+    soil = rng.choice(["SHALLOW", "MODERATE", "DEEP"], n)
+    drainage = rng.choice(["POOR", "MODERATE", "GOOD"], n)
+    land_use = rng.choice(LAND_USES, n)
+
+    scalar_items = [
+        LocationFactors(
+            latitude=0.0, longitude=0.0, land_use=str(land_use[k]),
+            rainfall_mm=float(rainfall[k]), slope_percent=float(slope[k]),
+            soil_depth=str(soil[k]), drainage=str(drainage[k])
+        )
+        for k in range(min(n, args.requests * 10))
+    ]
+
+    def scalar(factors):
+        evaluate_rules(factors=factors, rule_file=RULES_FILE)
+        compute_erosion_risk({
+            "rainfall_mm": factors.rainfall_mm,
+            "slope_percent": factors.slope_percent,
+            "soil_depth": factors.soil_depth,
+            "drainage": factors.drainage
+        })
+
+    results = {"scalar_point": run_load(scalar, scalar_items, concurrency)}
+
+    rule_set = get_rule_set(RULES_FILE)
+    codes, vocabs = {}, {}
+    for field, values in (("soil_depth", soil), ("drainage", drainage), ("land_use", land_use)):
+        codes[field], vocabs[field] = encode_categories(values)
+
+    def vectorized(_):
+        evaluate_rules_array(
+            rule_set, slope, rainfall,
+            codes["soil_depth"], codes["drainage"], codes["land_use"], vocabs
+        )
+        compute_erosion_risk_array(rainfall, slope, codes["soil_depth"], codes["drainage"], vocabs)
+
+    summary = run_load(vectorized, range(args.engine_repeats), concurrency)
+    summary["points_per_s"] = round(n / (summary["mean_ms"] / 1000), 1)
+
+    tracemalloc.start()
+    vectorized(None)
+    summary["peak_alloc_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+    tracemalloc.stop()
+
+    results["vectorized"] = summary
+    return results
+
+
+SCENARIOS = {
+    "engine": bench_engine,
+    "analyze": bench_analyze,
+    "analyze_async": bench_analyze_async,
+    "batch": bench_batch,
+    "region": bench_region,
+}
+
+
+# ------------------------------------------------------------------
+# RESULTS
+# ------------------------------------------------------------------
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_scenario(name, concurrency, args, run_dir):
+    """
+    One scenario at one concurrency level, from cold caches and an idle
+    stub. Meant to run in a process of its own: ru_maxrss is the peak
+    of the whole process, so only then is "peak_rss_mb" this run's.
+    """
+    with offline_environment(
+        run_dir, latency_ms=args.latency_ms, fixtures_dir=args.fixtures,
+        landcover_px=args.landcover_px, factor_cache=not args.no_factor_cache
+    ) as env:
+        print(f"{name} (concurrency {concurrency}) ...", flush=True)
+        if args.warmup and name != "engine":
+            SCENARIOS[name](env, _scaled(args, args.warmup), 1)
+
+        summary = SCENARIOS[name](env, args, concurrency)
+        summary["upstream_requests"] = dict(env["stub"].requests)
+        summary["memory"] = rss_mb()
+
+    return summary
+
+
+def run_benchmarks(args):
+    results = {}
+    # Spawned (not forked) workers start without the parent's memory
+    context = multiprocessing.get_context("spawn")
+
+    with tempfile.TemporaryDirectory(prefix="swc-bench-") as workdir:
+        for name in args.scenario:
+            results[name] = {}
+            for concurrency in args.concurrency:
+                run_dir = os.path.join(workdir, f"{name}-c{concurrency}")
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    summary = pool.submit(run_scenario, name, concurrency, args, run_dir).result()
+
+                results[name][f"c{concurrency}"] = summary
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": {
+                k: v for k, v in vars(args).items() if k not in ("out", "compare")
+            }
+        },
+        "results": results
+    }
+
+
+def _scaled(args, requests):
+    scaled = argparse.Namespace(**vars(args))
+    scaled.requests = requests
+    scaled.seed = args.seed + 7919
+    return scaled
+
+
+def _flatten(results, prefix=()):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, prefix + (key,))
+        else:
+            yield prefix + (key,), value
+
+
+def compare(old, new, threshold):
+    """
+    Relative change of every COMPARED metric present in both runs.
+
+    Returns:
+        (rows, regressions): rows of (path, old, new, change)
+    """
+    old_values = dict(_flatten(old["results"]))
+    rows, regressions = [], []
+
+    for path, value in _flatten(new["results"]):
+        if path[-1] not in COMPARED or path not in old_values:
+            continue
+        before = old_values[path]
+        if not before or value is None:
+            continue
+
+        change = (value - before) / before
+        rows.append((path, before, value, change))
+
+        worse = -change if COMPARED[path[-1]] else change
+        if worse > threshold:
+            regressions.append(path)
+
+    return rows, regressions
+
+
+def print_comparison(rows, regressions):
+    for path, before, value, change in rows:
+        flag = "  REGRESSION" if path in regressions else ""
+        print(f"{'/'.join(path):60s} {before:>12.3f} -> {value:>12.3f} ({change:+.1%}){flag}")
+
+
+# ------------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------------
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser()
+    p.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                   help="Scenario to run (repeatable, default: all)")
+    p.add_argument("--concurrency", default="1,8",
+                   help="Comma-separated client concurrency levels")
+    p.add_argument("--requests", type=int, default=200, help="Calls per scenario and level")
+    p.add_argument("--warmup", type=int, default=0, help="Untimed calls before each run")
+    p.add_argument("--batch-size", type=int, default=100, help="Items per /analyze/batch call")
+    p.add_argument("--region-resolution-m", type=float, default=100.0)
+    p.add_argument("--engine-points", type=int, default=100_000,
+                   help="Points per vectorized engine call")
+    p.add_argument("--engine-repeats", type=int, default=20)
+    p.add_argument("--latency-ms", type=float, default=0.0,
+                   help="Simulated upstream latency per stub response")
+    p.add_argument("--fixtures", help="Recorded upstream responses to serve when present")
+    p.add_argument("--landcover-px", type=int, default=2048, help="Synthetic land cover size")
+    p.add_argument("--no-factor-cache", action="store_true")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="Write results JSON here")
+    p.add_argument("--compare", help="Earlier results JSON to compare with")
+    p.add_argument("--threshold", type=float, default=0.2,
+                   help="Relative change counted as a regression (with --compare)")
+
+    args = p.parse_args(argv)
+    args.scenario = args.scenario or list(SCENARIOS)
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmarks(args)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print("Results written to", args.out)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            rows, regressions = compare(json.load(f), report, args.threshold)
+        print_comparison(rows, regressions)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
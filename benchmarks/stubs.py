@@ -0,0 +1,329 @@
+"""
+benchmarks/stubs.py
+
+Offline stand-ins for everything /analyze reads:
+ - a local HTTP server answering Terrain-RGB tile and NASA POWER
+   climatology requests, from recorded fixtures when present and
+   otherwise from deterministic synthetic terrain / rainfall
+ - synthetic ESRI land cover GeoTIFFs
+ - offline_environment(): points the sensors, caches and land cover
+   catalog at the above (and restores them afterwards)
+
+Fixture layout (files saved from the live APIs):
+    <fixtures>/terrain/<z>/<x>/<y>.png
+    <fixtures>/power/<lat>_<lon>.json   (lat/lon with 4 decimals)
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import rasterio
+from PIL import Image
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+
+TERRAIN_TILE_SIZE = 256
+
+# Synthetic land cover: one UTM 44N tile near Dehradun
+LANDCOVER_EPSG = 32644
+LANDCOVER_ORIGIN = (200000.0, 3370000.0)  # upper-left x, y (m)
+LANDCOVER_RES_M = 10.0
+
+# ESRI classes and their share of the synthetic tile
+LANDCOVER_MIX = {5: 0.7, 2: 0.15, 7: 0.1, 1: 0.05}
+
+
+def fixture_path(fixtures_dir, kind, **key):
+    if kind == "terrain":
+        return os.path.join(fixtures_dir, "terrain", str(key["z"]), str(key["x"]), f"{key['y']}.png")
+    return os.path.join(fixtures_dir, "power", f"{key['lat']:.4f}_{key['lon']:.4f}.json")
+
+
+# ------------------------------------------------------------------
+# SYNTHETIC UPSTREAM DATA
+# ------------------------------------------------------------------
+
+def synthetic_elevation(z, x, y, size=TERRAIN_TILE_SIZE):
+    """
+    Elevations (m) of one tile from a smooth function of the global pixel
+    position, so neighbouring tiles stitch without seams.
+    """
+    gy, gx = np.mgrid[0:size, 0:size].astype(np.float64)
+    gx += x * size
+    gy += y * size
+    scale = 2.0 ** (z - 12)
+    return (
+        600.0
+        + 120.0 * np.sin(gx / (90.0 * scale)) * np.cos(gy / (130.0 * scale))
+        + 40.0 * np.sin((gx + gy) / (35.0 * scale))
+    )
+
+
+def encode_terrain_rgb(elevation):
+    """
+    PNG bytes of a Terrain-RGB tile (elevation = v * 0.1 - 10000).
+    """
+    v = np.round((elevation + 10000.0) * 10.0).astype(np.int64)
+    rgb = np.stack([(v >> 16) & 255, (v >> 8) & 255, v & 255], axis=-1).astype(np.uint8)
+
+    buf = BytesIO()
+    Image.fromarray(rgb, "RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def synthetic_power(lat, lon):
+    """
+    POWER climatology response body with a smooth annual mean (mm/day).
+    """
+    mm_per_day = 2.0 + 1.5 * (math.sin(math.radians(lat) * 6) + 1) + 0.5 * math.cos(math.radians(lon) * 4)
+    return {"properties": {"parameter": {"PRECTOTCORR": {"ANN": round(mm_per_day, 3)}}}}
+
+
+def write_landcover_tiles(directory, size_px=2048, seed=1):
+    """
+    One synthetic land cover GeoTIFF (tiled, like the ESRI product):
+    rectangular fields of each LANDCOVER_MIX class.
+
+    Returns:
+        WGS84 bounds (west, south, east, north) of the tile
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    # 64 px fields, classes drawn with the configured shares
+    fields = -(-size_px // 64)
+    classes = np.array(list(LANDCOVER_MIX), dtype=np.uint8)
+    grid = rng.choice(classes, size=(fields, fields), p=list(LANDCOVER_MIX.values()))
+    data = np.kron(grid, np.ones((64, 64), dtype=np.uint8))[:size_px, :size_px]
+
+    transform = from_origin(*LANDCOVER_ORIGIN, LANDCOVER_RES_M, LANDCOVER_RES_M)
+    profile = {
+        "driver": "GTiff",
+        "width": size_px,
+        "height": size_px,
+        "count": 1,
+        "dtype": "uint8",
+        "crs": f"EPSG:{LANDCOVER_EPSG}",
+        "transform": transform,
+        "nodata": 0,
+        "tiled": True,
+        "blockxsize": 256,
+        "blockysize": 256,
+        "compress": "deflate"
+    }
+    with rasterio.open(os.path.join(directory, "synthetic_44N.tif"), "w", **profile) as dst:
+        dst.write(data, 1)
+
+    x0, y0 = LANDCOVER_ORIGIN
+    extent = size_px * LANDCOVER_RES_M
+    return transform_bounds(f"EPSG:{LANDCOVER_EPSG}", "EPSG:4326", x0, y0 - extent, x0 + extent, y0)
+
+
+def sample_points(bounds, n, seed=0, margin=0.05):
+    """
+    n random (lat, lon) inside bounds, away from the edges.
+    """
+    west, south, east, north = bounds
+    dx, dy = (east - west) * margin, (north - south) * margin
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(south + dy, north - dy, n)
+    lons = rng.uniform(west + dx, east - dx, n)
+    return list(zip(lats.tolist(), lons.tolist()))
+
+
+# ------------------------------------------------------------------
+# STUB SERVER
+# ------------------------------------------------------------------
+
+class StubUpstreams:
+    """
+    Local Terrain-RGB + POWER server on 127.0.0.1 (random port).
+
+    latency_ms delays every response, standing in for the network;
+    fixtures_dir, when set, is consulted before synthesizing.
+    """
+
+    def __init__(self, latency_ms=0.0, fixtures_dir=None):
+        self.latency_ms = latency_ms
+        self.fixtures_dir = fixtures_dir
+        self.requests = {"terrain": 0, "power": 0, "fixture_hits": 0}
+        self._tiles = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def terrain_url(self):
+        return self.url + "/terrain/{z}/{x}/{y}.pngraw"
+
+    @property
+    def power_url(self):
+        return self.url + "/power"
+
+    def _fixture(self, kind, **key):
+        if not self.fixtures_dir:
+            return None
+        path = fixture_path(self.fixtures_dir, kind, **key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            self._count("fixture_hits")
+            return f.read()
+
+    def _count(self, kind):
+        # Handler threads run concurrently
+        with self._lock:
+            self.requests[kind] += 1
+
+    def terrain_tile(self, z, x, y):
+        body = self._fixture("terrain", z=z, x=x, y=y)
+        if body is not None:
+            return body
+        with self._lock:
+            body = self._tiles.get((z, x, y))
+        if body is None:
+            body = encode_terrain_rgb(synthetic_elevation(z, x, y))
+            with self._lock:
+                self._tiles[(z, x, y)] = body
+        return body
+
+    def power(self, lat, lon):
+        body = self._fixture("power", lat=lat, lon=lon)
+        if body is not None:
+            return body
+        return json.dumps(synthetic_power(lat, lon)).encode()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000)
+
+                url = urlsplit(self.path)
+                parts = url.path.strip("/").split("/")
+                try:
+                    if parts[0] == "terrain" and len(parts) == 4:
+                        stub._count("terrain")
+                        z, x, y = int(parts[1]), int(parts[2]), int(parts[3].split(".")[0])
+                        return self._send(200, stub.terrain_tile(z, x, y), "image/png")
+                    if parts[0] == "power":
+                        stub._count("power")
+                        query = parse_qs(url.query)
+                        lat, lon = float(query["latitude"][0]), float(query["longitude"][0])
+                        return self._send(200, stub.power(lat, lon), "application/json")
+                except (KeyError, ValueError):
+                    return self._send(400, b"{}", "application/json")
+                self._send(404, b"{}", "application/json")
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# ------------------------------------------------------------------
+# OFFLINE ENVIRONMENT
+# ------------------------------------------------------------------
+
+class _Patches:
+    def __init__(self):
+        self._undo = []
+
+    def set(self, obj, name, value):
+        self._undo.append((obj, name, getattr(obj, name)))
+        setattr(obj, name, value)
+
+    def undo(self):
+        while self._undo:
+            obj, name, value = self._undo.pop()
+            setattr(obj, name, value)
+
+
+@contextmanager
+def offline_environment(workdir, latency_ms=0.0, fixtures_dir=None,
+                        landcover_px=2048, factor_cache=True):
+    """
+    Run the analysis stack against local stand-ins only.
+
+    Terrain and rainfall come from a StubUpstreams server, land cover
+    from a synthetic GeoTIFF; the tile, rainfall and factor caches start
+    empty and live under workdir. Precomputed packs (slope raster,
+    rainfall pack, land cover mask) are disabled so every stage runs.
+
+    Yields:
+        {"stub": StubUpstreams, "bounds": WGS84 bounds of the land cover}
+    """
+    import geo.arable_classifier as arable_classifier
+    import geo.sensors.rainfall_sensor as rainfall_sensor
+    import geo.sensors.slope_sensor as slope_sensor
+    from geo.cache import FACTOR_CACHE
+    from geo.landcover_catalog import LandcoverCatalog
+    from geo.resilience import reset_breakers
+    from geo.sensors.rainfall_store import RainfallCellCache
+
+    bounds = write_landcover_tiles(os.path.join(workdir, "landcover"), landcover_px)
+    catalog = LandcoverCatalog(os.path.join(workdir, "landcover"))
+    stub = StubUpstreams(latency_ms, fixtures_dir).start()
+
+    patches = _Patches()
+    try:
+        patches.set(rainfall_sensor, "POWER_URL", stub.power_url)
+        patches.set(rainfall_sensor, "get_rainfall_pack", lambda: None)
+        patches.set(rainfall_sensor, "CELL_CACHE", RainfallCellCache(os.path.join(workdir, "rainfall.sqlite")))
+
+        patches.set(slope_sensor, "TERRAIN_URL", stub.terrain_url)
+        patches.set(slope_sensor, "get_slope_raster", lambda: None)
+        patches.set(slope_sensor.TILE_CACHE, "cache_dir", os.path.join(workdir, "terrain_rgb"))
+        patches.set(slope_sensor.SLOPE_TILE_CACHE, "cache_dir", os.path.join(workdir, "terrain_slope"))
+
+        patches.set(arable_classifier, "landcover_catalog", lambda: catalog)
+        patches.set(arable_classifier, "get_landcover_mask", lambda: None)
+
+        patches.set(FACTOR_CACHE, "enabled", factor_cache)
+
+        for cache in (slope_sensor.TILE_CACHE, slope_sensor.SLOPE_TILE_CACHE):
+            cache.clear_memory()
+        FACTOR_CACHE.clear()
+        reset_breakers()
+
+        yield {"stub": stub, "bounds": bounds}
+    finally:
+        patches.undo()
+        stub.stop()
+        for cache in (slope_sensor.TILE_CACHE, slope_sensor.SLOPE_TILE_CACHE):
+            cache.clear_memory()
+        FACTOR_CACHE.clear()
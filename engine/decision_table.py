@@ -0,0 +1,279 @@
+"""
+Decision Table
+--------------
+The ICAR rules only threshold slope and rainfall and test membership of
+soil depth, drainage and land use. Their whole output space is therefore
+a finite grid:
+
+    (soil depth, drainage, land use) -> slope slot x rainfall slot
+
+where the slots come from every threshold in the rules file. The table
+stores the STRICT / RELAXED answer of every cell, so a lookup is two
+bisects plus a dict access.
+
+NOTE:
+- Answers are identical to evaluate-by-rule_matches (see verify_decision_table)
+- Values outside the tabulated domains fall back to the compiled rule set
+"""
+
+import random
+
+from engine.rule_engine import (
+    CompiledRuleSet,
+    compiled_for_file,
+    rule_matches
+)
+from geo.location_contract import LocationFactors
+
+# Sensor outputs are always tabulated, even if no rule mentions them
+SENSOR_VALUES = {
+    "soil_depth": ["SHALLOW", "MODERATE", "DEEP"],
+    "drainage": ["POOR", "MODERATE", "GOOD"],
+    "land_use": []
+}
+
+# Domain key for values no rule lists (only used for exact-membership fields)
+OTHER = None
+
+
+def _domain(rules, field):
+    values = set(SENSOR_VALUES[field])
+    for r in rules:
+        v = r.get(field)
+        if isinstance(v, (list, tuple, set, frozenset)):
+            values.update(v)
+        elif isinstance(v, str):
+            values.add(v)
+    return sorted(values)
+
+
+def _exact_membership(rules, field):
+    """
+    True when every rule lists `field` as a collection, so a value no
+    rule lists can never match (a string field would match substrings).
+    """
+    return all(
+        isinstance(r[field], (list, tuple, set, frozenset))
+        for r in rules if field in r
+    )
+
+
+class DecisionTable:
+    """
+    Precomputed evaluate_rules answers for every rule cell.
+    """
+
+    def __init__(self, rules):
+        self.rule_set = CompiledRuleSet(rules)
+        rs = self.rule_set
+
+        self.slope_breakpoints = rs.slope_index.breakpoints
+        self.rainfall_breakpoints = rs.rainfall_index.breakpoints
+
+        self.domains = {}
+        for field in ("soil_depth", "drainage", "land_use"):
+            domain = _domain(rules, field)
+            if _exact_membership(rules, field):
+                domain.append(OTHER)
+            self.domains[field] = domain
+
+        self._domain_sets = {f: frozenset(d) for f, d in self.domains.items()}
+
+        self.results = []
+        interned = {}
+        self.cells = {}
+
+        for soil in self.domains["soil_depth"]:
+            for drainage in self.domains["drainage"]:
+                base = (
+                    self._category_mask("soil_depth", soil)
+                    & self._category_mask("drainage", drainage)
+                )
+                for land_use in self.domains["land_use"]:
+                    land_mask = self._category_mask("land_use", land_use)
+                    grid = []
+                    for slope_mask in rs.slope_index.masks:
+                        row = []
+                        for rain_mask in rs.rainfall_index.masks:
+                            relaxed = base & slope_mask & rain_mask
+                            strict = relaxed & land_mask
+                            answer = ("STRICT", strict) if strict else ("RELAXED", relaxed)
+
+                            n = interned.get(answer)
+                            if n is None:
+                                n = interned[answer] = len(self.results)
+                                self.results.append(
+                                    (answer[0], tuple(rs.measures_for(answer[1])))
+                                )
+                            row.append(n)
+                        grid.append(row)
+                    self.cells[(soil, drainage, land_use)] = grid
+
+    def _category_mask(self, field, value):
+        if value is OTHER:
+            return self.rule_set.unlisted_mask(field)
+        return self.rule_set.category_mask(field, value)
+
+    def _key(self, field, value):
+        if value in self._domain_sets[field]:
+            return value
+        if OTHER in self._domain_sets[field]:
+            return OTHER
+        raise KeyError(value)
+
+    def lookup(self, slope, rainfall, soil_depth, drainage, land_use):
+        """
+        Returns:
+            (mode, measures tuple), or None when the inputs fall outside
+            the tabulated domain (NaN, unlisted free-text category)
+        """
+        if slope != slope or rainfall != rainfall:
+            return None
+
+        try:
+            grid = self.cells[(
+                self._key("soil_depth", soil_depth),
+                self._key("drainage", drainage),
+                self._key("land_use", land_use)
+            )]
+        except (KeyError, TypeError):
+            return None
+
+        s = self.rule_set.slope_index.slot(slope)
+        r = self.rule_set.rainfall_index.slot(rainfall)
+        return self.results[grid[s][r]]
+
+    def evaluate(self, factors):
+        answer = self.lookup(
+            factors.slope_percent,
+            factors.rainfall_mm,
+            factors.soil_depth,
+            factors.drainage,
+            factors.land_use
+        )
+        if answer is None:
+            return self.rule_set.evaluate(factors)
+
+        mode, measures = answer
+        return {
+            "mode": mode,
+            "measures": list(measures)
+        }
+
+    def to_dict(self):
+        """
+        JSON-serializable table (for audit and review).
+        """
+        return {
+            "slope_breakpoints": self.slope_breakpoints,
+            "rainfall_breakpoints": self.rainfall_breakpoints,
+            "slot_rule": "value == breakpoint[i] -> slot 2i+1; "
+                         "breakpoint[i-1] < value < breakpoint[i] -> slot 2i",
+            "domains": self.domains,
+            "results": [
+                {"mode": mode, "measures": list(measures)}
+                for mode, measures in self.results
+            ],
+            "cells": [
+                {"soil_depth": s, "drainage": d, "land_use": lu, "grid": grid}
+                for (s, d, lu), grid in self.cells.items()
+            ]
+        }
+
+
+def get_decision_table(path):
+    """
+    Decision table for a rules file; rebuilt only when its mtime changes.
+    """
+    return compiled_for_file(path, "decision_table", DecisionTable)
+
+
+# ------------------------------------------------------------------
+# VERIFICATION
+# ------------------------------------------------------------------
+
+def reference_evaluate(factors, rules):
+    """
+    Two-stage evaluation straight from rule_matches (no indexing).
+    """
+    strict = [
+        r["measure"]
+        for r in rules
+        if rule_matches(r, factors, ignore_land_use=False)
+    ]
+    if strict:
+        return {"mode": "STRICT", "measures": strict}
+
+    return {
+        "mode": "RELAXED",
+        "measures": [
+            r["measure"]
+            for r in rules
+            if rule_matches(r, factors, ignore_land_use=True)
+        ]
+    }
+
+
+def verify_decision_table(table, rules, samples=10000, seed=0):
+    """
+    Compare the table with reference_evaluate on randomized inputs:
+    exact thresholds, values just either side of them, values in
+    between, and categories both inside and outside the domains. Every
+    combination of categories (an unlisted value included) is checked
+    at least once.
+
+    Returns:
+        list of mismatches (empty when the table is exact)
+    """
+    rng = random.Random(seed)
+
+    def numeric(breakpoints, upper):
+        r = rng.random()
+        if breakpoints and r < 0.3:
+            return rng.choice(breakpoints)
+        if breakpoints and r < 0.5:
+            return rng.choice(breakpoints) + rng.choice([-1e-6, 1e-6])
+        return round(rng.uniform(0, upper), 2)
+
+    def category(field):
+        values = [v for v in table.domains[field] if v is not OTHER]
+        if values and rng.random() < 0.9:
+            return rng.choice(values)
+        return "UNLISTED"
+
+    def choices(field):
+        return [v for v in table.domains[field] if v is not OTHER] + ["UNLISTED"]
+
+    combinations = [
+        (soil, drainage, land_use)
+        for soil in choices("soil_depth")
+        for drainage in choices("drainage")
+        for land_use in choices("land_use")
+    ]
+    random_draws = [
+        (category("soil_depth"), category("drainage"), category("land_use"))
+        for _ in range(samples)
+    ]
+
+    mismatches = []
+    for soil, drainage, land_use in combinations + random_draws:
+        factors = LocationFactors(
+            latitude=0.0,
+            longitude=0.0,
+            land_use=land_use,
+            rainfall_mm=numeric(table.rainfall_breakpoints, 4000),
+            slope_percent=numeric(table.slope_breakpoints, 60),
+            soil_depth=soil,
+            drainage=drainage
+        )
+
+        expected = reference_evaluate(factors, rules)
+        actual = table.evaluate(factors)
+        if actual != expected:
+            mismatches.append({
+                "factors": factors,
+                "expected": expected,
+                "actual": actual
+            })
+
+    return mismatches
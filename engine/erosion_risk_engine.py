@@ -15,6 +15,11 @@ NOTE:
 - This is NOT an erosion prediction model (e.g. USLE)
 """
 
+import numpy as np
+
+from engine.factor_arrays import lookup_by_code
+
+
 def compute_erosion_risk(factors):
     # -----------------------
     # Rainfall risk (mm)
@@ -97,3 +102,78 @@ def compute_erosion_risk(factors):
         )
     }
 
+
+# ------------------------------------------------------------------
+# VECTORIZED
+# ------------------------------------------------------------------
+RAINFALL_BINS = [500, 1000]
+SLOPE_BINS = [3, 8, 15]
+LEVEL_BINS = [0.35, 0.6]
+LEVELS = np.array(["LOW", "MODERATE", "HIGH"], dtype=object)
+
+SOIL_CLASSES = ["DEEP", "MODERATE", "SHALLOW", None]
+DRAINAGE_CLASSES = ["GOOD", "MODERATE", "POOR", None]
+
+
+def _build_score_table():
+    """
+    Score of every (rainfall bin, slope bin, soil class, drainage class)
+    combination, computed with compute_erosion_risk itself so the array
+    path rounds exactly like the scalar one.
+    """
+    # One representative value per bin (each bin's lower edge)
+    rain_reps = [0] + RAINFALL_BINS
+    slope_reps = [0] + SLOPE_BINS
+
+    table = np.empty(
+        (len(rain_reps), len(slope_reps), len(SOIL_CLASSES), len(DRAINAGE_CLASSES))
+    )
+    for a, rainfall_mm in enumerate(rain_reps):
+        for b, slope_percent in enumerate(slope_reps):
+            for c, soil_depth in enumerate(SOIL_CLASSES):
+                for d, drainage in enumerate(DRAINAGE_CLASSES):
+                    table[a, b, c, d] = compute_erosion_risk({
+                        "rainfall_mm": rainfall_mm,
+                        "slope_percent": slope_percent,
+                        "soil_depth": soil_depth,
+                        "drainage": drainage
+                    })["score"]
+    return table
+
+
+SCORE_TABLE = _build_score_table()
+
+
+def _class_index(classes):
+    # Unlisted values share the last (default risk) slot
+    listed = classes[:-1]
+    return lambda v: listed.index(v) if v in listed else len(listed)
+
+
+def compute_erosion_risk_array(rainfall_mm, slope_percent,
+                               soil_codes, drainage_codes, vocabs):
+    """
+    compute_erosion_risk for columns of factors.
+
+    Soil depth and drainage are codes into vocabs["soil_depth"] and
+    vocabs["drainage"] (see engine.factor_arrays.encode_categories).
+
+    Returns:
+        {"score": float array, "level": object array of LOW/MODERATE/HIGH}
+    """
+    # np.digitize puts x in bin i when bins[i-1] <= x < bins[i], the same
+    # edges as the scalar `<` chain; NaN lands in the top bin like it does there
+    rain_bin = np.digitize(np.asarray(rainfall_mm, dtype=np.float64), RAINFALL_BINS)
+    slope_bin = np.digitize(np.asarray(slope_percent, dtype=np.float64), SLOPE_BINS)
+
+    soil = lookup_by_code(soil_codes, vocabs["soil_depth"], _class_index(SOIL_CLASSES), np.int64)
+    drainage = lookup_by_code(
+        drainage_codes, vocabs["drainage"], _class_index(DRAINAGE_CLASSES), np.int64
+    )
+
+    score = SCORE_TABLE[rain_bin, slope_bin, soil, drainage]
+
+    return {
+        "score": score,
+        "level": LEVELS[np.digitize(score, LEVEL_BINS)]
+    }
@@ -0,0 +1,50 @@
+"""
+Factor Arrays
+-------------
+Column encoding shared by the vectorized engines.
+
+Categorical factors (soil depth, drainage, land use) are passed as
+integer codes into a vocabulary, so array engines can evaluate each
+distinct value once with the scalar logic and broadcast the result.
+"""
+
+import numpy as np
+
+
+# Code of a missing (None) value; never an index into the vocabulary
+MISSING = -1
+
+
+def encode_categories(values):
+    """
+    Encode a column of categorical values.
+
+    Returns:
+        (codes: int array, vocab: list) with vocab[codes[i]] == values[i],
+        and codes[i] == MISSING where values[i] is None
+    """
+    values = np.asarray(values, dtype=object).reshape(-1)
+    missing = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+
+    vocab, inverse = np.unique(values[~missing].astype(str), return_inverse=True)
+    codes = np.full(len(values), MISSING, dtype=np.int64)
+    codes[~missing] = inverse
+    return codes, vocab.tolist()
+
+
+def code_index(codes, vocab):
+    """
+    Codes as indices into a per-vocabulary table with one extra slot
+    (at len(vocab)) for MISSING.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    return np.where(codes == MISSING, len(vocab), codes)
+
+
+def lookup_by_code(codes, vocab, fn, dtype):
+    """
+    Apply `fn` once per vocabulary entry (and once to None, for MISSING
+    codes) and gather the results by code.
+    """
+    table = np.array([fn(v) for v in vocab] + [fn(None)], dtype=dtype)
+    return table[code_index(codes, vocab)]
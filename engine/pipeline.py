@@ -0,0 +1,336 @@
+"""
+Analysis Pipeline
+-----------------
+factors -> arability -> ICAR rules -> erosion risk, for one point
+(/analyze) or for a batch of points (/analyze/batch).
+
+Batches quantize and deduplicate coordinates, then measure slope and
+rainfall and check arability for all distinct points at once: the array
+stages group their work by DEM tile, rainfall grid cell and land cover
+tile, so every upstream resource is read once per batch.
+"""
+
+import math
+import os
+import time
+
+import numpy as np
+
+from engine.erosion_risk_engine import compute_erosion_risk
+from engine.rule_engine import evaluate_rules
+from geo.arable_classifier import is_arable_land, is_arable_land_async, is_arable_land_batch
+from geo.dem.mosaic import latlon_to_tile_fraction
+from geo.metrics import record_stage, stage
+from geo.providers import collect_providers
+from geo.factor_builder import (
+    FACTOR_DEADLINE_S,
+    FACTOR_FIELDS,
+    build_factors_async,
+    build_factors_concurrent,
+    factors_from_measurements,
+    fallback_reasons
+)
+from geo.sensors.rainfall_sensor import fetch_rainfall_mm_many
+from geo.sensors.rainfall_store import power_cell
+from geo.sensors.slope_sensor import DEFAULT_ZOOM, fetch_slope_percent_many
+
+# Coordinates are rounded to this many decimals (5 -> ~1 m) before dedup
+BATCH_COORD_DECIMALS = int(os.getenv("SWC_BATCH_COORD_DECIMALS", 5))
+
+# Largest accepted batch
+BATCH_MAX_ITEMS = int(os.getenv("SWC_BATCH_MAX_ITEMS", 1000))
+
+
+# ------------------------------------------------------------------
+# SINGLE POINT
+# ------------------------------------------------------------------
+
+def analyze_factors(factors, arability, rule_file):
+    """
+    Response body for a point whose factors and arability are known.
+
+    "fallbacks" maps each factor that is a conservative fallback rather
+    than a measurement to the reason (soil depth and drainage derived
+    from it inherit the uncertainty); "providers" maps each measured
+    factor to the data provider that answered it.
+    """
+    lat, lon, land_use = factors.latitude, factors.longitude, factors.land_use
+    is_arable, reason = arability
+
+    if not is_arable:
+        return {
+            "status": "NON_ARABLE",
+            "reason": reason,
+            "message": "System works only for arable agricultural land",
+            "input": {
+                "lat": lat,
+                "lon": lon,
+                "land_use": land_use
+            }
+        }
+
+    # -----------------------------
+    # ICAR rules
+    # -----------------------------
+    with stage("rules"):
+        mechanical_measures = evaluate_rules(
+            factors=factors,
+            rule_file=rule_file
+        )
+
+    # -----------------------------
+    # Erosion risk (READ-ONLY)
+    # -----------------------------
+    with stage("erosion"):
+        erosion_risk = compute_erosion_risk({
+            "rainfall_mm": factors.rainfall_mm,
+            "slope_percent": factors.slope_percent,
+            "soil_depth": factors.soil_depth,
+            "drainage": factors.drainage
+        })
+
+    return {
+        "status": "OK",
+        "input": {
+            "lat": lat,
+            "lon": lon,
+            "land_use": land_use
+        },
+        "factors": {
+            "rainfall_mm": factors.rainfall_mm,
+            "slope_percent": factors.slope_percent,
+            "soil_depth": factors.soil_depth,
+            "drainage": factors.drainage,
+            "land_use": land_use
+        },
+        "fallbacks": factors.fallbacks,
+        "providers": factors.providers,
+        "mechanical_measures": mechanical_measures,
+        "erosion_risk": erosion_risk
+    }
+
+
+def analyze_point(lat, lon, land_use, rule_file):
+    """
+    Full /analyze pipeline for one point.
+    """
+    with stage("factors"):
+        factors = build_factors_concurrent(
+            lat=lat,
+            lon=lon,
+            land_use=land_use
+        )
+
+    with stage("arability"):
+        arability = is_arable_land(
+            lat=lat,
+            lon=lon,
+            slope_percent=factors.slope_percent
+        )
+
+    return analyze_factors(factors, arability, rule_file)
+
+
+async def analyze_point_async(lat, lon, land_use, rule_file, deadline_s=FACTOR_DEADLINE_S):
+    """
+    analyze_point on an event loop: many analyses share one loop and
+    connection pool, and cancelling the task aborts its upstream calls.
+    """
+    with stage("factors"):
+        factors = await build_factors_async(
+            lat=lat,
+            lon=lon,
+            land_use=land_use,
+            deadline_s=deadline_s
+        )
+
+    with stage("arability"):
+        arability = await is_arable_land_async(
+            lat=lat,
+            lon=lon,
+            slope_percent=factors.slope_percent
+        )
+
+    return analyze_factors(factors, arability, rule_file)
+
+
+# ------------------------------------------------------------------
+# BATCH
+# ------------------------------------------------------------------
+
+def _error(index, message, record=None):
+    item = {"index": index, "status": "ERROR", "message": message}
+    if isinstance(record, dict):
+        item["input"] = {k: record.get(k) for k in ("lat", "lon", "land_use")}
+    return item
+
+
+def parse_batch_record(record):
+    """
+    Validated (lat, lon, land_use) of one batch record.
+
+    Raises:
+        ValueError with a client-facing message
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Each record must be an object")
+
+    lat, lon, land_use = record.get("lat"), record.get("lon"), record.get("land_use")
+    if lat is None or lon is None or land_use is None:
+        raise ValueError("lat, lon and land_use are required")
+
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        raise ValueError("lat and lon must be numbers")
+
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("lat/lon out of range")
+
+    return lat, lon, land_use
+
+
+def _resource_groups(lats, lons):
+    """
+    Distinct upstream resources touched by a set of points.
+    """
+    tiles = {
+        tuple(int(math.floor(v)) for v in latlon_to_tile_fraction(lat, lon, DEFAULT_ZOOM))
+        for lat, lon in zip(lats.tolist(), lons.tolist())
+    }
+    cells = {power_cell(lat, lon) for lat, lon in zip(lats.tolist(), lons.tolist())}
+    return {"points": len(lats), "dem_tiles": len(tiles), "rainfall_cells": len(cells)}
+
+
+def measure_points(lats, lons, timings):
+    """
+    Slope, rainfall and arability of distinct points, in bulk.
+
+    Returns:
+        (slopes, rainfall, failed, fallbacks, providers, is_arable, reasons):
+        failed lists the sensors that fell back for each point and
+        fallbacks their reasons (counted in FALLBACKS once per point),
+        providers maps its measured factors to the provider that answered
+    """
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        timings[f"{name}_ms"] = timings.get(f"{name}_ms", 0.0) + elapsed * 1000
+        record_stage(f"batch_{name}", elapsed)
+        return result
+
+    with collect_providers() as answered:
+        slopes, slope_fb = timed("slope", fetch_slope_percent_many, lats, lons)
+        rainfall, rain_fb = timed("rainfall", fetch_rainfall_mm_many, lats, lons)
+    is_arable, reasons = timed("arability", is_arable_land_batch, lats, lons, slopes)
+
+    failed = [
+        [name for name, fb in (("rainfall", r), ("slope", s)) if fb]
+        for r, s in zip(rain_fb.tolist(), slope_fb.tolist())
+    ]
+    fallbacks = [fallback_reasons(names) for names in failed]
+
+    # Array lookups record one provider name (or None) per point
+    providers = [
+        {FACTOR_FIELDS[name]: names[k] for name, names in answered.items() if names[k] is not None}
+        for k in range(len(lats))
+    ]
+    return slopes, rainfall, failed, fallbacks, providers, is_arable, reasons
+
+
+def analyze_batch(records, rule_file, decimals=BATCH_COORD_DECIMALS):
+    """
+    /analyze for a list of {lat, lon, land_use} records.
+
+    Coordinates are rounded to `decimals` and deduplicated; each distinct
+    point is measured once and each distinct (point, land use) evaluated
+    once. Invalid records get status ERROR without failing the batch.
+
+    Returns:
+        {"results": [...] in input order (each with "index"),
+         "summary": {counts per status, groups, timings}}
+    """
+    start = time.perf_counter()
+    timings = {}
+
+    results = [None] * len(records)
+    points = {}  # (qlat, qlon) -> point id
+    evaluations = {}  # (point id, land_use) -> [record indices]
+
+    for index, record in enumerate(records):
+        try:
+            lat, lon, land_use = parse_batch_record(record)
+        except ValueError as e:
+            results[index] = _error(index, str(e), record)
+            continue
+
+        key = (round(lat, decimals), round(lon, decimals))
+        point = points.setdefault(key, len(points))
+        try:
+            evaluations.setdefault((point, land_use), []).append(index)
+        except TypeError:
+            results[index] = _error(index, "land_use must be a string", record)
+
+    coords = np.array(list(points), dtype=np.float64).reshape(-1, 2)
+    lats, lons = coords[:, 0], coords[:, 1]
+    groups = _resource_groups(lats, lons)
+
+    try:
+        if points:
+            (slopes, rainfall, failed, fallbacks,
+             providers, is_arable, reasons) = measure_points(lats, lons, timings)
+    except Exception as e:
+        print("Batch measurement failed:", e)
+        for indices in evaluations.values():
+            for index in indices:
+                results[index] = _error(index, "Analysis failed", records[index])
+        evaluations = {}
+
+    eval_start = time.perf_counter()
+
+    for (point, land_use), indices in evaluations.items():
+        lat, lon = float(lats[point]), float(lons[point])
+
+        try:
+            factors = factors_from_measurements(
+                lat, lon, land_use, float(rainfall[point]), float(slopes[point]),
+                timings={"failed": failed[point]} if failed[point] else {},
+                fallbacks=fallbacks[point],
+                providers=providers[point]
+            )
+            body = analyze_factors(
+                factors, (bool(is_arable[point]), reasons[point]), rule_file
+            )
+        except Exception as e:
+            print("Batch item failed:", e)
+            body = None
+
+        for index in indices:
+            if body is None:
+                results[index] = _error(index, "Analysis failed", records[index])
+            else:
+                # Each item echoes its own (unquantized) input
+                results[index] = {
+                    "index": index,
+                    **body,
+                    "input": {k: records[index].get(k) for k in ("lat", "lon", "land_use")}
+                }
+
+    timings["evaluate_ms"] = (time.perf_counter() - eval_start) * 1000
+    timings["total_ms"] = (time.perf_counter() - start) * 1000
+
+    counts = {"OK": 0, "NON_ARABLE": 0, "ERROR": 0}
+    for item in results:
+        counts[item["status"]] += 1
+
+    return {
+        "results": results,
+        "summary": {
+            "count": len(records),
+            "counts": counts,
+            "unique_points": len(points),
+            "groups": groups,
+            "timings": {k: round(v, 2) for k, v in timings.items()}
+        }
+    }
@@ -0,0 +1,540 @@
+"""
+Region Analysis
+---------------
+Arability, erosion risk and ICAR measures for every cell of a regular
+lat/lon grid over a bbox or GeoJSON polygon.
+
+Cells are processed in row strips through the array versions of the
+sensors, the arability check and the engines, so the working set is one
+strip plus the compact output grids (bounded by REGION_MEMORY_BUDGET_MB).
+"""
+
+import io
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from affine import Affine
+from rasterio.io import MemoryFile
+
+from engine.erosion_risk_engine import compute_erosion_risk_array
+from engine.factor_arrays import code_index, encode_categories
+from engine.rule_engine import evaluate_rules_array, get_rule_set
+from geo.arable_classifier import is_arable_land_batch
+from geo.geometry import inside_row, polygon_rings, ring_edges
+from geo.metrics import record_stage
+from geo.sensors.rainfall_sensor import fetch_rainfall_mm_many
+from geo.sensors.slope_sensor import fetch_slope_percent_many
+from geo.sensors.soil_depth_sensor import fetch_soil_depth_class_many
+from geo.sensors.soil_drainage_sensor import fetch_soil_drainage_many
+
+# Output grids of one request (plus one serialized copy) must fit here
+REGION_MEMORY_BUDGET_MB = float(os.getenv("SWC_REGION_MEMORY_MB", 256))
+
+# Cells evaluated together in one strip
+REGION_CHUNK_CELLS = int(os.getenv("SWC_REGION_CHUNK_CELLS", 65536))
+
+METERS_PER_DEG_LAT = 111320.0
+
+# Output grids and their dtypes; categorical grids index legends[name]
+GRID_DTYPES = {
+    "status": np.uint8,
+    "reason": np.uint8,
+    "recommendation": np.uint16,
+    "erosion_level": np.uint8,
+    "soil_depth": np.uint8,
+    "drainage": np.uint8,
+    "fallback": np.uint8,
+    "slope_percent": np.float32,
+    "rainfall_mm": np.float32,
+    "erosion_score": np.float32,
+}
+
+CATEGORICAL_GRIDS = [
+    "status", "reason", "recommendation", "erosion_level",
+    "soil_depth", "drainage", "fallback"
+]
+
+STATUS_LEGEND = ["OUTSIDE", "OK", "NON_ARABLE"]
+STATUS_OK = 1
+STATUS_NON_ARABLE = 2
+
+# Bit flags of the "fallback" grid
+FALLBACK_SLOPE = 1
+FALLBACK_RAINFALL = 2
+
+# Grid bytes per cell, plus a float32 copy per band when serializing
+BYTES_PER_CELL = sum(np.dtype(d).itemsize for d in GRID_DTYPES.values()) + 4 * len(GRID_DTYPES)
+
+# RLE JSON holds each run as two Python ints (list slot + int object)
+# and then their JSON text; checked per region before encoding
+RLE_BYTES_PER_RUN = 2 * (8 + 28 + 8)
+
+
+# ------------------------------------------------------------------
+# REGION GEOMETRY
+# ------------------------------------------------------------------
+
+def parse_region(data):
+    """
+    Region of a request: {"bbox": [west, south, east, north]} or
+    {"polygon": GeoJSON Polygon / MultiPolygon / Feature} (lon, lat).
+
+    Returns:
+        (bbox, rings): rings is None for a plain bbox
+    """
+    if data.get("polygon") is not None:
+        rings = polygon_rings(data["polygon"])
+        pts = np.vstack(rings)
+        bbox = (pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max())
+    elif data.get("bbox") is not None:
+        rings = None
+        try:
+            bbox = tuple(float(v) for v in data["bbox"])
+        except (TypeError, ValueError):
+            raise ValueError("bbox must be [west, south, east, north]")
+        if len(bbox) != 4:
+            raise ValueError("bbox must be [west, south, east, north]")
+    else:
+        raise ValueError("bbox or polygon is required")
+
+    west, south, east, north = bbox
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise ValueError("Invalid region bounds")
+
+    return tuple(float(v) for v in bbox), rings
+
+
+@dataclass
+class RegionGrid:
+    """
+    Regular EPSG:4326 grid; cell (row, col) is centred on
+    (north - (row + 0.5) * dlat, west + (col + 0.5) * dlon).
+    """
+    west: float
+    north: float
+    dlon: float
+    dlat: float
+    width: int
+    height: int
+
+    @classmethod
+    def from_bbox(cls, bbox, resolution_m):
+        """
+        Grid of roughly resolution_m cells (metres at the bbox centre).
+        """
+        if not resolution_m or not math.isfinite(resolution_m) or resolution_m <= 0:
+            raise ValueError("resolution_m must be positive")
+
+        west, south, east, north = bbox
+        dlat = resolution_m / METERS_PER_DEG_LAT
+        dlon = dlat / max(math.cos(math.radians((south + north) / 2)), 1e-6)
+
+        return cls(
+            west=west,
+            north=north,
+            dlon=dlon,
+            dlat=dlat,
+            width=max(1, math.ceil((east - west) / dlon)),
+            height=max(1, math.ceil((north - south) / dlat))
+        )
+
+    @property
+    def transform(self):
+        # Affine (a, b, c, d, e, f)
+        return (self.dlon, 0.0, self.west, 0.0, -self.dlat, self.north)
+
+    @property
+    def cells(self):
+        return self.width * self.height
+
+    def lats(self, r0, r1):
+        return self.north - (np.arange(r0, r1) + 0.5) * self.dlat
+
+    def lons(self):
+        return self.west + (np.arange(self.width) + 0.5) * self.dlon
+
+
+# ------------------------------------------------------------------
+# ANALYSIS
+# ------------------------------------------------------------------
+
+class _Legend:
+    """
+    Grows a code -> label list; code 0 is reserved for "no value".
+    """
+
+    def __init__(self, first=None):
+        self.labels = [first]
+        self._codes = {}
+
+    def codes(self, keys, labels=None):
+        if labels is None:
+            # String labels: look up each distinct value once; missing
+            # (None) values get code 0
+            inverse, vocab = encode_categories(keys)
+            codes = np.append(self.codes(vocab, vocab), 0)
+            return codes[code_index(inverse, vocab)]
+
+        out = np.empty(len(keys), dtype=np.int64)
+        for k, (key, label) in enumerate(zip(keys, labels)):
+            code = self._codes.get(key)
+            if code is None:
+                code = self._codes[key] = len(self.labels)
+                self.labels.append(label)
+            out[k] = code
+        return out
+
+
+@dataclass
+class RegionResult:
+    grid: RegionGrid
+    grids: dict
+    legends: dict
+    summary: dict = field(default_factory=dict)
+
+
+def _timed_stage(timings, name, fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    elapsed = time.perf_counter() - start
+    timings[name] = timings.get(name, 0.0) + elapsed * 1000
+    record_stage(f"region_{name.removesuffix('_ms')}", elapsed)
+    return value
+
+
+def analyze_cells(lats, lons, land_use, rule_set, legends, timings):
+    """
+    Array pipeline for one strip of cells.
+
+    Returns:
+        {grid name: 1-D array} for the given cells
+    """
+    n = len(lats)
+    out = {name: np.zeros(n, dtype=dtype) for name, dtype in GRID_DTYPES.items()}
+    for name in ("slope_percent", "rainfall_mm", "erosion_score"):
+        out[name][:] = np.nan
+
+    slope, slope_fb = _timed_stage(timings, "slope_ms", fetch_slope_percent_many, lats, lons)
+    rainfall, rain_fb = _timed_stage(timings, "rainfall_ms", fetch_rainfall_mm_many, lats, lons)
+
+    out["slope_percent"][:] = slope
+    out["rainfall_mm"][:] = rainfall
+    out["fallback"][:] = slope_fb * FALLBACK_SLOPE | rain_fb * FALLBACK_RAINFALL
+
+    arable, reasons = _timed_stage(
+        timings, "arability_ms", is_arable_land_batch, lats, lons, slope
+    )
+    out["status"][:] = np.where(arable, STATUS_OK, STATUS_NON_ARABLE)
+    out["reason"][~arable] = legends["reason"].codes(reasons[~arable].tolist())
+
+    ok = np.flatnonzero(arable)
+    if ok.size == 0:
+        return out
+
+    start = time.perf_counter()
+
+    soil_depth = fetch_soil_depth_class_many(slope[ok])
+    drainage = fetch_soil_drainage_many(slope[ok], rainfall[ok])
+    out["soil_depth"][ok] = legends["soil_depth"].codes(soil_depth.tolist())
+    out["drainage"][ok] = legends["drainage"].codes(drainage.tolist())
+
+    soil_codes, soil_vocab = encode_categories(soil_depth)
+    drainage_codes, drainage_vocab = encode_categories(drainage)
+    vocabs = {"soil_depth": soil_vocab, "drainage": drainage_vocab, "land_use": [land_use]}
+
+    rules = evaluate_rules_array(
+        rule_set, slope[ok], rainfall[ok],
+        soil_codes, drainage_codes, np.zeros(ok.size, dtype=np.int64), vocabs
+    )
+
+    # One recommendation class per distinct (mode, matched rules) combination
+    packed = np.packbits(np.vstack([rules["strict"][None, :], rules["matches"]]), axis=0).T
+    combos, inverse = np.unique(packed, axis=0, return_inverse=True)
+
+    keys, labels = [], []
+    for combo in combos:
+        bits = np.unpackbits(combo)[:len(rule_set.rules) + 1].astype(bool)
+        keys.append(combo.tobytes())
+        labels.append({
+            "mode": "STRICT" if bits[0] else "RELAXED",
+            "measures": [m for m, hit in zip(rule_set.measures, bits[1:]) if hit]
+        })
+    out["recommendation"][ok] = legends["recommendation"].codes(keys, labels)[inverse.reshape(-1)]
+
+    erosion = compute_erosion_risk_array(
+        rainfall[ok], slope[ok], soil_codes, drainage_codes, vocabs
+    )
+    out["erosion_score"][ok] = erosion["score"]
+    out["erosion_level"][ok] = legends["erosion_level"].codes(erosion["level"].tolist())
+
+    timings["rules_ms"] = timings.get("rules_ms", 0.0) + (time.perf_counter() - start) * 1000
+    return out
+
+
+def iter_region_strips(grid, rings=None, chunk_cells=REGION_CHUNK_CELLS):
+    """
+    Row strips of at most chunk_cells cells (at least one row).
+
+    Yields:
+        (r0, r1, lats, lons, inside): flattened cell centres of rows
+        r0..r1-1 and whether each lies in the region
+    """
+    rows_per_strip = max(1, chunk_cells // grid.width)
+    edges = ring_edges(rings) if rings else None
+    row_lons = grid.lons()
+
+    for r0 in range(0, grid.height, rows_per_strip):
+        r1 = min(r0 + rows_per_strip, grid.height)
+        row_lats = grid.lats(r0, r1)
+
+        if edges is None:
+            inside = np.ones((r1 - r0, grid.width), dtype=bool)
+        else:
+            inside = np.vstack([inside_row(lat, row_lons, edges) for lat in row_lats])
+
+        lats = np.repeat(row_lats, grid.width)
+        lons = np.tile(row_lons, r1 - r0)
+
+        yield r0, r1, lats, lons, inside.reshape(-1)
+
+
+def _empty_grids(cells):
+    grids = {name: np.zeros(cells, dtype=dtype) for name, dtype in GRID_DTYPES.items()}
+    for name in ("slope_percent", "rainfall_mm", "erosion_score"):
+        grids[name][:] = np.nan
+    return grids
+
+
+def check_region_budget(grid, budget_mb=REGION_MEMORY_BUDGET_MB):
+    max_cells = int(budget_mb * 1024 * 1024 // BYTES_PER_CELL)
+    if grid.cells > max_cells:
+        raise ValueError(
+            f"Region has {grid.cells} cells; at most {max_cells} fit the "
+            f"{budget_mb:g} MB budget (use a coarser resolution_m)"
+        )
+
+
+class RegionJob:
+    """
+    One region analysis, produced strip by strip.
+
+    analyze_region buffers the strips into full grids; streaming
+    consumers (engine/streaming.py) emit each strip as it completes,
+    so only one strip is held at a time.
+    """
+
+    def __init__(self, bbox, resolution_m, land_use, rule_file, rings=None,
+                 chunk_cells=REGION_CHUNK_CELLS):
+        self.grid = RegionGrid.from_bbox(bbox, resolution_m)
+        self.land_use = land_use
+        self.rings = rings
+        self.chunk_cells = chunk_cells
+        self.rule_set = get_rule_set(rule_file)
+
+        self.legends = {
+            "status": STATUS_LEGEND,
+            "reason": _Legend(),
+            "recommendation": _Legend(),
+            "erosion_level": _Legend(),
+            "soil_depth": _Legend(),
+            "drainage": _Legend(),
+            "fallback": {"slope": FALLBACK_SLOPE, "rainfall": FALLBACK_RAINFALL},
+        }
+        self.timings = {}
+        self.counts = {label: 0 for label in STATUS_LEGEND}
+        self.fallbacks = {"slope": 0, "rainfall": 0}
+        self._start = time.perf_counter()
+
+    def strips(self):
+        """
+        Yields:
+            (r0, r1, grids): 2-D grids of rows r0..r1-1
+        """
+        grid = self.grid
+
+        for r0, r1, lats, lons, inside in iter_region_strips(grid, self.rings, self.chunk_cells):
+            strip = _empty_grids((r1 - r0) * grid.width)
+
+            if inside.any():
+                cells = analyze_cells(
+                    lats[inside], lons[inside], self.land_use,
+                    self.rule_set, self.legends, self.timings
+                )
+                for name, values in cells.items():
+                    strip[name][inside] = values
+
+            self.count(strip["status"], strip["fallback"])
+            yield r0, r1, {name: g.reshape(r1 - r0, grid.width) for name, g in strip.items()}
+
+    def count(self, status, fallback):
+        for code, label in enumerate(STATUS_LEGEND):
+            self.counts[label] += int(np.count_nonzero(status == code))
+        self.fallbacks["slope"] += int(np.count_nonzero(fallback & FALLBACK_SLOPE))
+        self.fallbacks["rainfall"] += int(np.count_nonzero(fallback & FALLBACK_RAINFALL))
+
+    def legend_labels(self):
+        return {
+            name: legend.labels if isinstance(legend, _Legend) else legend
+            for name, legend in self.legends.items()
+        }
+
+    def summary(self):
+        return {
+            "cells": self.grid.cells,
+            "counts": dict(self.counts),
+            "fallbacks": dict(self.fallbacks),
+            "timings": {
+                **{k: round(v, 2) for k, v in self.timings.items()},
+                "total_ms": round((time.perf_counter() - self._start) * 1000, 2)
+            }
+        }
+
+
+def analyze_region(bbox, resolution_m, land_use, rule_file, rings=None,
+                   chunk_cells=REGION_CHUNK_CELLS, budget_mb=REGION_MEMORY_BUDGET_MB):
+    """
+    Analyze every grid cell of a region (see parse_region).
+
+    Returns:
+        RegionResult with 2-D grids (GRID_DTYPES), their legends and a
+        summary (cell counts per status, fallbacks, stage timings)
+    """
+    job = RegionJob(bbox, resolution_m, land_use, rule_file, rings, chunk_cells)
+    grid = job.grid
+    check_region_budget(grid, budget_mb)
+
+    grids = {
+        name: values.reshape(grid.height, grid.width)
+        for name, values in _empty_grids(grid.cells).items()
+    }
+    for r0, r1, strip in job.strips():
+        for name, values in strip.items():
+            grids[name][r0:r1] = values
+
+    return RegionResult(
+        grid=grid,
+        grids=grids,
+        legends=job.legend_labels(),
+        summary=job.summary()
+    )
+
+
+# ------------------------------------------------------------------
+# ENCODINGS
+# ------------------------------------------------------------------
+
+def _header(result):
+    grid = result.grid
+    return {
+        "crs": "EPSG:4326",
+        "transform": list(grid.transform),
+        "width": grid.width,
+        "height": grid.height,
+        "legends": result.legends,
+        "summary": result.summary
+    }
+
+
+def run_length_encode(values):
+    """
+    Row-major runs of a grid as a flat [value, run, value, run, ...] list.
+    """
+    flat = np.asarray(values).reshape(-1)
+    if flat.size == 0:
+        return []
+
+    starts = np.concatenate([[0], np.flatnonzero(flat[1:] != flat[:-1]) + 1])
+    runs = np.diff(np.append(starts, flat.size))
+
+    pairs = np.empty(2 * len(starts), dtype=np.int64)
+    pairs[0::2] = flat[starts]
+    pairs[1::2] = runs
+    return pairs.tolist()
+
+
+def count_runs(values):
+    flat = np.asarray(values).reshape(-1)
+    if flat.size == 0:
+        return 0
+    return int(np.count_nonzero(flat[1:] != flat[:-1])) + 1
+
+
+def check_rle_budget(result, budget_mb=REGION_MEMORY_BUDGET_MB):
+    """
+    Refuse RLE JSON whose run lists would not fit the memory budget
+    (up to two ints per cell and grid for fragmented regions).
+    """
+    runs = sum(count_runs(result.grids[name]) for name in CATEGORICAL_GRIDS)
+    needed_mb = runs * RLE_BYTES_PER_RUN / (1024 * 1024)
+    if needed_mb > budget_mb:
+        raise ValueError(
+            f"Run-length encoded JSON needs ~{needed_mb:.0f} MB, over the "
+            f"{budget_mb:g} MB budget (use format npz or geotiff, or a coarser resolution_m)"
+        )
+
+
+def run_length_decode(pairs, shape):
+    pairs = np.asarray(pairs, dtype=np.int64)
+    return np.repeat(pairs[0::2], pairs[1::2]).reshape(shape)
+
+
+def to_rle_json(result, budget_mb=REGION_MEMORY_BUDGET_MB):
+    """
+    Categorical grids run-length encoded (continuous grids are only in
+    the NPZ / GeoTIFF encodings). Raises ValueError when the encoding
+    would exceed the memory budget (see check_rle_budget).
+    """
+    check_rle_budget(result, budget_mb)
+
+    return {
+        **_header(result),
+        "encoding": "rle",
+        "grids": {
+            name: run_length_encode(result.grids[name])
+            for name in CATEGORICAL_GRIDS
+        }
+    }
+
+
+def to_npz(result):
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf,
+        header=np.array(json.dumps(_header(result))),
+        **result.grids
+    )
+    return buf.getvalue()
+
+
+def to_geotiff(result):
+    """
+    One float32 band per grid (band descriptions = grid names),
+    legends and summary in the "swc_header" tag.
+    """
+    grid = result.grid
+    names = list(GRID_DTYPES)
+
+    profile = {
+        "driver": "GTiff",
+        "width": grid.width,
+        "height": grid.height,
+        "count": len(names),
+        "dtype": "float32",
+        "crs": "EPSG:4326",
+        "transform": Affine(*grid.transform),
+        "compress": "deflate",
+        "tiled": grid.width >= 256 and grid.height >= 256,
+        "nodata": np.nan
+    }
+
+    with MemoryFile() as mem:
+        with mem.open(**profile) as dst:
+            for band, name in enumerate(names, start=1):
+                dst.write(result.grids[name].astype(np.float32), band)
+                dst.set_band_description(band, name)
+            dst.update_tags(swc_header=json.dumps(_header(result)))
+        return mem.read()
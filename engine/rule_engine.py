@@ -1,4 +1,12 @@
 import json
+import math
+import os
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+from engine.factor_arrays import code_index
 
 
 def load_rules(path):
@@ -25,13 +33,16 @@ def rule_matches(rule, factors, ignore_land_use=False):
         return False
     if "rainfall_max" in rule and rainfall > rule["rainfall_max"]:
         return False
+    if "rainfall_range" in rule:
+        lo, hi = rule["rainfall_range"]
+        if not (lo <= rainfall <= hi):
+            return False
 
     # ---- soil depth ----
     if soil_depth not in rule["soil_depth"]:
         return False
 
-    # ---- drainage ----
-# ---- drainage (optional constraint) ----
+    # ---- drainage (optional constraint) ----
     if "drainage" in rule:
         if drainage not in rule["drainage"]:
             return False
@@ -45,30 +56,300 @@ def rule_matches(rule, factors, ignore_land_use=False):
     return True
 
 
-def evaluate_rules(factors, rule_file):
-    rules = load_rules(rule_file)
+# ------------------------------------------------------------------
+# COMPILED RULE SET
+# ------------------------------------------------------------------
+
+# Distinct categorical values remembered per field (inputs are free text)
+MAX_MEMO_VALUES = 1024
+
+
+def _interval(rule, max_key, min_key, range_key):
+    """
+    Closed interval [lo, hi] a rule allows on one numeric factor,
+    and whether a NaN input would pass it (as it does in rule_matches).
+    """
+    lo, hi = -math.inf, math.inf
+    nan_passes = True
+
+    if max_key in rule:
+        hi = min(hi, rule[max_key])
+    if min_key and min_key in rule:
+        lo = max(lo, rule[min_key])
+    if range_key in rule:
+        a, b = rule[range_key]
+        lo, hi = max(lo, a), min(hi, b)
+        nan_passes = False
+
+    return lo, hi, nan_passes
+
+
+class IntervalIndex:
+    """
+    Bitmasks of the rules whose closed interval contains a value.
+
+    The sorted interval endpoints split the axis into slots (each
+    endpoint, and each open gap between endpoints); every slot stores
+    the bitmask of rules it satisfies, so a lookup is one bisect.
+    """
+
+    def __init__(self, intervals):
+        self.breakpoints = sorted({
+            v for lo, hi, _ in intervals for v in (lo, hi) if math.isfinite(v)
+        })
+
+        B = self.breakpoints
+        reps = []
+        for i in range(len(B) + 1):
+            # gap before B[i]
+            if not B:
+                reps.append(0.0)
+            elif i == 0:
+                reps.append(B[0] - 1)
+            elif i == len(B):
+                reps.append(B[-1] + 1)
+            else:
+                reps.append((B[i - 1] + B[i]) / 2)
+            # the endpoint itself
+            if i < len(B):
+                reps.append(B[i])
+
+        self.masks = [
+            sum(1 << k for k, (lo, hi, _) in enumerate(intervals) if lo <= v <= hi)
+            for v in reps
+        ]
+        self.nan_mask = sum(
+            1 << k for k, (_, _, nan_passes) in enumerate(intervals) if nan_passes
+        )
+
+    def slot(self, value):
+        i = bisect_left(self.breakpoints, value)
+        if i < len(self.breakpoints) and self.breakpoints[i] == value:
+            return 2 * i + 1
+        return 2 * i
+
+    def lookup(self, value):
+        if value != value:
+            return self.nan_mask
+        return self.masks[self.slot(value)]
+
+
+class CompiledRuleSet:
+    """
+    Rules indexed for lookup: sorted intervals on slope and rainfall,
+    memoized membership bitmasks on soil depth, drainage and land use.
+    One pass yields both the strict and the relaxed answer.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.measures = [r["measure"] for r in rules]
+
+        self.slope_index = IntervalIndex([
+            _interval(r, "slope_max", None, "slope_range") for r in rules
+        ])
+        self.rainfall_index = IntervalIndex([
+            _interval(r, "rainfall_max", "rainfall_min", "rainfall_range") for r in rules
+        ])
+
+        self._memo = {"soil_depth": {}, "drainage": {}, "land_use": {}}
+        self._optional = {"soil_depth": False, "drainage": True, "land_use": False}
+
+    def category_mask(self, field, value):
+        """
+        Bitmask of rules whose `field` admits `value` (same `in` test as
+        rule_matches; rules without an optional field admit everything).
+        """
+        memo = self._memo[field]
+        try:
+            mask = memo.get(value)
+        except TypeError:
+            # Unhashable input: evaluate without memoizing
+            memo, mask = None, None
+        if mask is not None:
+            return mask
+
+        optional = self._optional[field]
+        mask = sum(
+            1 << k for k, r in enumerate(self.rules)
+            if (optional and field not in r) or value in r[field]
+        )
+        if memo is not None and len(memo) < MAX_MEMO_VALUES:
+            memo[value] = mask
+        return mask
+
+    def unlisted_mask(self, field):
+        """
+        Bitmask of rules admitting a `field` value that no rule lists:
+        those without the field, when it is optional.
+        """
+        if not self._optional[field]:
+            return 0
+        return sum(1 << k for k, r in enumerate(self.rules) if field not in r)
+
+    def match(self, slope, rainfall, soil_depth, drainage, land_use):
+        """
+        Returns:
+            (strict_mask, relaxed_mask) rule bitmasks
+        """
+        relaxed = (
+            self.slope_index.lookup(slope)
+            & self.rainfall_index.lookup(rainfall)
+            & self.category_mask("soil_depth", soil_depth)
+            & self.category_mask("drainage", drainage)
+        )
+        return relaxed & self.category_mask("land_use", land_use), relaxed
+
+    def measures_for(self, mask):
+        return [m for k, m in enumerate(self.measures) if mask >> k & 1]
+
+    def evaluate(self, factors):
+        strict, relaxed = self.match(
+            factors.slope_percent,
+            factors.rainfall_mm,
+            factors.soil_depth,
+            factors.drainage,
+            factors.land_use
+        )
 
-    # STAGE 1 — strict (with land use)
-    strict = [
-        r["measure"]
-        for r in rules
-        if rule_matches(r, factors, ignore_land_use=False)
-    ]
+        if strict:
+            return {
+                "mode": "STRICT",
+                "measures": self.measures_for(strict)
+            }
 
-    if strict:
         return {
-            "mode": "STRICT",
-            "measures": strict
+            "mode": "RELAXED",
+            "measures": self.measures_for(relaxed)
         }
 
-    # STAGE 2 — relaxed (ignore land use)
-    relaxed = [
-        r["measure"]
-        for r in rules
-        if rule_matches(r, factors, ignore_land_use=True)
-    ]
+
+# ------------------------------------------------------------------
+# VECTORIZED EVALUATION
+# ------------------------------------------------------------------
+
+def rule_match_matrix(rule_set, slope, rainfall,
+                      soil_codes, drainage_codes, land_use_codes, vocabs):
+    """
+    rule_matches for columns of factors.
+
+    `vocabs` maps "soil_depth" / "drainage" / "land_use" to the
+    vocabulary each code column indexes (see engine.factor_arrays).
+
+    Returns:
+        (strict, relaxed): bool matrices of shape (rules, points)
+    """
+    slope = np.asarray(slope, dtype=np.float64)
+    rainfall = np.asarray(rainfall, dtype=np.float64)
+    rules = rule_set.rules
+
+    numeric = np.ones((len(rules), len(slope)), dtype=bool)
+
+    # Same comparisons as rule_matches (including NaN behaviour)
+    for k, rule in enumerate(rules):
+        ok = numeric[k]
+        if "slope_max" in rule:
+            ok &= ~(slope > rule["slope_max"])
+        if "slope_range" in rule:
+            lo, hi = rule["slope_range"]
+            ok &= (lo <= slope) & (slope <= hi)
+        if "rainfall_min" in rule:
+            ok &= ~(rainfall < rule["rainfall_min"])
+        if "rainfall_max" in rule:
+            ok &= ~(rainfall > rule["rainfall_max"])
+        if "rainfall_range" in rule:
+            lo, hi = rule["rainfall_range"]
+            ok &= (lo <= rainfall) & (rainfall <= hi)
+
+    def category(field, codes):
+        # One bitmask per vocabulary entry plus a MISSING slot (None,
+        # evaluated only when present), expanded to a (rules, vocab + 1) table
+        codes = code_index(codes, vocabs[field])
+        missing = bool(np.any(codes == len(vocabs[field])))
+        masks = [rule_set.category_mask(field, v) for v in vocabs[field]]
+        masks.append(rule_set.category_mask(field, None) if missing else 0)
+        table = np.array(
+            [[m >> k & 1 for m in masks] for k in range(len(rules))],
+            dtype=bool
+        ).reshape(len(rules), len(masks))
+        return table[:, codes]
+
+    relaxed = (
+        numeric
+        & category("soil_depth", soil_codes)
+        & category("drainage", drainage_codes)
+    )
+    strict = relaxed & category("land_use", land_use_codes)
+
+    return strict, relaxed
+
+
+def evaluate_rules_array(rule_set, slope, rainfall,
+                         soil_codes, drainage_codes, land_use_codes, vocabs):
+    """
+    evaluate_rules for columns of factors.
+
+    Returns:
+        {"strict": bool array (True -> STRICT, False -> RELAXED),
+         "matches": bool matrix (rules, points) of the selected stage}
+    """
+    strict, relaxed = rule_match_matrix(
+        rule_set, slope, rainfall, soil_codes, drainage_codes, land_use_codes, vocabs
+    )
+    is_strict = strict.any(axis=0)
 
     return {
-        "mode": "RELAXED",
-        "measures": relaxed
+        "strict": is_strict,
+        "matches": np.where(is_strict[None, :], strict, relaxed)
     }
+
+
+def measures_from_matrix(rule_set, matches, point):
+    """
+    Measures of one point from a match matrix (rule order preserved).
+    """
+    return [rule_set.measures[k] for k in np.flatnonzero(matches[:, point])]
+
+
+_COMPILED = {}
+_COMPILED_LOCK = threading.Lock()
+
+
+def compiled_for_file(path, kind, build):
+    """
+    Object built from a rules file by `build(rules)`, cached per
+    (path, kind) and rebuilt only when the file's mtime or size changes.
+    """
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    key = (path, kind)
+
+    cached = _COMPILED.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _COMPILED_LOCK:
+        cached = _COMPILED.get(key)
+        if cached is None or cached[0] != version:
+            cached = (version, build(load_rules(path)))
+            _COMPILED[key] = cached
+        return cached[1]
+
+
+def get_rule_set(path):
+    """
+    Compiled rules for a file; recompiled only when its mtime changes.
+    """
+    return compiled_for_file(path, "rule_set", CompiledRuleSet)
+
+
+def evaluate_rules(factors, rule_file):
+    """
+    STAGE 1 — strict (with land use)
+    STAGE 2 — relaxed (ignore land use), when nothing matches strictly
+
+    Answered from the precomputed decision table (engine/decision_table.py).
+    """
+    from engine.decision_table import get_decision_table
+
+    return get_decision_table(rule_file).evaluate(factors)
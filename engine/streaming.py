@@ -0,0 +1,228 @@
+"""
+Streaming Results
+-----------------
+NDJSON record streams for batch and region analyses.
+
+Work is pulled as the client consumes the stream (a WSGI server only
+asks for the next line once the previous one is written), and at most
+STREAM_MAX_IN_FLIGHT chunks are prepared ahead, so memory stays flat
+however large the job is. The last record is always a summary.
+"""
+
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from engine.pipeline import analyze_batch
+from engine.region import CATEGORICAL_GRIDS, run_length_encode
+
+# Records analyzed together (deduplicated within a chunk)
+STREAM_CHUNK_ITEMS = int(os.getenv("SWC_STREAM_CHUNK_ITEMS", 64))
+
+# Chunks being analyzed ahead of the one being written
+STREAM_MAX_IN_FLIGHT = int(os.getenv("SWC_STREAM_MAX_IN_FLIGHT", 2))
+
+# Streamed jobs hold one chunk at a time, so they may be far larger
+BATCH_STREAM_MAX_ITEMS = int(os.getenv("SWC_BATCH_STREAM_MAX_ITEMS", 100000))
+REGION_STREAM_MAX_CELLS = int(os.getenv("SWC_REGION_STREAM_MAX_CELLS", 50_000_000))
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+_STREAM_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="stream")
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, default=_json_default) + "\n"
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def parse_ndjson(lines):
+    """
+    Records of an NDJSON body; undecodable lines become None (reported
+    as per-item errors). Blank lines are skipped.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _merge_timings(total, timings):
+    for name, ms in timings.items():
+        total[name] = round(total.get(name, 0.0) + ms, 2)
+
+
+# ------------------------------------------------------------------
+# BATCH
+# ------------------------------------------------------------------
+
+def stream_batch(records, rule_file, chunk_items=STREAM_CHUNK_ITEMS,
+                 max_in_flight=STREAM_MAX_IN_FLIGHT, max_items=None, on_chunk=None):
+    """
+    analyze_batch over an iterable of records, chunk by chunk;
+    on_chunk(chunk), when given, sees each chunk as it is submitted.
+
+    Yields:
+        one {"type": "result", "index", "status", ...} per record (in
+        input order), then {"type": "summary", ...}
+    """
+    start = time.perf_counter()
+    counts = {"OK": 0, "NON_ARABLE": 0, "ERROR": 0}
+    timings = {}
+    unique_points = 0
+    offset = 0
+
+    def run(chunk):
+        return analyze_batch(chunk, rule_file)
+
+    source = iter(records)
+    if max_items is not None:
+        # One extra record tells a full job from a truncated one
+        source = islice(source, max_items + 1)
+    chunks = _chunks(source, chunk_items)
+
+    pending = deque()
+    submitted = 0
+    truncated = False
+
+    while True:
+        # Keep at most max_in_flight chunks submitted ahead
+        while len(pending) < max_in_flight and not truncated:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            if max_items is not None and submitted + len(chunk) > max_items:
+                chunk = chunk[:max_items - submitted]
+                truncated = True
+                if not chunk:
+                    break
+            submitted += len(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+            pending.append((_STREAM_POOL.submit(run, chunk), chunk))
+
+        if not pending:
+            break
+
+        future, chunk = pending.popleft()
+        try:
+            batch = future.result()
+        except Exception as e:
+            print("Batch chunk failed:", e)
+            batch = {
+                "results": [
+                    {"index": i, "status": "ERROR", "message": "Analysis failed"}
+                    for i in range(len(chunk))
+                ],
+                "summary": {"unique_points": 0, "timings": {}}
+            }
+
+        for item in batch["results"]:
+            counts[item["status"]] += 1
+            yield {"type": "result", **item, "index": offset + item["index"]}
+
+        unique_points += batch["summary"]["unique_points"]
+        _merge_timings(timings, batch["summary"]["timings"])
+        offset += len(chunk)
+
+    summary = {
+        "type": "summary",
+        "count": offset,
+        "counts": counts,
+        "unique_points": unique_points,
+        "timings": {**timings, "stream_ms": round((time.perf_counter() - start) * 1000, 2)}
+    }
+    if truncated:
+        summary["truncated"] = True
+        summary["message"] = f"Stopped after {offset} items (limit {max_items})"
+    yield summary
+
+
+# ------------------------------------------------------------------
+# REGION
+# ------------------------------------------------------------------
+
+def check_stream_size(job, max_cells=REGION_STREAM_MAX_CELLS):
+    if job.grid.cells > max_cells:
+        raise ValueError(
+            f"Region has {job.grid.cells} cells; at most {max_cells} can be "
+            "streamed (use a coarser resolution_m)"
+        )
+
+
+def stream_region(job):
+    """
+    A RegionJob as NDJSON records.
+
+    Yields:
+        {"type": "header", crs, transform, width, height},
+        one {"type": "rows", "row_start", "row_end", "grids": {name: rle}}
+        per strip (categorical grids, row-major runs),
+        then {"type": "summary", legends, counts, fallbacks, timings}
+    """
+    grid = job.grid
+
+    yield {
+        "type": "header",
+        "crs": "EPSG:4326",
+        "transform": list(grid.transform),
+        "width": grid.width,
+        "height": grid.height,
+        "encoding": "rle"
+    }
+
+    errors = 0
+    strips = job.strips()
+
+    while True:
+        try:
+            item = next(strips)
+        except StopIteration:
+            break
+        except Exception as e:
+            # A failed strip ends the job; the summary still follows
+            print("Region strip failed:", e)
+            errors += 1
+            break
+
+        r0, r1, strip = item
+        yield {
+            "type": "rows",
+            "row_start": r0,
+            "row_end": r1,
+            "grids": {name: run_length_encode(strip[name]) for name in CATEGORICAL_GRIDS}
+        }
+
+    summary = job.summary()
+    done = sum(summary["counts"].values())
+    summary["counts"]["ERROR"] = grid.cells - done if errors else 0
+
+    yield {
+        "type": "summary",
+        "legends": job.legend_labels(),
+        **summary
+    }
@@ -0,0 +1,79 @@
+"""
+Traffic Recording
+-----------------
+Appends the coordinates of served requests to a JSONL file, one
+{"lat", "lon", "land_use", "endpoint", "ts"} record per line: the
+format tools/loadgen.py replays, so capacity tests can reuse the
+coordinate locality of real traffic.
+
+Enabled by pointing SWC_TRAFFIC_LOG at a file; SWC_TRAFFIC_SAMPLE_RATE
+keeps only that fraction of requests. Each request's records (one, or
+the items of a batch) are written with a single O_APPEND write, so
+several worker processes can share one file.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+
+TRAFFIC_LOG_PATH = os.getenv("SWC_TRAFFIC_LOG")
+TRAFFIC_SAMPLE_RATE = float(os.getenv("SWC_TRAFFIC_SAMPLE_RATE", 1.0))
+
+RECORD_FIELDS = ("lat", "lon", "land_use")
+
+
+class TrafficRecorder:
+    def __init__(self, path=None, sample_rate=1.0, rng=random.random):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.rng = rng
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.path) and self.sample_rate > 0
+
+    def record(self, endpoint, payload):
+        """
+        Log one request payload (a dict with lat, lon, land_use).
+        Never raises: recording must not fail the request.
+        """
+        self.record_many(endpoint, [payload])
+
+    def record_many(self, endpoint, payloads):
+        """
+        Log the payloads of one request (e.g. the items of a batch),
+        each sampled on its own, with one write.
+        Never raises: recording must not fail the request.
+        """
+        if not self.enabled:
+            return
+
+        ts = round(time.time(), 3)
+        lines = [
+            json.dumps({
+                **{k: payload.get(k) for k in RECORD_FIELDS},
+                "endpoint": endpoint,
+                "ts": ts
+            }) + "\n"
+            for payload in payloads
+            if isinstance(payload, dict)
+            and (self.sample_rate >= 1 or self.rng() < self.sample_rate)
+        ]
+        if not lines:
+            return
+
+        try:
+            with self._lock:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, "".join(lines).encode())
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            print("Traffic recording failed:", e)
+
+
+TRAFFIC = TrafficRecorder(TRAFFIC_LOG_PATH, TRAFFIC_SAMPLE_RATE)
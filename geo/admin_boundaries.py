@@ -0,0 +1,93 @@
+# geo/admin_boundaries.py
+# Offline reverse geocoding from a state / district boundaries GeoJSON
+
+import json
+import os
+
+import numpy as np
+
+from geo.geometry import contains, polygon_rings, ring_edges
+
+ADMIN_BOUNDARIES_PATH = os.getenv(
+    "SWC_ADMIN_BOUNDARIES",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "data",
+        "admin",
+        "districts.geojson"
+    )
+)
+
+# Feature properties holding the state and district names, by common
+# distributions (own exports, Datameet / Survey of India, GADM)
+STATE_PROPERTIES = ("state", "STATE", "ST_NM", "NAME_1")
+DISTRICT_PROPERTIES = ("district", "DISTRICT", "dtname", "NAME_2")
+
+
+def _first(properties, keys):
+    for key in keys:
+        value = properties.get(key)
+        if value:
+            return value
+    return None
+
+
+class AdminBoundaries:
+    """
+    State / district polygons held in memory; a lookup tests the few
+    regions whose bounding box contains the point.
+    """
+
+    def __init__(self, path):
+        with open(path) as f:
+            features = json.load(f).get("features", [])
+
+        self.regions = []
+        boxes = []
+        for feature in features:
+            properties = feature.get("properties") or {}
+            state = _first(properties, STATE_PROPERTIES)
+            try:
+                rings = polygon_rings(feature.get("geometry"))
+            except ValueError:
+                continue
+            if not state:
+                continue
+
+            points = np.concatenate(rings)
+            boxes.append([points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()])
+            self.regions.append((state, _first(properties, DISTRICT_PROPERTIES), ring_edges(rings)))
+
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+    def lookup(self, lat, lon):
+        """
+        {"state", "district"} of the region containing the point, or
+        None outside every region.
+        """
+        b = self.boxes
+        candidates = np.flatnonzero(
+            (b[:, 0] <= lon) & (lon <= b[:, 2]) & (b[:, 1] <= lat) & (lat <= b[:, 3])
+        )
+        for k in candidates.tolist():
+            state, district, edges = self.regions[k]
+            if contains(edges, lon, lat):
+                return {"state": state, "district": district}
+        return None
+
+
+_BOUNDARIES = None
+_BOUNDARIES_LOADED = False
+
+
+def get_admin_boundaries(path=ADMIN_BOUNDARIES_PATH):
+    """
+    Process-wide AdminBoundaries, or None when no boundaries file exists.
+    """
+    global _BOUNDARIES, _BOUNDARIES_LOADED
+
+    if not _BOUNDARIES_LOADED:
+        _BOUNDARIES = AdminBoundaries(path) if os.path.exists(path) else None
+        _BOUNDARIES_LOADED = True
+
+    return _BOUNDARIES
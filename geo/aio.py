@@ -0,0 +1,112 @@
+# geo/aio.py
+# Shared asyncio runtime: one event loop thread per process multiplexes
+# the upstream I/O of every in-flight analysis over one aiohttp pool
+
+import asyncio
+import atexit
+import concurrent.futures
+import contextvars
+import os
+import threading
+import weakref
+
+import aiohttp
+
+from geo.http_client import HTTP_POOL_SIZE, aiohttp_trace_config
+
+# Open connections per process across all upstream hosts
+ASYNC_MAX_CONNECTIONS = int(os.getenv("SWC_ASYNC_MAX_CONNECTIONS", 64))
+
+_SESSIONS = weakref.WeakKeyDictionary()
+
+
+def get_session():
+    """
+    aiohttp session of the running event loop (created on first use).
+    """
+    loop = asyncio.get_running_loop()
+    session = _SESSIONS.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=ASYNC_MAX_CONNECTIONS, limit_per_host=HTTP_POOL_SIZE
+            ),
+            auto_decompress=True,
+            trace_configs=[aiohttp_trace_config()]
+        )
+        _SESSIONS[loop] = session
+    return session
+
+
+class AsyncRuntime:
+    """
+    Event loop running in a daemon thread (restarted after fork).
+
+    Synchronous callers block on `run`; async callers on other loops
+    (e.g. Flask async views) await `run_async`. Timing out or cancelling
+    either cancels the coroutine on the runtime loop, which aborts its
+    outstanding upstream requests.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                threading.Thread(
+                    target=self._loop.run_forever, name="swc-async", daemon=True
+                ).start()
+            return self._loop
+
+    def submit(self, coro):
+        # The coroutine sees the caller's context variables (e.g. the
+        # request's stage timings)
+        return asyncio.run_coroutine_threadsafe(
+            _in_context(coro, contextvars.copy_context()), self.loop
+        )
+
+    def run(self, coro, timeout=None):
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def run_async(self, coro):
+        future = self.submit(coro)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Client went away: stop the upstream calls too
+            future.cancel()
+            raise
+
+    def close(self, timeout=5):
+        """
+        Close the runtime loop's session (registered at exit).
+        """
+        if self._loop is None or self._pid != os.getpid() or not self._loop.is_running():
+            return
+        session = _SESSIONS.get(self._loop)
+        if session is not None and not session.closed:
+            try:
+                self.run(session.close(), timeout)
+            except Exception as e:
+                print("Closing async session failed:", e)
+
+
+async def _in_context(coro, ctx):
+    for var, value in ctx.items():
+        var.set(value)
+    return await coro
+
+
+RUNTIME = AsyncRuntime()
+atexit.register(RUNTIME.close)
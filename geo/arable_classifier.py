@@ -2,15 +2,23 @@
 # FINAL PRODUCTION VERSION
 # ESRI Global Land Cover based arable classification (ICAR-safe)
 
+import asyncio
 import os
-import rasterio
-from rasterio.warp import transform
 from collections import Counter
 
-LANDCOVER_DIR = os.path.join(
-    os.path.dirname(os.path.dirname(__file__)),
-    "data",
-    "landcover"
+import numpy as np
+
+from geo.cache import FACTOR_CACHE
+from geo.landcover_catalog import get_landcover_catalog
+from geo.landcover_mask import get_landcover_mask
+
+LANDCOVER_DIR = os.getenv(
+    "SWC_LANDCOVER_DIR",
+    os.path.join(
+        os.path.dirname(os.path.dirname(__file__)),
+        "data",
+        "landcover"
+    )
 )
 
 # ESRI Global Land Cover (Impact Observatory) — OFFICIAL CLASSES
@@ -32,15 +40,40 @@ ARABLE_CLASSES = {5}  # CROPLAND ONLY
 NON_ARABLE_CLASSES = set(ESRI_CLASS_LABELS.keys()) - ARABLE_CLASSES
 
 
-def _landcover_files():
-    files = [
-        os.path.join(LANDCOVER_DIR, f)
-        for f in os.listdir(LANDCOVER_DIR)
-        if f.lower().endswith(".tif")
-    ]
-    if not files:
-        raise RuntimeError("No ESRI land cover GeoTIFFs found")
-    return files
+def landcover_catalog():
+    """
+    Land cover tiles of LANDCOVER_DIR (opened and indexed once per process).
+    """
+    return get_landcover_catalog(LANDCOVER_DIR)
+
+
+def majority_class(window):
+    """
+    Majority ESRI class of a window, ignoring nodata (0).
+    Ties resolve to the class seen first in row-major order.
+    """
+    values = [int(v) for v in window.flatten() if v > 0]
+    if not values:
+        return None
+    return Counter(values).most_common(1)[0][0]
+
+
+def landcover_majority(lat, lon):
+    """
+    3x3 majority ESRI class at a point:
+    -1 outside coverage, 0 no valid data, else the class.
+    """
+    mask = get_landcover_mask()
+
+    if mask is not None:
+        # Precomputed 3x3 majority (tools/build_landcover_mask.py)
+        majority = mask.majority(lat, lon)
+        return -1 if majority is None else majority
+
+    window = landcover_catalog().sample(lat, lon)
+    if window is None:
+        return -1
+    return majority_class(window) or 0
 
 
 def is_arable_land(lat: float, lon: float, slope_percent: float):
@@ -53,46 +86,73 @@ def is_arable_land(lat: float, lon: float, slope_percent: float):
     if slope_percent > 33:
         return False, "Slope > 33% (ICAR non-arable)"
 
+    # 2️⃣ Land cover check (only the tile containing the point)
+    majority = FACTOR_CACHE.get("landcover", lat, lon)
+    if majority is None:
+        majority = landcover_majority(lat, lon)
+        FACTOR_CACHE.set("landcover", lat, lon, majority)
+
+    if majority < 0:
+        return False, "Location outside land cover coverage"
+
+    if not majority:
+        return False, "Invalid land cover data"
+
+    label = ESRI_CLASS_LABELS.get(majority, "UNKNOWN")
+
+    if majority in ARABLE_CLASSES:
+        return True, "Cropland (ESRI Land Cover)"
+
+    return False, f"Non-arable land cover ({label})"
+
+
+async def is_arable_land_async(lat: float, lon: float, slope_percent: float):
+    """
+    is_arable_land off the event loop (local raster / mask reads).
+    """
+    return await asyncio.to_thread(is_arable_land, lat, lon, slope_percent)
+
+
+def is_arable_land_batch(lats, lons, slopes):
+    """
+    Batch version of is_arable_land for arrays of points.
+
+    Points are reprojected together, grouped by land cover tile and
+    read block by block, and all 3x3 majorities are computed at once.
+
+    Returns:
+        (is_arable: bool array, reasons: object array), in input order
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    slopes = np.asarray(slopes, dtype=np.float64)
+    n = len(lats)
+
+    is_arable = np.zeros(n, dtype=bool)
+    reasons = np.empty(n, dtype=object)
+
+    # 1️⃣ ICAR hard constraint: slope
+    steep = slopes > 33
+    reasons[steep] = "Slope > 33% (ICAR non-arable)"
+
     # 2️⃣ Land cover check
-    for tif in _landcover_files():
-        with rasterio.open(tif) as src:
-            # Reproject point to raster CRS
-            try:
-                x, y = transform(
-                    "EPSG:4326",
-                    src.crs,
-                    [lon],
-                    [lat]
-                )
-                x, y = x[0], y[0]
-            except Exception:
-                continue
-
-            # Bounds check
-            if not (
-                src.bounds.left <= x <= src.bounds.right and
-                src.bounds.bottom <= y <= src.bounds.top
-            ):
-                continue
-
-            # Sample 3×3 window
-            row, col = src.index(x, y)
-            window = src.read(
-                1,
-                window=((row - 1, row + 2), (col - 1, col + 2)),
-                boundless=True
-            )
-
-            values = [int(v) for v in window.flatten() if v > 0]
-            if not values:
-                return False, "Invalid land cover data"
-
-            majority = Counter(values).most_common(1)[0][0]
-            label = ESRI_CLASS_LABELS.get(majority, "UNKNOWN")
-
-            if majority in ARABLE_CLASSES:
-                return True, "Cropland (ESRI Land Cover)"
-
-            return False, f"Non-arable land cover ({label})"
-
-    return False, "Location outside land cover coverage"
+    todo = np.flatnonzero(~steep)
+    if todo.size == 0:
+        return is_arable, reasons
+
+    mask = get_landcover_mask()
+    source = mask if mask is not None else landcover_catalog()
+    majority = source.majority_many(lats[todo], lons[todo])
+
+    for i, m in zip(todo, majority.tolist()):
+        if m < 0:
+            reasons[i] = "Location outside land cover coverage"
+        elif m == 0:
+            reasons[i] = "Invalid land cover data"
+        elif m in ARABLE_CLASSES:
+            is_arable[i] = True
+            reasons[i] = "Cropland (ESRI Land Cover)"
+        else:
+            reasons[i] = f"Non-arable land cover ({ESRI_CLASS_LABELS.get(m, 'UNKNOWN')})"
+
+    return is_arable, reasons
@@ -1,7 +1,237 @@
-CACHE = {}
+# geo/cache.py
+# Bounded, quantized cache of per-location factors (rainfall, slope, land cover)
 
-def get_cached(lat, lon):
-    return CACHE.get((lat, lon))
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 
-def set_cache(lat, lon, value):
-    CACHE[(lat, lon)] = value
+from geo.metrics import REGISTRY, family_header, sample_line
+
+DAY_S = 86400.0
+
+# Keys are coordinates rounded to this many decimals (4 -> ~11 m)
+FACTOR_CACHE_DECIMALS = int(os.getenv("SWC_FACTOR_CACHE_DECIMALS", 4))
+
+# In-process LRU capacity (entries across all sources)
+FACTOR_CACHE_MAX_ENTRIES = int(os.getenv("SWC_FACTOR_CACHE_MAX_ENTRIES", 50000))
+
+# Optional SQLite file shared by all worker processes (unset: per-process only)
+FACTOR_CACHE_PATH = os.getenv("SWC_FACTOR_CACHE")
+
+FACTOR_CACHE_ENABLED = os.getenv("SWC_FACTOR_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+def _ttl(source, default):
+    """
+    TTL (seconds) of a source, overridable with SWC_FACTOR_TTL_<SOURCE>;
+    None (or a value <= 0) means entries never expire.
+    """
+    value = os.getenv(f"SWC_FACTOR_TTL_{source.upper()}")
+    if value is None or value == "":
+        return default
+    value = float(value)
+    return value if value > 0 else None
+
+
+# Rainfall is a long-term climatology, slope is static terrain,
+# land cover is refreshed yearly
+SOURCE_TTLS = {
+    "rainfall": _ttl("rainfall", 180 * DAY_S),
+    "slope": _ttl("slope", None),
+    "landcover": _ttl("landcover", 365 * DAY_S),
+}
+
+
+class SQLiteFactorStore:
+    """
+    Factor entries shared by all processes through one SQLite file.
+    Values are stored as JSON.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS factors ("
+                "source TEXT, cell TEXT, value TEXT, expires REAL, "
+                "PRIMARY KEY (source, cell))"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, source, cell, now):
+        row = self._conn().execute(
+            "SELECT value, expires FROM factors WHERE source = ? AND cell = ?",
+            (source, cell)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, source, cell, value, expires):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO factors (source, cell, value, expires) "
+                "VALUES (?, ?, ?, ?)",
+                (source, cell, json.dumps(value), expires)
+            )
+
+
+class FactorCache:
+    """
+    Size-bounded LRU of factor values keyed on (source, quantized lat/lon),
+    with a TTL per source and an optional shared store behind it.
+
+    Points closer than the quantization step share one entry; the value
+    is whatever the first lookup in that cell measured.
+    """
+
+    def __init__(self, max_entries=FACTOR_CACHE_MAX_ENTRIES, decimals=FACTOR_CACHE_DECIMALS,
+                 ttls=None, shared=None, enabled=True, clock=time.time):
+        self.max_entries = max_entries
+        self.decimals = decimals
+        self.ttls = dict(SOURCE_TTLS if ttls is None else ttls)
+        self.shared = shared
+        self.enabled = enabled
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0
+        }
+        # {source: {"hits": n, "misses": n}}
+        self.source_stats = {}
+
+    def cell(self, lat, lon):
+        d = self.decimals
+        return f"{round(float(lat), d):.{d}f},{round(float(lon), d):.{d}f}"
+
+    def get(self, source, lat, lon):
+        """
+        Cached value, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+
+        key = (source, self.cell(lat, lon))
+        now = self.clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self._count(source, "hits")
+                    return value
+                del self._entries[key]
+                self.stats["expired"] += 1
+
+        if self.shared is not None:
+            try:
+                found = self.shared.get(source, key[1], now)
+            except Exception as e:
+                print("Shared factor cache read failed:", e)
+                found = None
+
+            if found is not None:
+                value, expires = found
+                self._store(key, value, expires)
+                with self._lock:
+                    self._count(source, "shared_hits")
+                return value
+
+        with self._lock:
+            self._count(source, "misses")
+        return None
+
+    def _count(self, source, name):
+        # Callers hold the lock
+        self.stats[name] += 1
+        counts = self.source_stats.setdefault(source, {"hits": 0, "shared_hits": 0, "misses": 0})
+        counts[name] += 1
+
+    def set(self, source, lat, lon, value):
+        if not self.enabled:
+            return
+
+        key = (source, self.cell(lat, lon))
+        ttl = self.ttls.get(source)
+        expires = None if ttl is None else self.clock() + ttl
+
+        self._store(key, value, expires)
+
+        if self.shared is not None:
+            try:
+                self.shared.set(source, key[1], value, expires)
+            except Exception as e:
+                print("Shared factor cache write failed:", e)
+
+    def _store(self, key, value, expires):
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def snapshot(self):
+        """
+        Copies of (stats, source_stats).
+        """
+        with self._lock:
+            return dict(self.stats), {s: dict(c) for s, c in self.source_stats.items()}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for name in self.stats:
+                self.stats[name] = 0
+            self.source_stats.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+FACTOR_CACHE = FactorCache(
+    shared=SQLiteFactorStore(FACTOR_CACHE_PATH) if FACTOR_CACHE_PATH else None,
+    enabled=FACTOR_CACHE_ENABLED
+)
+
+
+@REGISTRY.register_collector
+def _collect_factor_cache():
+    stats, source_stats = FACTOR_CACHE.snapshot()
+
+    lines = family_header(
+        "swc_factor_cache_lookups_total", "counter", "Factor cache lookups by source and result"
+    )
+    for source, counts in sorted(source_stats.items()):
+        for result, count in counts.items():
+            lines.append(sample_line(
+                "swc_factor_cache_lookups_total", {"source": source, "result": result}, count
+            ))
+
+    lines += family_header("swc_factor_cache_evictions_total", "counter", "LRU evictions")
+    lines.append(sample_line("swc_factor_cache_evictions_total", {}, stats["evictions"]))
+    lines += family_header("swc_factor_cache_entries", "gauge", "Entries held in memory")
+    lines.append(sample_line("swc_factor_cache_entries", {}, len(FACTOR_CACHE)))
+    return lines
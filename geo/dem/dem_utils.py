@@ -1,6 +1,98 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-import math
 
+# Web Mercator ground resolution at the equator for a 1-pixel-wide world
+EARTH_CIRCUMFERENCE_M = 40075016.686
+
+# Build a resumable work dir belongs to (see compute_slope_raster)
+WORK_MANIFEST = "manifest.json"
+
+
+# ------------------------------------------------------------------
+# TERRAIN-RGB DECODE
+# ------------------------------------------------------------------
+
+def decode_terrain_rgb(rgb):
+    """
+    Decode a whole Terrain-RGB image (H x W x 3|4, uint8)
+    to elevations (meters) as float32.
+    """
+    rgb = np.asarray(rgb)
+    packed = (
+        (rgb[..., 0].astype(np.uint32) << 16)
+        | (rgb[..., 1].astype(np.uint32) << 8)
+        | rgb[..., 2].astype(np.uint32)
+    )
+    return (packed * 0.1 - 10000).astype(np.float32)
+
+
+def tile_row_resolution(zoom, ytile, size):
+    """
+    Ground resolution (meters/pixel) of every row of a Web Mercator tile.
+    Returned as a (size, 1) column so it broadcasts over the tile.
+    """
+    n = 2 ** zoom
+    rows = ytile + (np.arange(size, dtype=np.float64) + 0.5) / size
+    lat = np.arctan(np.sinh(np.pi * (1 - 2 * rows / n)))
+    res = EARTH_CIRCUMFERENCE_M * np.cos(lat) / (size * n)
+    return res.astype(np.float32)[:, None]
+
+
+# ------------------------------------------------------------------
+# SLOPE KERNEL
+# ------------------------------------------------------------------
+
+def slope_percent_grid(dem, x_res, y_res, pad=True):
+    """
+    Slope (%) raster using Horn's 3x3 method.
+
+    `x_res` / `y_res` are pixel sizes in meters: scalars, or arrays
+    that broadcast against the output (e.g. per-row Web Mercator sizes).
+
+    With pad=True edges are replicated and the output has the DEM's
+    shape; with pad=False the outer ring is consumed (halo input).
+    """
+    z = np.asarray(dem, dtype=np.float32)
+    if pad:
+        z = np.pad(z, 1, mode="edge")
+
+    a = z[:-2, :-2]
+    b = z[:-2, 1:-1]
+    c = z[:-2, 2:]
+    d = z[1:-1, :-2]
+    f = z[1:-1, 2:]
+    g = z[2:, :-2]
+    h = z[2:, 1:-1]
+    i = z[2:, 2:]
+
+    dzdx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8 * x_res)
+    dzdy = ((g + 2 * h + i) - (a + 2 * b + c)) / (8 * y_res)
+
+    return (np.sqrt(dzdx * dzdx + dzdy * dzdy) * 100).astype(np.float32)
+
+
+def sample_window(grid, row, col, radius=0):
+    """
+    Mean of a (2*radius+1)^2 window of `grid` centred on (row, col).
+    The window is clipped to the grid; NaNs are ignored.
+    """
+    height, width = grid.shape
+    r0, r1 = max(row - radius, 0), min(row + radius + 1, height)
+    c0, c1 = max(col - radius, 0), min(col + radius + 1, width)
+
+    if r0 >= r1 or c0 >= c1:
+        raise IndexError("Window outside grid")
+
+    return float(np.nanmean(grid[r0:r1, c0:c1]))
+
+
+# ------------------------------------------------------------------
+# DEM ARRAYS
+# ------------------------------------------------------------------
 
 def compute_slope_percent(dem_array, transform):
     """
@@ -9,13 +101,309 @@ def compute_slope_percent(dem_array, transform):
     """
 
     # Pixel resolution
-    x_res = transform.a
-    y_res = -transform.e
+    x_res = abs(transform.a)
+    y_res = abs(transform.e)
 
-    dzdx = np.gradient(dem_array, axis=1) / x_res
-    dzdy = np.gradient(dem_array, axis=0) / y_res
-
-    slope_rad = np.arctan(np.sqrt(dzdx**2 + dzdy**2))
-    slope_percent = np.tan(slope_rad) * 100
+    slope_percent = slope_percent_grid(dem_array, x_res, y_res)
 
     return float(np.nanmean(slope_percent))
+
+
+# ------------------------------------------------------------------
+# DEM RASTERS (WINDOWED)
+# ------------------------------------------------------------------
+
+def pixel_size_m(transform, is_geographic, row_off, rows):
+    """
+    Pixel size (meters) for `rows` rows starting at `row_off`.
+    Geographic (degree) grids get a per-row x size as a (rows, 1) column.
+    """
+    x_res = abs(transform.a)
+    y_res = abs(transform.e)
+
+    if not is_geographic:
+        return np.float32(x_res), np.float32(y_res)
+
+    lat = transform.f + transform.e * (row_off + np.arange(rows) + 0.5)
+    x_m = x_res * 111_320 * np.cos(np.radians(lat))
+    return x_m.astype(np.float32)[:, None], np.float32(y_res * 110_574)
+
+
+def read_slope_window(src, row_off, col_off, height, width):
+    """
+    Slope (%) for one window of an open rasterio DEM.
+
+    The window is read with a one-pixel halo so block seams are exact;
+    at the raster border the halo replicates the edge pixels.
+    """
+    r0, c0 = max(row_off - 1, 0), max(col_off - 1, 0)
+    r1 = min(row_off + height + 1, src.height)
+    c1 = min(col_off + width + 1, src.width)
+
+    dem = src.read(
+        1,
+        window=((r0, r1), (c0, c1)),
+        masked=True,
+        out_dtype="float32"
+    ).filled(np.nan)
+
+    dem = np.pad(
+        dem,
+        (
+            (r0 - (row_off - 1), (row_off + height + 1) - r1),
+            (c0 - (col_off - 1), (col_off + width + 1) - c1)
+        ),
+        mode="edge"
+    )
+
+    x_res, y_res = pixel_size_m(
+        src.transform, src.crs is not None and src.crs.is_geographic,
+        row_off, height
+    )
+
+    return slope_percent_grid(dem, x_res, y_res, pad=False)
+
+
+# ------------------------------------------------------------------
+# OUT-OF-CORE SLOPE (STREAMING)
+# ------------------------------------------------------------------
+
+# Histogram for streaming statistics: 0.1 % bins up to 100 %; steeper
+# values are counted separately (SlopeStats.overflow)
+SLOPE_HIST_EDGES = np.arange(0, 100.05, 0.1, dtype=np.float64)
+
+_DEM_HANDLES = {}
+_DEM_HANDLES_PID = None
+
+
+def open_dem(path):
+    """
+    Read-only DEM handle, one per path and process.
+    """
+    global _DEM_HANDLES, _DEM_HANDLES_PID
+    import rasterio
+
+    # Handles must not be shared across forked workers
+    if _DEM_HANDLES_PID != os.getpid():
+        _DEM_HANDLES = {}
+        _DEM_HANDLES_PID = os.getpid()
+
+    src = _DEM_HANDLES.get(path)
+    if src is None:
+        src = _DEM_HANDLES[path] = rasterio.open(path)
+    return src
+
+
+def dem_windows(height, width, block_size):
+    """
+    (row_off, col_off, height, width) windows tiling a raster.
+    """
+    return [
+        (row_off, col_off, min(block_size, height - row_off), min(block_size, width - col_off))
+        for row_off in range(0, height, block_size)
+        for col_off in range(0, width, block_size)
+    ]
+
+
+def slope_raster_profile(width, height, crs, transform, block_size=256, nodata=np.nan):
+    """
+    GeoTIFF profile of a slope raster: tiled, DEFLATE-compressed float32.
+    """
+    return {
+        "driver": "GTiff",
+        "width": width,
+        "height": height,
+        "count": 1,
+        "dtype": "float32",
+        "crs": crs,
+        "transform": transform,
+        "nodata": nodata,
+        "tiled": True,
+        "blockxsize": block_size,
+        "blockysize": block_size,
+        "compress": "deflate",
+        "predictor": 3,
+        "BIGTIFF": "IF_SAFER"
+    }
+
+
+def _work_manifest(dem_path, block_size):
+    st = os.stat(dem_path)
+    return {
+        "dem": os.path.abspath(dem_path),
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "block_size": block_size
+    }
+
+
+def _prepare_work_dir(work_dir, manifest):
+    """
+    Make work_dir hold only windows of the build described by manifest:
+    windows left by another DEM or block size (or by a build without a
+    manifest) are removed before the manifest is written.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    path = os.path.join(work_dir, WORK_MANIFEST)
+
+    try:
+        with open(path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+    if previous == manifest:
+        return
+
+    stale = [name for name in os.listdir(work_dir) if name.endswith(".npy")]
+    if stale:
+        print(f"{work_dir} holds another build's windows; discarding {len(stale)}")
+    for name in stale:
+        os.remove(os.path.join(work_dir, name))
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _window_path(work_dir, row_off, col_off):
+    return os.path.join(work_dir, f"{row_off}_{col_off}.npy")
+
+
+def _slope_block_task(dem_path, row_off, col_off, height, width, work_dir=None):
+    path = _window_path(work_dir, row_off, col_off) if work_dir else None
+    if path and os.path.exists(path):
+        return row_off, col_off, np.load(path)
+
+    block = read_slope_window(open_dem(dem_path), row_off, col_off, height, width)
+
+    if path:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, block)
+        os.replace(tmp, path)
+
+    return row_off, col_off, block
+
+
+class SlopeStats:
+    """
+    Streaming mean / min / max / histogram-median of slope (%) values.
+    """
+
+    def __init__(self, edges=SLOPE_HIST_EDGES):
+        self.edges = edges
+        self.counts = np.zeros(len(edges) - 1, dtype=np.int64)
+        self.overflow = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, block):
+        values = block[np.isfinite(block)]
+        if values.size == 0:
+            return
+
+        self.count += values.size
+        self.total += float(values.sum(dtype=np.float64))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.counts += np.histogram(values, bins=self.edges)[0]
+        self.overflow += int(np.count_nonzero(values > self.edges[-1]))
+
+    def median(self):
+        if self.count == 0:
+            return None
+
+        # The overflow bin runs from the last edge to the maximum
+        counts = np.append(self.counts, self.overflow)
+        edges = np.append(self.edges, max(self.max, self.edges[-1]))
+
+        cum = np.cumsum(counts)
+        i = int(np.searchsorted(cum, self.count / 2.0))
+        lo, hi = edges[i], min(edges[i + 1], self.max)
+        before = cum[i - 1] if i else 0
+        frac = (self.count / 2.0 - before) / counts[i]
+        return float(lo + frac * (hi - lo))
+
+    def as_dict(self):
+        if self.count == 0:
+            return {"count": 0, "mean": None, "median": None,
+                    "min": None, "max": None, "histogram": None}
+
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "median": self.median(),
+            "min": self.min,
+            "max": self.max,
+            "histogram": {
+                "edges": self.edges.tolist(),
+                "counts": self.counts.tolist(),
+                "overflow": self.overflow
+            }
+        }
+
+
+def compute_slope_raster(dem_path, out_path=None, block_size=1024, workers=None,
+                         work_dir=None, nodata=np.nan):
+    """
+    Out-of-core slope (%) for a DEM GeoTIFF of any size.
+
+    The DEM is processed window by window (each read with a one-pixel
+    halo) across worker processes. At most two windows per worker are
+    in flight, so peak memory depends on block_size, not raster size.
+    Slope blocks are written to `out_path` (see slope_raster_profile;
+    NaN stored as `nodata`) when given, and folded into streaming
+    statistics.
+
+    With `work_dir`, every finished window is also kept there and reused
+    by the next run, so an interrupted build resumes where it stopped.
+    A manifest (DEM path, mtime, size, block_size) ties the directory to
+    one build; windows of any other build are discarded first.
+
+    Returns:
+        {"count", "mean", "median", "min", "max", "histogram"}
+    """
+    import rasterio
+
+    with rasterio.open(dem_path) as src:
+        height, width = src.height, src.width
+        profile = slope_raster_profile(width, height, src.crs, src.transform, nodata=nodata)
+
+    windows = [w + (work_dir,) for w in dem_windows(height, width, block_size)]
+    if work_dir:
+        _prepare_work_dir(work_dir, _work_manifest(dem_path, block_size))
+
+    stats = SlopeStats()
+    dst = rasterio.open(out_path, "w", **profile) if out_path else None
+
+    def consume(row_off, col_off, block):
+        stats.update(block)
+        if dst is not None:
+            if not np.isnan(nodata):
+                block = np.where(np.isnan(block), nodata, block).astype(np.float32)
+            dst.write(block, 1, window=((row_off, row_off + block.shape[0]),
+                                        (col_off, col_off + block.shape[1])))
+
+    try:
+        workers = workers or os.cpu_count() or 1
+
+        if workers == 1:
+            for w in windows:
+                consume(*_slope_block_task(dem_path, *w))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = deque()
+                for w in windows:
+                    if len(in_flight) >= 2 * workers:
+                        consume(*in_flight.popleft().result())
+                    in_flight.append(pool.submit(_slope_block_task, dem_path, *w))
+                while in_flight:
+                    consume(*in_flight.popleft().result())
+    finally:
+        if dst is not None:
+            dst.close()
+
+    return stats.as_dict()
@@ -0,0 +1,247 @@
+# geo/dem/mosaic.py
+# Pixel-accurate slope sampling across Web Mercator tile edges
+
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from geo.dem.dem_utils import sample_window, slope_percent_grid, tile_row_resolution
+
+# Stitched blocks kept in memory (a 2x2 block of 256 px tiles is ~1 MB)
+MAX_CACHED_BLOCKS = 64
+
+
+def latlon_to_tile_fraction(lat, lon, zoom):
+    """
+    Fractional Web Mercator tile coordinates of a point.
+    The integer part is the tile, the fraction the position inside it.
+    """
+    lat_rad = math.radians(lat)
+    n = 2 ** zoom
+    tx = (lon + 180.0) / 360.0 * n
+    ty = (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n
+    return tx, ty
+
+
+def latlon_to_pixel(lat, lon, zoom, size):
+    """
+    Tile and pixel (row, col) containing a point.
+
+    Returns:
+        (xtile, ytile, row, col)
+    """
+    tx, ty = latlon_to_tile_fraction(lat, lon, zoom)
+    gx = int(math.floor(tx * size))
+    gy = int(math.floor(ty * size))
+    return gx // size, gy // size, gy % size, gx % size
+
+
+def window_means(grid, rows, cols, radius):
+    """
+    NaN-ignoring means of (2*radius+1)^2 windows of `grid` centred on
+    each (rows[k], cols[k]); every window must lie inside the grid.
+    All-NaN windows give NaN.
+    """
+    offsets = np.arange(-radius, radius + 1)
+    windows = grid[
+        rows[:, None, None] + offsets[None, :, None],
+        cols[:, None, None] + offsets[None, None, :]
+    ].reshape(len(rows), -1)
+
+    valid = ~np.isnan(windows)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, windows, 0).sum(axis=1, dtype=np.float64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+class SlopeMosaic:
+    """
+    Samples slope windows around the exact pixel of a point.
+
+    Windows that stay inside one tile read that tile's cached slope
+    raster. Windows that cross a tile edge read a block stitched from
+    the neighbouring elevation tiles; stitched blocks (with their slope
+    rasters) are cached so nearby points reuse one assembled DEM block.
+    A block with a missing neighbour (NaN placeholder) is not cached,
+    so the next access retries the download.
+    """
+
+    def __init__(self, elevation_tiles, slope_tiles, max_blocks=MAX_CACHED_BLOCKS):
+        self.elevation_tiles = elevation_tiles
+        self.slope_tiles = slope_tiles
+        self.max_blocks = max_blocks
+
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "tile_samples": 0,
+            "block_hits": 0,
+            "block_builds": 0,
+            "partial_blocks": 0
+        }
+
+    # -------------------------
+    # Stitched blocks
+    # -------------------------
+
+    def _neighbour(self, zoom, x, y, size):
+        """
+        (elevation tile, complete); a failed download gives a NaN
+        placeholder and complete=False.
+        """
+        try:
+            return self.elevation_tiles.get(zoom, x, y), True
+        except Exception as e:
+            print("Neighbour tile unavailable:", (zoom, x, y), e)
+            return np.full((size, size), np.nan, dtype=np.float32), False
+
+    def _build_block(self, zoom, tx0, ty0, tx1, ty1, size):
+        """
+        (slope raster of the block, whether every tile was available)
+        """
+        complete = True
+        rows = []
+        for ty in range(ty0, ty1 + 1):
+            row = []
+            for tx in range(tx0, tx1 + 1):
+                tile, ok = self._neighbour(zoom, tx, ty, size)
+                complete = complete and ok
+                row.append(tile)
+            rows.append(np.hstack(row))
+        elev = np.vstack(rows)
+
+        res = np.vstack([
+            tile_row_resolution(zoom, ty, size)
+            for ty in range(ty0, ty1 + 1)
+        ])
+
+        return slope_percent_grid(elev, res, res), complete
+
+    def slope_block(self, zoom, tx0, ty0, tx1, ty1, size):
+        """
+        Slope raster of the stitched block of tiles [tx0..tx1] x [ty0..ty1].
+
+        Returns:
+            (slope raster, complete: False when a tile was unavailable
+             and stitched as NaN; only complete blocks are cached)
+        """
+        key = (zoom, tx0, ty0, tx1, ty1)
+
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                self.stats["block_hits"] += 1
+                return block, True
+
+        block, complete = self._build_block(zoom, tx0, ty0, tx1, ty1, size)
+
+        with self._lock:
+            self.stats["block_builds"] += 1
+            if not complete:
+                self.stats["partial_blocks"] += 1
+                return block, False
+
+            self._blocks[key] = block
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+
+        return block, True
+
+    # -------------------------
+    # Sampling
+    # -------------------------
+
+    def slope_at(self, lat, lon, zoom, radius):
+        """
+        Mean slope (%) over a (2*radius+1)^2 window centred on the
+        pixel that contains (lat, lon).
+        """
+        tx, ty = latlon_to_tile_fraction(lat, lon, zoom)
+        x, y = int(math.floor(tx)), int(math.floor(ty))
+
+        tile = self.slope_tiles.get(zoom, x, y)
+        size = tile.shape[0]
+
+        _, _, row, col = latlon_to_pixel(lat, lon, zoom, size)
+
+        # Horn needs one pixel of halo around the window
+        reach = radius + 1
+
+        if reach <= row < size - reach and reach <= col < size - reach:
+            self.stats["tile_samples"] += 1
+            return sample_window(tile, row, col, radius)
+
+        tx0 = x + math.floor((col - reach) / size)
+        tx1 = x + math.floor((col + reach) / size)
+        ty0 = y + math.floor((row - reach) / size)
+        ty1 = y + math.floor((row + reach) / size)
+
+        block, _ = self.slope_block(zoom, tx0, ty0, tx1, ty1, size)
+
+        return sample_window(
+            block,
+            (y - ty0) * size + row,
+            (x - tx0) * size + col,
+            radius
+        )
+
+    def slope_many(self, lats, lons, zoom, radius):
+        """
+        Vectorized slope_at for arrays of points.
+
+        Points are grouped by tile; each group reads one block stitched
+        from the tiles its windows reach and samples all windows at once.
+        Groups whose tiles cannot be fetched get NaN.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        result = np.full(len(lats), np.nan)
+
+        n = 2 ** zoom
+        tx = (lons + 180.0) / 360.0 * n
+        ty = (1.0 - np.arcsinh(np.tan(np.radians(lats))) / np.pi) / 2.0 * n
+        xs = np.floor(tx).astype(np.int64)
+        ys = np.floor(ty).astype(np.int64)
+
+        reach = radius + 1
+        keys = xs * (1 << 32) + ys
+
+        for key in np.unique(keys):
+            sel = np.flatnonzero(keys == key)
+            x, y = int(xs[sel[0]]), int(ys[sel[0]])
+
+            try:
+                tile = self.slope_tiles.get(zoom, x, y)
+            except Exception as e:
+                print("Slope tile unavailable:", (zoom, x, y), e)
+                continue
+
+            size = tile.shape[0]
+            rows = np.floor(ty[sel] * size).astype(np.int64) - y * size
+            cols = np.floor(tx[sel] * size).astype(np.int64) - x * size
+
+            tx0 = x + int(np.floor((cols.min() - reach) / size))
+            tx1 = x + int(np.floor((cols.max() + reach) / size))
+            ty0 = y + int(np.floor((rows.min() - reach) / size))
+            ty1 = y + int(np.floor((rows.max() + reach) / size))
+
+            if (tx0, ty0, tx1, ty1) == (x, y, x, y):
+                self.stats["tile_samples"] += len(sel)
+                grid = tile
+            else:
+                grid, _ = self.slope_block(zoom, tx0, ty0, tx1, ty1, size)
+
+            result[sel] = window_means(
+                grid,
+                (y - ty0) * size + rows,
+                (x - tx0) * size + cols,
+                radius
+            )
+
+        return result
@@ -0,0 +1,137 @@
+# geo/dem/slope_raster.py
+# Precomputed slope-percent raster (built by tools/build_slope_raster.py)
+
+import os
+import threading
+
+import numpy as np
+import rasterio
+
+from geo.dem.mosaic import window_means
+from geo.landcover_catalog import READ_BLOCK, project_many, wgs84_transformer
+from geo.metrics import RASTER_READS
+
+SLOPE_RASTER_PATH = os.getenv(
+    "SWC_SLOPE_RASTER",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "data",
+        "slope",
+        "slope_percent.tif"
+    )
+)
+
+
+class SlopeRaster:
+    """
+    Read-only lookups into a tiled slope-percent GeoTIFF.
+
+    Each lookup maps the point to its pixel and reads one small window,
+    which touches a single internal block (kept hot by GDAL's block cache).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.src = rasterio.open(path)
+        self.nodata = self.src.nodata
+        self._lock = threading.Lock()
+
+        # Resolved once: lookups only apply the transformer
+        self.geographic = self.src.crs.to_epsg() == 4326
+        self._to_raster = None if self.geographic else wgs84_transformer(self.src.crs)
+
+    def sample(self, lat, lon, radius=0):
+        """
+        Mean slope (%) over a (2*radius+1)^2 window around the point,
+        or None when the point is outside the raster or has no data.
+        """
+        src = self.src
+
+        if self.geographic:
+            x, y = lon, lat
+        else:
+            x, y = self._to_raster.transform(lon, lat, errcheck=False)
+            if not (np.isfinite(x) and np.isfinite(y)):
+                return None
+
+        row, col = src.index(x, y)
+        if not (0 <= row < src.height and 0 <= col < src.width):
+            return None
+
+        r0, c0 = max(row - radius, 0), max(col - radius, 0)
+        r1 = min(row + radius + 1, src.height)
+        c1 = min(col + radius + 1, src.width)
+
+        # Dataset handles are not thread-safe
+        with self._lock:
+            values = src.read(1, window=((r0, r1), (c0, c1)), masked=True)
+        RASTER_READS.inc(raster="slope")
+
+        values = values.astype(np.float32).filled(np.nan)
+        if np.all(np.isnan(values)):
+            return None
+
+        return float(np.nanmean(values))
+
+    def sample_many(self, lats, lons, radius=0):
+        """
+        Vectorized sample: points are grouped by READ_BLOCK-sized raster
+        block and each block is read once (with a radius halo).
+        Returns NaN where sample would return None.
+        """
+        src = self.src
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        result = np.full(len(lats), np.nan)
+
+        if self.geographic:
+            xs, ys = lons, lats
+        else:
+            xs, ys = project_many(self._to_raster, lons, lats)
+
+        # Points outside the projection domain arrive as inf
+        with np.errstate(invalid="ignore"):
+            cols, rows = ~src.transform * (xs, ys)
+            inside = (rows >= 0) & (rows < src.height) & (cols >= 0) & (cols < src.width)
+
+        idx = np.flatnonzero(inside)
+        rows = np.floor(rows[idx]).astype(np.int64)
+        cols = np.floor(cols[idx]).astype(np.int64)
+
+        block_keys = (rows // READ_BLOCK) * (1 << 32) + (cols // READ_BLOCK)
+        for key in np.unique(block_keys):
+            sel = np.flatnonzero(block_keys == key)
+            r0 = int(rows[sel[0]] // READ_BLOCK) * READ_BLOCK - radius
+            c0 = int(cols[sel[0]] // READ_BLOCK) * READ_BLOCK - radius
+            span = READ_BLOCK + 2 * radius
+
+            # Boundless reads mask the outside like sample's clipped window
+            with self._lock:
+                block = src.read(
+                    1, window=((r0, r0 + span), (c0, c0 + span)),
+                    boundless=True, masked=True
+                )
+            RASTER_READS.inc(raster="slope")
+            block = block.astype(np.float32).filled(np.nan)
+
+            result[idx[sel]] = window_means(block, rows[sel] - r0, cols[sel] - c0, radius)
+
+        return result
+
+
+_RASTER = None
+_RASTER_PID = None
+
+
+def get_slope_raster(path=SLOPE_RASTER_PATH):
+    """
+    Process-wide SlopeRaster, or None when no raster has been built.
+    """
+    global _RASTER, _RASTER_PID
+
+    # Handles must not be shared across forked workers
+    if _RASTER_PID != os.getpid():
+        _RASTER = SlopeRaster(path) if os.path.exists(path) else None
+        _RASTER_PID = os.getpid()
+
+    return _RASTER
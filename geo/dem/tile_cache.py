@@ -0,0 +1,181 @@
+# geo/dem/tile_cache.py
+# Persistent z/x/y elevation tile store (decoded float32 grids)
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# =========================
+# CONFIGURATION (TUNABLE)
+# =========================
+
+TILE_CACHE_DIR = os.getenv(
+    "SWC_TILE_CACHE_DIR",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        "data",
+        "cache",
+        "terrain_rgb"
+    )
+)
+
+# In-process LRU budget (decoded bytes held in memory)
+TILE_CACHE_MAX_BYTES = int(
+    os.getenv("SWC_TILE_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+
+
+# =========================
+# TILE STORE
+# =========================
+
+class TerrainTileCache:
+    """
+    Two-level cache of decoded elevation tiles keyed on (z, x, y).
+
+    Level 1: in-process LRU bounded by a byte budget.
+    Level 2: float32 .npy files on disk, opened with memory mapping,
+             so tiles survive restarts and are shared via the page cache.
+
+    `fetch_tile(z, x, y)` is called only on a full miss and must
+    return the 2D grid to store (decoded elevations, or rasters
+    derived from them such as slope).
+    """
+
+    def __init__(self, fetch_tile, cache_dir=TILE_CACHE_DIR,
+                 max_bytes=TILE_CACHE_MAX_BYTES):
+        self.fetch_tile = fetch_tile
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        self._lru = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0
+        }
+
+    # -------------------------
+    # Paths
+    # -------------------------
+
+    def tile_path(self, z, x, y):
+        return os.path.join(self.cache_dir, str(z), str(x), f"{y}.npy")
+
+    # -------------------------
+    # LRU
+    # -------------------------
+
+    def _lru_get(self, key):
+        with self._lock:
+            arr = self._lru.get(key)
+            if arr is not None:
+                self._lru.move_to_end(key)
+                self.stats["memory_hits"] += 1
+            return arr
+
+    def _lru_put(self, key, arr):
+        with self._lock:
+            if key in self._lru:
+                return self._lru[key]
+
+            self._lru[key] = arr
+            self._bytes += arr.nbytes
+
+            while self._bytes > self.max_bytes and len(self._lru) > 1:
+                _, old = self._lru.popitem(last=False)
+                self._bytes -= old.nbytes
+                self.stats["evictions"] += 1
+
+            return arr
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    # -------------------------
+    # Disk
+    # -------------------------
+
+    def _load(self, path):
+        return np.load(path, mmap_mode="r")
+
+    def _store(self, path, arr):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Atomic publish: readers never see a partially written tile
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(arr, dtype=np.float32))
+        os.replace(tmp, path)
+
+    # -------------------------
+    # Public API
+    # -------------------------
+
+    def get(self, z, x, y):
+        """
+        Return the decoded elevation tile (read-only float32 array).
+        """
+        key = (z, x, y)
+
+        arr = self._lru_get(key)
+        if arr is not None:
+            return arr
+
+        # One fetch per tile, even under concurrent requests
+        with self._key_lock(key):
+            arr = self._lru_get(key)
+            if arr is not None:
+                return arr
+
+            path = self.tile_path(z, x, y)
+
+            if os.path.exists(path):
+                self.stats["disk_hits"] += 1
+            else:
+                self.stats["misses"] += 1
+                self._store(path, self.fetch_tile(z, x, y))
+
+            arr = self._lru_put(key, self._load(path))
+
+        with self._lock:
+            self._key_locks.pop(key, None)
+
+        return arr
+
+    def has(self, z, x, y):
+        """
+        Whether the tile is available without calling fetch_tile.
+        """
+        with self._lock:
+            if (z, x, y) in self._lru:
+                return True
+        return os.path.exists(self.tile_path(z, x, y))
+
+    def put(self, z, x, y, arr):
+        """
+        Publish a tile fetched elsewhere (e.g. by an async downloader).
+        """
+        path = self.tile_path(z, x, y)
+        self._store(path, arr)
+        return self._lru_put((z, x, y), self._load(path))
+
+    def clear_memory(self):
+        with self._lock:
+            self._lru.clear()
+            self._bytes = 0
+
+    @property
+    def memory_bytes(self):
+        return self._bytes
@@ -1,20 +1,151 @@
-from geo.sensors.rainfall_sensor import fetch_rainfall_mm
-from geo.sensors.slope_sensor import fetch_slope_percent
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from geo.aio import RUNTIME
+from geo.sensors.rainfall_sensor import (
+    RAINFALL_FALLBACK_MM,
+    fetch_rainfall_mm,
+    fetch_rainfall_mm_async
+)
+from geo.sensors.slope_sensor import (
+    SLOPE_FALLBACK_PERCENT,
+    fetch_slope_percent,
+    fetch_slope_percent_async
+)
 from geo.sensors.soil_depth_sensor import fetch_soil_depth_class
 from geo.sensors.soil_drainage_sensor import fetch_soil_drainage
 from geo.location_contract import LocationFactors
+from geo.cache import FACTOR_CACHE
+from geo.metrics import FALLBACKS, record_stage
+from geo.providers import answered_provider, collect_providers, record_provider
+from geo.resilience import REQUEST_BUDGET_S, Budget, source_circuit_open
 
+# Whole-request budget for the remote sensors (seconds); each sensor is
+# further capped by its stage budget (geo/resilience.py)
+FACTOR_DEADLINE_S = REQUEST_BUDGET_S
+
+# Response field of each measured factor
+FACTOR_FIELDS = {
+    "rainfall": "rainfall_mm",
+    "slope": "slope_percent",
+}
+
+# Shared by all requests; each request uses at most one thread per remote sensor
+_SENSOR_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="sensor")
+
+
+def _cache_get(source, lat, lon):
+    """
+    Cached value of a factor (re-recording the provider that measured
+    it), or None on a miss.
+    """
+    entry = FACTOR_CACHE.get(source, lat, lon)
+    if entry is None:
+        return None
+
+    # Entries are [value, provider]; older ones hold the bare value
+    value, provider = entry if isinstance(entry, (list, tuple)) else (entry, None)
+    if provider:
+        record_provider(source, provider)
+    return value
+
+
+def _cache_set(source, lat, lon, value):
+    FACTOR_CACHE.set(source, lat, lon, [value, answered_provider(source)])
+
+
+def _cached(source, fetch, lat, lon):
+    """
+    (value, fell_back) of a sensor, answered from the factor cache when
+    possible; fallback values are never cached.
+    """
+    value = _cache_get(source, lat, lon)
+    if value is not None:
+        return value, False
+
+    value, fell_back = fetch(lat, lon)
+    if not fell_back:
+        _cache_set(source, lat, lon, value)
+    return value, fell_back
+
+
+def _rainfall(lat, lon):
+    return _cached("rainfall", fetch_rainfall_mm, lat, lon)
+
+
+def _slope(lat, lon):
+    return _cached("slope", fetch_slope_percent, lat, lon)
 
-def build_factors(lat, lon, land_use, overrides=None):
-    overrides = overrides or {}
 
-    rainfall = overrides.get("rainfall_mm") or fetch_rainfall_mm(lat, lon)
-    slope = overrides.get("slope_percent") or fetch_slope_percent(lat, lon)
+def _timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, round((time.perf_counter() - start) * 1000, 2)
 
+
+def fallback_reasons(names, timed_out=()):
+    """
+    {factor field: reason} for sensors whose fallback value was used.
+
+    Reasons: "timed_out" (past its budget), "circuit_open" (upstream
+    failing fast) or "unavailable" (any other failure).
+    """
+    fallbacks = {}
+    for name in names:
+        if name in timed_out:
+            reason = "timed_out"
+        elif source_circuit_open(name):
+            reason = "circuit_open"
+        else:
+            reason = "unavailable"
+        fallbacks[FACTOR_FIELDS[name]] = reason
+        FALLBACKS.inc(factor=FACTOR_FIELDS[name], reason=reason)
+    return fallbacks
+
+
+def _record_sensor_stages(sensors, timings):
+    for name in sensors:
+        if f"{name}_ms" in timings:
+            record_stage(name, timings[f"{name}_ms"] / 1000)
+
+
+def _fell_back(sensors, unavailable, timings):
+    # Sensors that reported a fallback, timed out or raised
+    return fallback_reasons(
+        [
+            name for name in sensors
+            if name in unavailable
+            or name in timings.get("timed_out", ())
+            or name in timings.get("failed", ())
+        ],
+        timings.get("timed_out", ())
+    )
+
+
+def _providers(sensors, answered, fallbacks):
+    """
+    {factor field: provider} of the measured (not overridden, not
+    fallen back) factors.
+    """
+    return {
+        FACTOR_FIELDS[name]: answered[name]
+        for name in sensors
+        if name in answered and FACTOR_FIELDS[name] not in fallbacks
+    }
+
+
+def _derive(lat, lon, land_use, overrides, rainfall, slope, timings,
+            fallbacks=None, providers=None):
     # ✅ FIXED: soil depth depends ONLY on slope
-    soil_depth = overrides.get("soil_depth") or fetch_soil_depth_class(slope)
+    soil_depth = overrides.get("soil_depth")
+    if not soil_depth:
+        soil_depth, timings["soil_depth_ms"] = _timed(fetch_soil_depth_class, slope)
 
-    drainage = overrides.get("drainage") or fetch_soil_drainage(slope, rainfall)
+    drainage = overrides.get("drainage")
+    if not drainage:
+        drainage, timings["drainage_ms"] = _timed(fetch_soil_drainage, slope, rainfall)
 
     return LocationFactors(
         latitude=lat,
@@ -23,5 +154,196 @@ def build_factors(lat, lon, land_use, overrides=None):
         rainfall_mm=rainfall,
         slope_percent=slope,
         soil_depth=soil_depth,
-        drainage=drainage
+        drainage=drainage,
+        timings=timings,
+        fallbacks=fallbacks or {},
+        providers=providers or {}
+    )
+
+
+def factors_from_measurements(lat, lon, land_use, rainfall, slope,
+                              overrides=None, timings=None, fallbacks=None, providers=None):
+    """
+    LocationFactors for a point whose rainfall and slope were already
+    measured (e.g. in bulk); soil depth and drainage are derived as usual.
+    """
+    return _derive(
+        lat, lon, land_use, overrides or {}, rainfall, slope,
+        {} if timings is None else timings, fallbacks, providers
+    )
+
+
+async def _cache_call(fn, *args):
+    # The shared store is SQLite (up to its 10 s lock timeout): keep it
+    # off the loop; the in-memory LRU alone answers inline
+    if FACTOR_CACHE.shared is None:
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+
+async def _cached_async(source, fetch, lat, lon, timeout):
+    value = await _cache_call(_cache_get, source, lat, lon)
+    if value is not None:
+        return value, False
+
+    value, fell_back = await fetch(lat, lon, timeout=timeout)
+    if not fell_back:
+        await _cache_call(_cache_set, source, lat, lon, value)
+    return value, fell_back
+
+
+async def _timed_async(coro):
+    start = time.perf_counter()
+    value = await coro
+    return value, round((time.perf_counter() - start) * 1000, 2)
+
+
+async def build_factors_async(lat, lon, land_use, overrides=None,
+                              deadline_s=FACTOR_DEADLINE_S, budget=None):
+    """
+    Async build_factors_concurrent: rainfall and slope run as tasks on
+    the calling loop, each passing its stage budget down as the upstream
+    timeout. At the deadline unfinished sensors are cancelled (aborting
+    their upstream requests) and replaced by their fallbacks, listed in
+    timings["timed_out"]. The provider that answered each measured
+    factor is listed in factors.providers.
+    """
+    with collect_providers() as answered:
+        return await _build_factors_async(lat, lon, land_use, overrides, deadline_s, budget, answered)
+
+
+async def _build_factors_async(lat, lon, land_use, overrides, deadline_s, budget, answered):
+    overrides = overrides or {}
+    budget = budget or Budget(deadline_s)
+    timings = {}
+    start = time.perf_counter()
+
+    sensors = {
+        "rainfall": (overrides.get("rainfall_mm"), fetch_rainfall_mm_async, RAINFALL_FALLBACK_MM),
+        "slope": (overrides.get("slope_percent"), fetch_slope_percent_async, SLOPE_FALLBACK_PERCENT),
+    }
+
+    tasks = {
+        name: asyncio.ensure_future(
+            _timed_async(_cached_async(name, fn, lat, lon, budget.for_stage(name)))
+        )
+        for name, (override, fn, _) in sensors.items()
+        if not override
+    }
+
+    try:
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(tasks.values(), timeout=budget.remaining())
+    except asyncio.CancelledError:
+        # The caller went away: abort the upstream calls too
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    values = {}
+    unavailable = []
+    for name, (override, _, fallback) in sensors.items():
+        if override:
+            values[name] = override
+            continue
+
+        task = tasks[name]
+        if task.cancelled():
+            values[name] = fallback
+            timings.setdefault("timed_out", []).append(name)
+        elif task.exception() is not None:
+            values[name] = fallback
+            timings.setdefault("failed", []).append(name)
+        else:
+            (values[name], fell_back), timings[f"{name}_ms"] = task.result()
+            if fell_back:
+                unavailable.append(name)
+
+    _record_sensor_stages(sensors, timings)
+    fallbacks = _fell_back(sensors, unavailable, timings)
+    factors = _derive(
+        lat, lon, land_use, overrides, values["rainfall"], values["slope"], timings,
+        fallbacks, _providers(sensors, answered, fallbacks)
+    )
+    timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return factors
+
+
+def build_factors(lat, lon, land_use, overrides=None):
+    """
+    Synchronous wrapper around build_factors_async (run on the shared
+    async runtime, so concurrent callers share one connection pool).
+    """
+    return RUNTIME.run(build_factors_async(lat, lon, land_use, overrides))
+
+
+def build_factors_concurrent(lat, lon, land_use, overrides=None,
+                             deadline_s=FACTOR_DEADLINE_S):
+    """
+    Same contract as build_factors, but the independent remote sensors
+    (rainfall, slope) run in parallel; soil depth and drainage are
+    derived once both arrive.
+
+    Sensors still running at their stage deadline (or raising) are
+    replaced by their conservative fallbacks and listed in
+    timings["timed_out"] (or timings["failed"]).
+    """
+    with collect_providers() as answered:
+        return _build_factors_concurrent(lat, lon, land_use, overrides, deadline_s, answered)
+
+
+def _build_factors_concurrent(lat, lon, land_use, overrides, deadline_s, answered):
+    overrides = overrides or {}
+    budget = Budget(deadline_s)
+    timings = {}
+    start = time.perf_counter()
+
+    sensors = {
+        "rainfall": (overrides.get("rainfall_mm"), _rainfall, RAINFALL_FALLBACK_MM),
+        "slope": (overrides.get("slope_percent"), _slope, SLOPE_FALLBACK_PERCENT),
+    }
+
+    # Sensor threads record their provider in this request's context
+    futures = {
+        name: _SENSOR_POOL.submit(contextvars.copy_context().run, _timed, fn, lat, lon)
+        for name, (override, fn, _) in sensors.items()
+        if not override
+    }
+
+    for name, fut in futures.items():
+        wait([fut], timeout=budget.for_stage(name))
+
+    values = {}
+    unavailable = []
+    for name, (override, _, fallback) in sensors.items():
+        if override:
+            values[name] = override
+            continue
+
+        fut = futures[name]
+        if not fut.done():
+            fut.cancel()
+            values[name] = fallback
+            timings.setdefault("timed_out", []).append(name)
+        elif fut.exception() is not None:
+            values[name] = fallback
+            timings.setdefault("failed", []).append(name)
+        else:
+            (values[name], fell_back), timings[f"{name}_ms"] = fut.result()
+            if fell_back:
+                unavailable.append(name)
+
+    _record_sensor_stages(sensors, timings)
+    fallbacks = _fell_back(sensors, unavailable, timings)
+    factors = _derive(
+        lat, lon, land_use, overrides, values["rainfall"], values["slope"], timings,
+        fallbacks, _providers(sensors, answered, fallbacks)
     )
+    timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return factors
@@ -1,19 +1,36 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from geo.admin_boundaries import get_admin_boundaries
+from geo.aio import get_session
+from geo.http_client import http_get, http_get_async
+from geo.providers import PROVIDERS, Provider
+from geo.resilience import guarded, guarded_async
+
 load_dotenv()
 
 USER_AGENT = os.getenv("GEOCODING_USER_AGENT")
 
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
 
+# Longest single geocoding request (seconds)
+GEOCODER_TIMEOUT_S = float(os.getenv("SWC_GEOCODER_TIMEOUT_S", 10))
+
 
 def reverse_geocode(lat, lon):
     """
     Convert GPS coordinates to administrative location.
     Returns state and district.
+
+    Answered by the configured geocoder providers (geo/providers.py):
+    by default local admin boundaries, then Nominatim, which fails fast
+    (CircuitOpenError) while its circuit is open.
     """
+    location, _ = PROVIDERS.resolve("geocoder", lat, lon)
+    return location
+
+
+def _fetch_address(lat, lon):
     params = {
         "lat": lat,
         "lon": lon,
@@ -25,12 +42,46 @@ def reverse_geocode(lat, lon):
         "User-Agent": USER_AGENT
     }
 
-    response = requests.get(NOMINATIM_URL, params=params, headers=headers)
+    response = http_get(
+        NOMINATIM_URL, params=params, headers=headers, timeout=GEOCODER_TIMEOUT_S
+    )
 
     if response.status_code != 200:
         raise RuntimeError("Geocoding API failed")
 
-    data = response.json()
+    return response.json()
+
+
+async def reverse_geocode_async(lat, lon, session=None):
+    """
+    Async reverse_geocode (cancellable).
+    """
+    location, _ = await PROVIDERS.resolve_async("geocoder", lat, lon, session=session)
+    return location
+
+
+async def _fetch_address_async(lat, lon, session=None):
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "format": "json",
+        "addressdetails": 1
+    }
+
+    headers = {
+        "User-Agent": USER_AGENT
+    }
+
+    response = await http_get_async(
+        session or get_session(), NOMINATIM_URL, params=params, headers=headers,
+        timeout=GEOCODER_TIMEOUT_S
+    )
+    if response.status != 200:
+        raise RuntimeError("Geocoding API failed")
+    return await response.json(content_type=None)
+
+
+def _parse_address(data):
     address = data.get("address", {})
 
     state = address.get("state")
@@ -47,3 +98,42 @@ def reverse_geocode(lat, lon):
         "state": state,
         "district": district
     }
+
+
+# ------------------------------------------------------------------
+# PROVIDERS
+# ------------------------------------------------------------------
+
+class BoundariesProvider(Provider):
+    """
+    Local state / district boundaries (geo/admin_boundaries.py).
+    """
+
+    name = "boundaries"
+
+    def available(self):
+        return get_admin_boundaries() is not None
+
+    def lookup(self, lat, lon):
+        boundaries = get_admin_boundaries()
+        return None if boundaries is None else boundaries.lookup(lat, lon)
+
+
+class NominatimProvider(Provider):
+    name = "nominatim"
+    network = True
+
+    def lookup(self, lat, lon):
+        return _parse_address(guarded("nominatim", _fetch_address, lat, lon))
+
+    async def lookup_async(self, lat, lon, session=None, **kwargs):
+        data = await guarded_async(
+            "nominatim",
+            lambda: _fetch_address_async(lat, lon, session),
+            timeout=GEOCODER_TIMEOUT_S
+        )
+        return _parse_address(data)
+
+
+PROVIDERS.register("geocoder", BoundariesProvider())
+PROVIDERS.register("geocoder", NominatimProvider())
@@ -0,0 +1,86 @@
+# geo/geometry.py
+# GeoJSON polygon rings and even-odd point-in-polygon tests, shared by
+# region analysis and offline reverse geocoding
+
+import numpy as np
+
+
+def polygon_rings(geometry):
+    """
+    Every ring (exterior and holes) of a GeoJSON Polygon / MultiPolygon
+    (or a Feature holding one), as (N, 2) lon/lat arrays.
+
+    Raises:
+        ValueError for any other geometry, or rings that are not lists
+        of at least 3 finite [lon, lat] positions
+    """
+    if isinstance(geometry, dict) and geometry.get("type") == "Feature":
+        geometry = geometry.get("geometry")
+    if not isinstance(geometry, dict):
+        raise ValueError("polygon must be a GeoJSON Polygon or MultiPolygon")
+
+    kind = geometry.get("type")
+    coords = geometry.get("coordinates")
+
+    if kind == "Polygon":
+        polygons = [coords]
+    elif kind == "MultiPolygon":
+        polygons = coords
+    else:
+        raise ValueError("polygon must be a GeoJSON Polygon or MultiPolygon")
+
+    if not isinstance(polygons, list) or not all(isinstance(p, list) for p in polygons):
+        raise ValueError("polygon coordinates must be lists of rings")
+
+    rings = []
+    for polygon in polygons:
+        for ring in polygon:
+            try:
+                points = np.asarray(ring, dtype=np.float64)
+            except (TypeError, ValueError):
+                # Uneven or non-numeric positions
+                raise ValueError("polygon rings must be lists of [lon, lat] positions")
+
+            if points.ndim != 2 or points.shape[1] < 2 or len(points) < 3:
+                raise ValueError("polygon rings need at least 3 [lon, lat] positions")
+            if not np.isfinite(points[:, :2]).all():
+                raise ValueError("polygon coordinates must be finite")
+            rings.append(points[:, :2])
+
+    if not rings:
+        raise ValueError("polygon has no valid rings")
+    return rings
+
+
+def ring_edges(rings):
+    """
+    (x1, y1, x2, y2) arrays of every ring edge, each ring closed.
+    """
+    x1 = np.concatenate([r[:, 0] for r in rings])
+    y1 = np.concatenate([r[:, 1] for r in rings])
+    x2 = np.concatenate([np.roll(r[:, 0], -1) for r in rings])
+    y2 = np.concatenate([np.roll(r[:, 1], -1) for r in rings])
+    return x1, y1, x2, y2
+
+
+def inside_row(lat, lons, edges):
+    """
+    Even-odd point-in-polygon for points sharing one latitude: the
+    edges crossing that latitude are intersected once and sorted.
+    Holes and separate parts count, as long as parts do not overlap.
+    """
+    x1, y1, x2, y2 = edges
+    crossing = (y1 > lat) != (y2 > lat)
+
+    xs = np.sort(
+        x1[crossing]
+        + (lat - y1[crossing]) * (x2[crossing] - x1[crossing]) / (y2[crossing] - y1[crossing])
+    )
+    return np.searchsorted(xs, lons) % 2 == 1
+
+
+def contains(edges, lon, lat):
+    """
+    Whether one point lies inside the rings of `edges` (ring_edges).
+    """
+    return bool(inside_row(lat, np.array([lon]), edges)[0])
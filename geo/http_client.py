@@ -0,0 +1,401 @@
+# geo/http_client.py
+# Shared HTTP client for every outbound call: keep-alive pools per host,
+# retries with backoff on 429/5xx, gzip, and per-host metrics
+
+import asyncio
+import os
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from geo.metrics import REGISTRY, family_header, histogram_lines, sample_line
+
+# Hosts with a pool kept open, and connections kept per host
+HTTP_POOL_HOSTS = int(os.getenv("SWC_HTTP_POOL_HOSTS", 16))
+HTTP_POOL_SIZE = int(os.getenv("SWC_HTTP_POOL_SIZE", 32))
+
+# Retries of one GET on connection errors and 429/5xx, with exponential
+# backoff (backoff * 2^n seconds), made only while the call's timeout
+# has time left. Retry-After is not honoured: a throttling upstream is
+# left to its circuit breaker instead.
+HTTP_RETRIES = int(os.getenv("SWC_HTTP_RETRIES", 2))
+HTTP_BACKOFF_S = float(os.getenv("SWC_HTTP_BACKOFF_S", 0.2))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Upper bounds (ms) of the latency histogram buckets (+Inf implied)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# ------------------------------------------------------------------
+# METRICS
+# ------------------------------------------------------------------
+
+class HostMetrics:
+    """
+    Counters and a latency histogram for one upstream host.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.statuses = {}
+        self.latency_counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_sum_ms = 0.0
+
+    def observe(self, latency_ms, status=None, new_connection=None, retries=0, error=False):
+        self.requests += 1
+        self.retries += retries
+        if error:
+            self.errors += 1
+        if status is not None:
+            status_class = f"{status // 100}xx"
+            self.statuses[status_class] = self.statuses.get(status_class, 0) + 1
+        if new_connection is True:
+            self.new_connections += 1
+        elif new_connection is False:
+            self.reused_connections += 1
+
+        bucket = len(LATENCY_BUCKETS_MS)
+        for k, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                bucket = k
+                break
+        self.latency_counts[bucket] += 1
+        self.latency_sum_ms += latency_ms
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "statuses": dict(self.statuses),
+            "latency_ms": {
+                "buckets": list(LATENCY_BUCKETS_MS),
+                "counts": list(self.latency_counts),
+                "sum": round(self.latency_sum_ms, 2)
+            }
+        }
+
+
+class HttpMetrics:
+    """
+    HostMetrics of every host called, shared by the sync and async clients.
+    """
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def observe(self, host, latency_ms, **kwargs):
+        with self._lock:
+            metrics = self._hosts.get(host)
+            if metrics is None:
+                metrics = self._hosts[host] = HostMetrics()
+            metrics.observe(latency_ms, **kwargs)
+
+    def retried(self, host):
+        with self._lock:
+            metrics = self._hosts.get(host)
+            if metrics is None:
+                metrics = self._hosts[host] = HostMetrics()
+            metrics.retries += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {host: m.snapshot() for host, m in self._hosts.items()}
+
+    def clear(self):
+        with self._lock:
+            self._hosts.clear()
+
+
+HTTP_METRICS = HttpMetrics()
+
+
+@REGISTRY.register_collector
+def _collect_http():
+    hosts = sorted(HTTP_METRICS.snapshot().items())
+
+    name = "swc_upstream_requests_total"
+    lines = family_header(name, "counter", "Outbound requests by host and status class")
+    for host, m in hosts:
+        for status, count in sorted(m["statuses"].items()):
+            lines.append(sample_line(name, {"host": host, "status": status}, count))
+
+    for key, help_text in (
+        ("errors", "Outbound requests that failed or got a 5xx"),
+        ("retries", "Retries made by the HTTP client"),
+    ):
+        name = f"swc_upstream_{key}_total"
+        lines += family_header(name, "counter", help_text)
+        lines += [sample_line(name, {"host": host}, m[key]) for host, m in hosts]
+
+    name = "swc_upstream_connections_total"
+    lines += family_header(name, "counter", "Outbound requests on new vs reused connections")
+    for host, m in hosts:
+        lines.append(sample_line(name, {"host": host, "kind": "new"}, m["new_connections"]))
+        lines.append(sample_line(name, {"host": host, "kind": "reused"}, m["reused_connections"]))
+
+    name = "swc_upstream_request_duration_seconds"
+    lines += family_header(name, "histogram", "Outbound request latency by host")
+    for host, m in hosts:
+        latency = m["latency_ms"]
+        lines += histogram_lines(
+            name, {"host": host}, [b / 1000 for b in latency["buckets"]],
+            latency["counts"], latency["sum"] / 1000
+        )
+    return lines
+
+
+# ------------------------------------------------------------------
+# RETRIES
+# ------------------------------------------------------------------
+
+def retry_delay(attempt, deadline, retries=HTTP_RETRIES, backoff_s=HTTP_BACKOFF_S):
+    """
+    Backoff (seconds) before retry number `attempt` (from 0), or None
+    when the retries are used up or the retry could not start before
+    `deadline` (time.monotonic(); None for no deadline).
+    """
+    if attempt >= retries:
+        return None
+    delay = backoff_s * 2 ** attempt
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        return None
+    return delay
+
+
+def _deadline(timeout):
+    # A single number bounds the whole call; (connect, read) pairs only
+    # bound each attempt
+    if isinstance(timeout, (int, float)):
+        return time.monotonic() + timeout
+    return None
+
+
+def _time_left(deadline, timeout):
+    if deadline is None:
+        return timeout
+    return max(deadline - time.monotonic(), 0.001)
+
+
+# ------------------------------------------------------------------
+# SYNC CLIENT (requests)
+# ------------------------------------------------------------------
+
+class HttpClient:
+    """
+    One requests.Session per process (recreated after fork) whose
+    pooled connections are reused by all sensors and threads.
+    """
+
+    def __init__(self, pool_hosts=HTTP_POOL_HOSTS, pool_size=HTTP_POOL_SIZE,
+                 retries=HTTP_RETRIES, backoff_s=HTTP_BACKOFF_S, metrics=HTTP_METRICS):
+        self.pool_hosts = pool_hosts
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.metrics = metrics
+
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        # Connections each urllib3 pool had opened when last seen
+        self._opened = weakref.WeakKeyDictionary()
+
+    def _build(self):
+        # Retries are made by `get`, within the caller's timeout
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_hosts,
+            pool_maxsize=self.pool_size
+        )
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+        return session
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._session = self._build()
+                self._pid = os.getpid()
+            return self._session
+
+    def _opened_connection(self, response):
+        """
+        Whether the pool behind a response opened a connection since it
+        was last seen (with concurrent requests on one pool, a new
+        connection is credited to whichever response sees it first).
+        """
+        pool = getattr(response.raw, "_pool", None)
+        if pool is None:
+            return None
+        with self._lock:
+            opened = pool.num_connections
+            before = self._opened.get(pool, 0)
+            self._opened[pool] = opened
+        return opened > before
+
+    def get(self, url, timeout=None, **kwargs):
+        """
+        requests.get on the shared session (same arguments and result).
+
+        Connection errors, timeouts and 429/5xx are retried with backoff
+        while `timeout` (seconds) has time left: it bounds the whole
+        call, and each attempt only gets what remains of it.
+        """
+        session = self.session
+        host = urlsplit(url).hostname
+        deadline = _deadline(timeout)
+
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = session.get(url, timeout=_time_left(deadline, timeout), **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                delay = retry_delay(attempt, deadline, self.retries, self.backoff_s)
+                if delay is None:
+                    self.metrics.observe(
+                        host, (time.perf_counter() - start) * 1000, retries=attempt, error=True
+                    )
+                    raise
+            except Exception:
+                self.metrics.observe(
+                    host, (time.perf_counter() - start) * 1000, retries=attempt, error=True
+                )
+                raise
+            else:
+                delay = None
+                if response.status_code in RETRY_STATUSES:
+                    delay = retry_delay(attempt, deadline, self.retries, self.backoff_s)
+                if delay is None:
+                    break
+
+            time.sleep(delay)
+            attempt += 1
+
+        self.metrics.observe(
+            host,
+            (time.perf_counter() - start) * 1000,
+            status=response.status_code,
+            new_connection=self._opened_connection(response),
+            retries=attempt,
+            error=response.status_code >= 500
+        )
+        return response
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = self._pid = None
+
+
+HTTP_CLIENT = HttpClient()
+
+
+def http_get(url, **kwargs):
+    return HTTP_CLIENT.get(url, **kwargs)
+
+
+def http_metrics():
+    """
+    {host: counters and latency histogram} of all outbound calls.
+    """
+    return HTTP_METRICS.snapshot()
+
+
+# ------------------------------------------------------------------
+# ASYNC CLIENT (aiohttp)
+# ------------------------------------------------------------------
+
+def aiohttp_trace_config(metrics=HTTP_METRICS):
+    """
+    aiohttp TraceConfig feeding the same per-host metrics.
+    """
+    async def on_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+        ctx.new_connection = None
+
+    async def on_new_connection(session, ctx, params):
+        ctx.new_connection = True
+
+    async def on_reused_connection(session, ctx, params):
+        ctx.new_connection = False
+
+    async def on_end(session, ctx, params):
+        metrics.observe(
+            params.url.host,
+            (time.perf_counter() - ctx.start) * 1000,
+            status=params.response.status,
+            new_connection=ctx.new_connection,
+            error=params.response.status >= 500
+        )
+
+    async def on_exception(session, ctx, params):
+        metrics.observe(
+            params.url.host,
+            (time.perf_counter() - ctx.start) * 1000,
+            new_connection=ctx.new_connection,
+            error=True
+        )
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_start)
+    config.on_connection_create_end.append(on_new_connection)
+    config.on_connection_reuseconn.append(on_reused_connection)
+    config.on_request_end.append(on_end)
+    config.on_request_exception.append(on_exception)
+    return config
+
+
+async def http_get_async(session, url, timeout=None, retries=HTTP_RETRIES,
+                         backoff_s=HTTP_BACKOFF_S, metrics=HTTP_METRICS, **kwargs):
+    """
+    session.get with the sync client's retries: connection errors,
+    timeouts and 429/5xx are retried with backoff while `timeout`
+    (seconds, the budget of the whole call) has time left.
+
+    Returns the last response with its body already read (so .json()
+    and .read() work after the connection is released).
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    host = urlsplit(url).hostname
+
+    attempt = 0
+    while True:
+        left = None if deadline is None else max(deadline - time.monotonic(), 0.001)
+        try:
+            async with session.get(
+                url, timeout=aiohttp.ClientTimeout(total=left), **kwargs
+            ) as response:
+                await response.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            delay = retry_delay(attempt, deadline, retries, backoff_s)
+            if delay is None:
+                raise
+        else:
+            delay = None
+            if response.status in RETRY_STATUSES:
+                delay = retry_delay(attempt, deadline, retries, backoff_s)
+            if delay is None:
+                return response
+
+        metrics.retried(host)
+        await asyncio.sleep(delay)
+        attempt += 1
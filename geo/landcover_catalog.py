@@ -0,0 +1,362 @@
+# geo/landcover_catalog.py
+# Land cover tile catalog: open handles, CRS transforms, WGS84 footprint index
+
+import math
+import os
+import threading
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+import rasterio
+from pyproj import Transformer
+from rasterio.warp import transform_bounds
+
+from geo.metrics import RASTER_READS
+
+# Footprint index bucket size (degrees)
+INDEX_CELL_DEG = 1.0
+
+# Largest class code counted with array operations by the majority
+# (ESRI uses 1..11); larger codes take a slower exact path
+MAX_CLASS = 15
+
+
+# Batch reads are grouped into square blocks of this many pixels
+READ_BLOCK = 512
+
+
+def _majority(stack):
+    """
+    Majority class over 9 same-shaped arrays given in row-major window
+    order. Matches Counter(values > 0).most_common(1) exactly: ties go to
+    the class seen first in the window. 0 means no valid (non-zero) values.
+
+    Classes 1..MAX_CLASS are counted with array operations; the rare
+    windows holding a larger value are counted with a Counter.
+    """
+    shape = stack[0].shape
+    best_key = np.zeros(shape, dtype=np.int16)
+    best = np.zeros(shape, dtype=np.promote_types(np.uint8, stack[0].dtype))
+
+    for c in range(1, MAX_CLASS + 1):
+        count = np.zeros(shape, dtype=np.int16)
+        first = np.full(shape, 9, dtype=np.int16)
+        for k in range(8, -1, -1):
+            hit = stack[k] == c
+            count += hit
+            first[hit] = k
+
+        # Higher count wins; on equal counts the earlier first position wins
+        key = np.where(count > 0, count * 16 + (15 - first), 0).astype(np.int16)
+        better = key > best_key
+        best_key[better] = key[better]
+        best[better] = c
+
+    unusual = np.zeros(shape, dtype=bool)
+    for k in range(9):
+        unusual |= stack[k] > MAX_CLASS
+    for idx in zip(*np.nonzero(unusual)):
+        values = [int(stack[k][idx]) for k in range(9) if stack[k][idx] > 0]
+        best[idx] = Counter(values).most_common(1)[0][0]
+
+    return best
+
+
+def majority_3x3(padded):
+    """
+    Vectorized 3x3 majority class of every pixel of a raster padded
+    by one pixel (see _majority for the tie rule).
+    """
+    padded = np.asarray(padded)
+    h, w = padded.shape[0] - 2, padded.shape[1] - 2
+
+    return _majority([
+        padded[dr:dr + h, dc:dc + w]
+        for dr in range(3)
+        for dc in range(3)
+    ])
+
+
+def majority_windows(windows):
+    """
+    Majority class of each of n 3x3 windows, given as an (n, 3, 3) array.
+    """
+    flat = np.asarray(windows).reshape(len(windows), 9)
+    return _majority([flat[:, k] for k in range(9)])
+
+
+class FootprintIndex:
+    """
+    WGS84 footprint index over tiles exposing crs, bounds and wgs84_bounds.
+
+    A lookup transforms the point only into the CRS of candidate tiles
+    (once per distinct CRS, with a transformer built when the index is)
+    and returns the first tile containing it.
+    """
+
+    def __init__(self, tiles):
+        self.tiles = tiles
+
+        # Tile -> distinct CRS slot, and one transformer per slot
+        slots = {}
+        self._crs_slot = []
+        self._transformers = []
+        for tile in tiles:
+            key = tile.crs.to_wkt()
+            if key not in slots:
+                slots[key] = len(self._transformers)
+                self._transformers.append(wgs84_transformer(tile.crs))
+            self._crs_slot.append(slots[key])
+
+        self._index = {}
+        for n, tile in enumerate(tiles):
+            west, south, east, north = tile.wgs84_bounds
+            for i in range(self._cell(south), self._cell(north) + 1):
+                for j in range(self._cell(west), self._cell(east) + 1):
+                    self._index.setdefault((i, j), []).append(n)
+
+    @staticmethod
+    def _cell(deg):
+        return int(math.floor(deg / INDEX_CELL_DEG))
+
+    def _candidates(self, lat, lon):
+        for n in self._index.get((self._cell(lat), self._cell(lon)), ()):
+            west, south, east, north = self.tiles[n].wgs84_bounds
+            if west <= lon <= east and south <= lat <= north:
+                yield n
+
+    def candidates(self, lat, lon):
+        for n in self._candidates(lat, lon):
+            yield self.tiles[n]
+
+    def locate(self, lat, lon):
+        """
+        Tile containing the point and the point in that tile's CRS.
+
+        Returns:
+            (tile, x, y) or None
+        """
+        projected = {}
+
+        for n in self._candidates(lat, lon):
+            slot = self._crs_slot[n]
+            if slot not in projected:
+                projected[slot] = self._transformers[slot].transform(lon, lat, errcheck=False)
+
+            x, y = projected[slot]
+            b = self.tiles[n].bounds
+            if b.left <= x <= b.right and b.bottom <= y <= b.top:
+                return self.tiles[n], x, y
+
+        return None
+
+    def locate_many(self, lats, lons):
+        """
+        Vectorized locate: each point is reprojected once per distinct
+        CRS among its candidate tiles.
+
+        Returns:
+            (tile_index, x, y) arrays; tile_index is -1 outside coverage
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        n = len(lats)
+
+        found = np.full(n, -1, dtype=np.int64)
+        xs = np.full(n, np.nan)
+        ys = np.full(n, np.nan)
+        projected = {}
+
+        for t, tile in enumerate(self.tiles):
+            west, south, east, north = tile.wgs84_bounds
+            todo = np.flatnonzero(
+                (found < 0)
+                & (lons >= west) & (lons <= east)
+                & (lats >= south) & (lats <= north)
+            )
+            if todo.size == 0:
+                continue
+
+            slot = self._crs_slot[t]
+            if slot not in projected:
+                projected[slot] = (np.full(n, np.nan), np.full(n, np.nan))
+            px, py = projected[slot]
+
+            missing = todo[np.isnan(px[todo])]
+            if missing.size:
+                px[missing], py[missing] = project_many(self._transformers[slot], lons[missing], lats[missing])
+
+            b = tile.bounds
+            x, y = px[todo], py[todo]
+            inside = (x >= b.left) & (x <= b.right) & (y >= b.bottom) & (y <= b.top)
+
+            hit = todo[inside]
+            found[hit] = t
+            xs[hit] = x[inside]
+            ys[hit] = y[inside]
+
+        return found, xs, ys
+
+
+@lru_cache(maxsize=None)
+def _transformer(wkt):
+    return Transformer.from_crs("EPSG:4326", wkt, always_xy=True)
+
+
+def wgs84_transformer(crs):
+    """
+    WGS84 (lon, lat) -> crs transformer, one per distinct CRS. Building
+    one is the expensive part of a reprojection: callers keep it.
+    """
+    return _transformer(crs.to_wkt())
+
+
+def project_many(transformer, lons, lats):
+    """
+    WGS84 -> CRS of `transformer` for arrays; points outside the
+    projection domain get inf.
+    """
+    x, y = transformer.transform(
+        np.asarray(lons, dtype=np.float64),
+        np.asarray(lats, dtype=np.float64),
+        errcheck=False
+    )
+    return np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+
+
+class LandcoverTile:
+    """
+    One land cover GeoTIFF with a per-process dataset handle.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._src = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        with rasterio.open(path) as src:
+            self.crs = src.crs
+            self.bounds = src.bounds
+            self.wgs84_bounds = transform_bounds(src.crs, "EPSG:4326", *src.bounds)
+
+    @property
+    def src(self):
+        # Dataset handles must not be shared across forked workers
+        if self._pid != os.getpid():
+            self._src = rasterio.open(self.path)
+            self._pid = os.getpid()
+        return self._src
+
+    def read_block(self, r0, r1, c0, c1):
+        """
+        Rows r0..r1-1 and columns c0..c1-1 of band 1, boundless.
+        """
+        RASTER_READS.inc(raster="landcover")
+        with self._lock:
+            return self.src.read(1, window=((r0, r1), (c0, c1)), boundless=True)
+
+    def read_window(self, row, col, radius=1):
+        """
+        (2*radius+1)^2 window of band 1 around (row, col), boundless.
+        """
+        RASTER_READS.inc(raster="landcover")
+        with self._lock:
+            src = self.src
+            window = ((row - radius, row + radius + 1), (col - radius, col + radius + 1))
+            # Boundless reads go through a VRT: only pay for it at the edges
+            inside = radius <= row < src.height - radius and radius <= col < src.width - radius
+            return src.read(1, window=window, boundless=not inside)
+
+
+class LandcoverCatalog:
+    """
+    All land cover tiles of a directory, indexed by WGS84 footprint.
+    Each lookup touches only the tile containing the point.
+    """
+
+    def __init__(self, landcover_dir):
+        files = sorted(
+            os.path.join(landcover_dir, f)
+            for f in os.listdir(landcover_dir)
+            if f.lower().endswith(".tif")
+        )
+        if not files:
+            raise RuntimeError("No ESRI land cover GeoTIFFs found")
+
+        self.tiles = [LandcoverTile(f) for f in files]
+        self.index = FootprintIndex(self.tiles)
+
+    def locate(self, lat, lon):
+        return self.index.locate(lat, lon)
+
+    def sample(self, lat, lon, radius=1):
+        """
+        Land cover window around the point, or None outside coverage.
+        """
+        found = self.locate(lat, lon)
+        if found is None:
+            return None
+
+        tile, x, y = found
+        row, col = tile.src.index(x, y)
+        return tile.read_window(row, col, radius)
+
+    def majority_many(self, lats, lons):
+        """
+        3x3 majority class for arrays of points.
+
+        Points are grouped by tile and by READ_BLOCK-sized block; every
+        needed block is read once (with a one-pixel halo) and all
+        windows are reduced together.
+
+        Returns:
+            int array: -1 outside coverage, 0 no valid data, else class
+        """
+        found, xs, ys = self.index.locate_many(lats, lons)
+        result = np.where(found < 0, -1, 0).astype(np.int16)
+
+        for t in np.unique(found[found >= 0]):
+            tile = self.tiles[t]
+            idx = np.flatnonzero(found == t)
+
+            inv = ~tile.src.transform
+            cols, rows = inv * (xs[idx], ys[idx])
+            rows = np.floor(rows).astype(np.int64)
+            cols = np.floor(cols).astype(np.int64)
+
+            block_keys = (rows // READ_BLOCK) * (1 << 32) + (cols // READ_BLOCK)
+            for key in np.unique(block_keys):
+                sel = np.flatnonzero(block_keys == key)
+                r0 = int(rows[sel[0]] // READ_BLOCK) * READ_BLOCK - 1
+                c0 = int(cols[sel[0]] // READ_BLOCK) * READ_BLOCK - 1
+
+                block = tile.read_block(r0, r0 + READ_BLOCK + 2, c0, c0 + READ_BLOCK + 2)
+
+                rr = rows[sel] - r0
+                cc = cols[sel] - c0
+                offsets = np.arange(-1, 2)
+                windows = block[
+                    rr[:, None, None] + offsets[None, :, None],
+                    cc[:, None, None] + offsets[None, None, :]
+                ]
+                result[idx[sel]] = majority_windows(windows)
+
+        return result
+
+
+_CATALOG = None
+_CATALOG_LOCK = threading.Lock()
+
+
+def get_landcover_catalog(landcover_dir):
+    """
+    Process-wide catalog, built on first use.
+    """
+    global _CATALOG
+
+    with _CATALOG_LOCK:
+        if _CATALOG is None:
+            _CATALOG = LandcoverCatalog(landcover_dir)
+        return _CATALOG
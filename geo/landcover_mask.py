@@ -0,0 +1,175 @@
+# geo/landcover_mask.py
+# Precomputed 3x3 majority land cover classes (built by tools/build_landcover_mask.py)
+#
+# Format (one .c4 file per source tile + index.json):
+#   - 4 bits per pixel (majority ESRI class, 0 = no valid data)
+#   - pixels stored in blocks of BLOCK_ROWS x BLOCK_COLS (one 4 KiB page),
+#     blocks in row-major order, rows inside a block nibble-packed
+#     (high nibble = even column)
+
+import json
+import os
+
+import numpy as np
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.coords import BoundingBox
+
+from geo.landcover_catalog import FootprintIndex
+from geo.metrics import RASTER_READS
+
+LANDCOVER_MASK_DIR = os.getenv(
+    "SWC_LANDCOVER_MASK_DIR",
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "data",
+        "landcover_mask"
+    )
+)
+
+BLOCK_ROWS = 64
+BLOCK_COLS = 128
+BLOCK_BYTES = BLOCK_ROWS * BLOCK_COLS // 2
+
+
+# ------------------------------------------------------------------
+# ENCODING
+# ------------------------------------------------------------------
+
+def blocks_across(width):
+    return -(-width // BLOCK_COLS)
+
+
+def pack_block_row(classes):
+    """
+    Encode up to BLOCK_ROWS rows of classes (uint8, 0..15) as one
+    row of blocks. Returns bytes of length blocks_across(W) * BLOCK_BYTES.
+    """
+    h, w = classes.shape
+    nbx = blocks_across(w)
+
+    padded = np.zeros((BLOCK_ROWS, nbx * BLOCK_COLS), dtype=np.uint8)
+    padded[:h, :w] = classes
+
+    blocks = padded.reshape(BLOCK_ROWS, nbx, BLOCK_COLS).transpose(1, 0, 2)
+    packed = (blocks[:, :, 0::2] << 4) | blocks[:, :, 1::2]
+    return np.ascontiguousarray(packed).tobytes()
+
+
+def pixel_offset(row, col, width):
+    """
+    Byte offset of a pixel and whether it is the high nibble.
+    """
+    block = (row // BLOCK_ROWS) * blocks_across(width) + col // BLOCK_COLS
+    offset = (
+        block * BLOCK_BYTES
+        + (row % BLOCK_ROWS) * (BLOCK_COLS // 2)
+        + (col % BLOCK_COLS) // 2
+    )
+    return offset, col % 2 == 0
+
+
+# ------------------------------------------------------------------
+# LOOKUP
+# ------------------------------------------------------------------
+
+class MaskTile:
+    """
+    One memory-mapped class mask. Pages are shared read-only by all
+    processes mapping the same file.
+    """
+
+    def __init__(self, mask_dir, meta):
+        self.name = meta["name"]
+        self.crs = CRS.from_user_input(meta["crs"])
+        self.transform = Affine(*meta["transform"])
+        self.width = meta["width"]
+        self.height = meta["height"]
+        self.bounds = BoundingBox(*meta["bounds"])
+        self.wgs84_bounds = tuple(meta["wgs84_bounds"])
+
+        self.data = np.memmap(
+            os.path.join(mask_dir, meta["file"]), dtype=np.uint8, mode="r"
+        )
+        self._inverse = ~self.transform
+
+    def rowcol(self, x, y):
+        col, row = self._inverse * (x, y)
+        return int(np.floor(row)), int(np.floor(col))
+
+    def majority_at(self, row, col):
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            return 0
+
+        offset, high = pixel_offset(row, col, self.width)
+        byte = int(self.data[offset])
+        return byte >> 4 if high else byte & 0x0F
+
+
+class LandcoverMask:
+    """
+    All precomputed masks of a directory, indexed by WGS84 footprint.
+    """
+
+    def __init__(self, mask_dir=LANDCOVER_MASK_DIR):
+        with open(os.path.join(mask_dir, "index.json")) as f:
+            index = json.load(f)
+
+        self.tiles = [MaskTile(mask_dir, meta) for meta in index["tiles"]]
+        self.index = FootprintIndex(self.tiles)
+
+    def majority(self, lat, lon):
+        """
+        Majority class at the point: None outside coverage,
+        0 when the 3x3 window had no valid data.
+        """
+        found = self.index.locate(lat, lon)
+        if found is None:
+            return None
+
+        tile, x, y = found
+        RASTER_READS.inc(raster="landcover_mask")
+        return tile.majority_at(*tile.rowcol(x, y))
+
+    def majority_many(self, lats, lons):
+        """
+        Vectorized majority: -1 outside coverage, 0 no valid data, else class.
+        """
+        found, xs, ys = self.index.locate_many(lats, lons)
+        result = np.where(found < 0, -1, 0).astype(np.int16)
+
+        for t in np.unique(found[found >= 0]):
+            tile = self.tiles[t]
+            idx = np.flatnonzero(found == t)
+
+            cols, rows = tile._inverse * (xs[idx], ys[idx])
+            rows = np.floor(rows).astype(np.int64)
+            cols = np.floor(cols).astype(np.int64)
+
+            ok = (rows >= 0) & (rows < tile.height) & (cols >= 0) & (cols < tile.width)
+            offsets, high = pixel_offset(rows[ok], cols[ok], tile.width)
+            data = tile.data[offsets]
+            RASTER_READS.inc(len(offsets), raster="landcover_mask")
+
+            result[idx[ok]] = np.where(high, data >> 4, data & 0x0F)
+
+        return result
+
+
+_MASK = None
+_MASK_LOADED = False
+
+
+def get_landcover_mask(mask_dir=LANDCOVER_MASK_DIR):
+    """
+    Process-wide LandcoverMask, or None when no mask has been built.
+    Loading before workers fork keeps a single shared mapping.
+    """
+    global _MASK, _MASK_LOADED
+
+    if not _MASK_LOADED:
+        exists = os.path.exists(os.path.join(mask_dir, "index.json"))
+        _MASK = LandcoverMask(mask_dir) if exists else None
+        _MASK_LOADED = True
+
+    return _MASK
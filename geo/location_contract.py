@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -13,3 +13,12 @@ class LocationFactors:
 
     soil_depth: str      # SHALLOW | MEDIUM | DEEP
     drainage: str        # POOR | MODERATE | GOOD
+
+    # Per-sensor wall time (ms); "timed_out" lists sensors past the deadline
+    timings: dict = field(default_factory=dict)
+
+    # {factor field: reason} for measurements replaced by their fallback
+    fallbacks: dict = field(default_factory=dict)
+
+    # {factor field: provider} that measured each factor (geo/providers.py)
+    providers: dict = field(default_factory=dict)
@@ -1,15 +1,18 @@
 from geo.geocoder import reverse_geocode
+from geo.providers import collect_providers
 
 def resolve_location(lat, lon):
     """
     Resolves administrative context from GPS.
     Subdivision logic intentionally removed.
     """
-    location = reverse_geocode(lat, lon)
+    with collect_providers() as answered:
+        location = reverse_geocode(lat, lon)
 
     return {
         "latitude": lat,
         "longitude": lon,
         "state": location.get("state"),
-        "district": location.get("district")
+        "district": location.get("district"),
+        "provider": answered.get("geocoder")
     }
@@ -0,0 +1,228 @@
+# geo/metrics.py
+# In-process Prometheus metrics (text exposition format) and per-request
+# stage timings for the Server-Timing header
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of duration histograms (+Inf implied)
+DURATION_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def sample_line(name, labels, value):
+    return f"{name}{_labels(labels)} {_number(value)}"
+
+
+def family_header(name, kind, help_text):
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def histogram_lines(name, labels, bounds, counts, total):
+    """
+    Sample lines of one histogram series from per-bucket (non-cumulative)
+    counts; counts has one more entry than bounds (the +Inf bucket).
+    """
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(bounds) + [float("inf")], counts):
+        cumulative += count
+        lines.append(sample_line(f"{name}_bucket", {**labels, "le": _number(float(bound))}, cumulative))
+    lines.append(sample_line(f"{name}_sum", labels, round(total, 6)))
+    lines.append(sample_line(f"{name}_count", labels, cumulative))
+    return lines
+
+
+# ------------------------------------------------------------------
+# METRIC TYPES
+# ------------------------------------------------------------------
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def collect(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = family_header(self.name, "counter", self.help_text)
+        for key, value in values:
+            lines.append(sample_line(self.name, dict(zip(self.labelnames, key)), value))
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS_S):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [counts, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        bucket = len(self.buckets)
+        for k, bound in enumerate(self.buckets):
+            if value <= bound:
+                bucket = k
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bucket] += 1
+            series[1] += value
+
+    def count(self, **labels):
+        series = self._series.get(tuple(str(labels[n]) for n in self.labelnames))
+        return 0 if series is None else sum(series[0])
+
+    def collect(self):
+        with self._lock:
+            series = sorted((k, list(c), s) for k, (c, s) in self._series.items())
+        lines = family_header(self.name, "histogram", self.help_text)
+        for key, counts, total in series:
+            lines += histogram_lines(
+                self.name, dict(zip(self.labelnames, key)), self.buckets, counts, total
+            )
+        return lines
+
+
+class Registry:
+    """
+    Metrics owned here plus collectors: callables returning exposition
+    lines for state kept elsewhere (cache stats, breakers, HTTP pools).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS_S):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        with self._lock:
+            self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        with self._lock:
+            sources = [m.collect for m in self._metrics] + list(self._collectors)
+
+        lines = []
+        for collect in sources:
+            try:
+                lines += collect()
+            except Exception as e:
+                print("Metrics collector failed:", e)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "swc_request_duration_seconds", "HTTP request latency by endpoint", ["endpoint", "status"]
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "swc_stage_duration_seconds", "Latency of one analysis stage", ["stage"]
+)
+FALLBACKS = REGISTRY.counter(
+    "swc_fallbacks_total", "Factors replaced by their conservative fallback", ["factor", "reason"]
+)
+RASTER_READS = REGISTRY.counter(
+    "swc_raster_reads_total", "Windows or blocks read from local rasters", ["raster"]
+)
+
+
+# ------------------------------------------------------------------
+# STAGE TIMINGS
+# ------------------------------------------------------------------
+
+# [(stage, ms)] of the request being served (None outside a request)
+_REQUEST_STAGES = contextvars.ContextVar("swc_request_stages", default=None)
+
+
+def begin_request():
+    """
+    Start collecting stage timings for the current request.
+    """
+    stages = []
+    _REQUEST_STAGES.set(stages)
+    return stages
+
+
+def request_stages():
+    return _REQUEST_STAGES.get() or []
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    stages = _REQUEST_STAGES.get()
+    if stages is not None:
+        stages.append((name, seconds * 1000))
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block as one stage (histogram, plus Server-Timing when
+    inside a request).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def server_timing(stages):
+    """
+    Server-Timing header value; repeated stages are summed.
+    """
+    totals = {}
+    for name, ms in stages:
+        totals[name] = totals.get(name, 0.0) + ms
+    return ", ".join(f"{name};dur={ms:.2f}" for name, ms in totals.items())
@@ -0,0 +1,241 @@
+# geo/providers.py
+# Registry of data providers behind each sensor (rainfall, slope, geocoder):
+# local packs first, network APIs as fallbacks, ordered per deployment
+
+import asyncio
+import contextvars
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import numpy as np
+
+# Providers tried per factor, first to last: the first one covering a
+# point answers. Override with SWC_PROVIDERS_<FACTOR>="name,name,..."
+DEFAULT_PROVIDERS = {
+    "rainfall": "pack,power_cache,power",
+    "slope": "raster,terrain_rgb",
+    "geocoder": "boundaries,nominatim",
+}
+
+# Zero-network deployments: network providers are skipped entirely
+OFFLINE = os.getenv("SWC_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+
+def _configured_order(factor, default):
+    value = os.getenv(f"SWC_PROVIDERS_{factor.upper()}") or default
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+PROVIDER_ORDER = {factor: _configured_order(factor, names) for factor, names in DEFAULT_PROVIDERS.items()}
+
+
+class NoProviderError(RuntimeError):
+    """
+    Raised when no configured provider covers a point.
+    """
+
+
+class Provider(ABC):
+    """
+    One source of a factor.
+
+    lookup returns the value, or None when the provider does not cover
+    the point (e.g. outside a local pack); failures raise. Subclasses
+    with a native async or array path override lookup_async /
+    lookup_many.
+    """
+
+    name = None
+    network = False
+
+    def available(self):
+        """
+        Whether the provider can answer at all (its pack exists, its
+        credentials are set).
+        """
+        return True
+
+    @abstractmethod
+    def lookup(self, lat, lon):
+        """
+        Value at the point, or None when the provider does not cover it.
+        """
+
+    async def lookup_async(self, lat, lon, **kwargs):
+        return await asyncio.to_thread(self.lookup, lat, lon)
+
+    def lookup_many(self, lats, lons):
+        """
+        Float array of lookups, NaN where lookup returns None or fails.
+        """
+        values = np.full(len(lats), np.nan)
+        for k, (lat, lon) in enumerate(zip(np.asarray(lats).tolist(), np.asarray(lons).tolist())):
+            try:
+                value = self.lookup(lat, lon)
+            except Exception as e:
+                print(f"Provider {self.name} failed:", e)
+                continue
+            if value is not None:
+                values[k] = value
+        return values
+
+
+# ------------------------------------------------------------------
+# ANSWERING PROVIDERS (per request)
+# ------------------------------------------------------------------
+
+# {factor: provider name (or per-point names of an array lookup)}
+_ANSWERED = contextvars.ContextVar("swc_providers_answered", default=None)
+
+
+@contextmanager
+def collect_providers():
+    """
+    Collect the provider that answered each factor looked up inside the
+    block (tasks and context-copied threads started in it included).
+    """
+    answered = {}
+    token = _ANSWERED.set(answered)
+    try:
+        yield answered
+    finally:
+        _ANSWERED.reset(token)
+
+
+def record_provider(factor, name):
+    answered = _ANSWERED.get()
+    if answered is not None:
+        answered[factor] = name
+
+
+def answered_provider(factor):
+    answered = _ANSWERED.get()
+    return None if answered is None else answered.get(factor)
+
+
+# ------------------------------------------------------------------
+# REGISTRY
+# ------------------------------------------------------------------
+
+class ProviderRegistry:
+    def __init__(self, order=None, offline=OFFLINE):
+        self.order = {f: list(names) for f, names in (PROVIDER_ORDER if order is None else order).items()}
+        self.offline = offline
+        self._providers = {}  # factor -> {name: Provider}
+        self._lock = threading.Lock()
+
+    def register(self, factor, provider):
+        with self._lock:
+            self._providers.setdefault(factor, {})[provider.name] = provider
+        return provider
+
+    def chain(self, factor):
+        """
+        Providers of a factor in configured order (network ones dropped
+        when offline; unknown names ignored).
+        """
+        with self._lock:
+            registered = dict(self._providers.get(factor, {}))
+
+        providers = []
+        for name in self.order.get(factor, list(registered)):
+            provider = registered.get(name)
+            if provider is None or (self.offline and provider.network):
+                continue
+            providers.append(provider)
+        return providers
+
+    def resolve(self, factor, lat, lon):
+        """
+        (value, provider name) from the first provider covering the point.
+
+        A failing provider is skipped; when none answers, the last
+        failure (or NoProviderError) is raised.
+        """
+        error = None
+        for provider in self.chain(factor):
+            try:
+                value = provider.lookup(lat, lon)
+            except Exception as e:
+                print(f"Provider {provider.name} failed:", e)
+                error = e
+                continue
+            if value is not None:
+                record_provider(factor, provider.name)
+                return value, provider.name
+
+        raise error or NoProviderError(f"No {factor} provider covers {lat}, {lon}")
+
+    async def resolve_async(self, factor, lat, lon, **kwargs):
+        """
+        Async resolve; kwargs (timeout, session) go to each provider's
+        lookup_async.
+        """
+        error = None
+        for provider in self.chain(factor):
+            try:
+                value = await provider.lookup_async(lat, lon, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Provider {provider.name} failed:", e)
+                error = e
+                continue
+            if value is not None:
+                record_provider(factor, provider.name)
+                return value, provider.name
+
+        raise error or NoProviderError(f"No {factor} provider covers {lat}, {lon}")
+
+    def resolve_many(self, factor, lats, lons):
+        """
+        Array resolve: each provider is asked for the points still
+        unanswered.
+
+        Returns:
+            (values: float array, NaN where no provider answered,
+             names: object array of provider names, None there)
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        values = np.full(len(lats), np.nan)
+        names = np.full(len(lats), None, dtype=object)
+
+        for provider in self.chain(factor):
+            todo = np.flatnonzero(np.isnan(values))
+            if not todo.size:
+                break
+            try:
+                found = np.asarray(provider.lookup_many(lats[todo], lons[todo]), dtype=np.float64)
+            except Exception as e:
+                print(f"Provider {provider.name} failed:", e)
+                continue
+
+            hit = ~np.isnan(found)
+            values[todo[hit]] = found[hit]
+            names[todo[hit]] = provider.name
+
+        return values, names
+
+    def describe(self):
+        """
+        Configured chain of every factor, for /health.
+        """
+        with self._lock:
+            factors = sorted(self._providers)
+
+        return {
+            "offline": self.offline,
+            **{
+                factor: [
+                    {"name": p.name, "network": p.network, "available": p.available()}
+                    for p in self.chain(factor)
+                ]
+                for factor in factors
+            }
+        }
+
+
+PROVIDERS = ProviderRegistry()
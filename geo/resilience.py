@@ -0,0 +1,303 @@
+# geo/resilience.py
+# Latency budgets, circuit breakers and hedged calls for the remote sensors
+# (NASA POWER, Mapbox Terrain-RGB, Nominatim)
+
+import asyncio
+import os
+import threading
+import time
+
+from geo.metrics import REGISTRY, family_header, sample_line
+
+# Consecutive failures that open an upstream's circuit
+BREAKER_FAILURES = int(os.getenv("SWC_BREAKER_FAILURES", 5))
+
+# Seconds an open circuit fails fast before one trial call is let through
+BREAKER_RESET_S = float(os.getenv("SWC_BREAKER_RESET_S", 30))
+
+# Send a second, identical request when the first has not answered after
+# this many seconds (async path only; 0 disables hedging)
+HEDGE_AFTER_S = float(os.getenv("SWC_HEDGE_AFTER_S", 0))
+
+# Per-request latency budget, and the share of it each stage may use
+REQUEST_BUDGET_S = float(os.getenv("SWC_REQUEST_BUDGET_S", 10))
+STAGE_BUDGETS_S = {
+    "rainfall": float(os.getenv("SWC_BUDGET_RAINFALL_S", 8)),
+    "slope": float(os.getenv("SWC_BUDGET_SLOPE_S", 8)),
+}
+
+# Upstream behind each measured factor
+SOURCE_UPSTREAMS = {
+    "rainfall": "power",
+    "slope": "terrain",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling an upstream whose circuit is open.
+    """
+
+
+class Budget:
+    """
+    Latency budget of one request. A stage may run until its own cap
+    (counted from the start of the request) and never past the end of
+    the total budget.
+    """
+
+    def __init__(self, total_s=REQUEST_BUDGET_S, stages=None, clock=time.monotonic):
+        self.total_s = total_s
+        self.stages = dict(STAGE_BUDGETS_S if stages is None else stages)
+        self.clock = clock
+        self._start = clock()
+
+    def remaining(self):
+        return max(0.0, self._start + self.total_s - self.clock())
+
+    def for_stage(self, name):
+        """
+        Seconds the stage has left.
+        """
+        cap = self.stages.get(name)
+        remaining = self.remaining()
+        if cap is None:
+            return remaining
+        return min(max(0.0, self._start + cap - self.clock()), remaining)
+
+
+# ------------------------------------------------------------------
+# CIRCUIT BREAKER
+# ------------------------------------------------------------------
+
+def is_upstream_failure(error):
+    """
+    Whether an error says the upstream is unhealthy. Client errors (4xx,
+    e.g. a tile outside coverage) do not count, except 429.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int) and 400 <= status < 500 and status != 429:
+        return False
+    return True
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive failures; open fails fast
+    for `reset_s`, then half-open lets one trial call through: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_s=BREAKER_RESET_S,
+                 clock=time.monotonic):
+        self.name = name
+        self.failures = failures
+        self.reset_s = reset_s
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        # Callers hold the lock
+        if self._opened_at is None:
+            return "closed"
+        if self.clock() - self._opened_at >= self.reset_s:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """
+        Whether a call may go out now (counted as rejected otherwise).
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed" or (state == "half_open" and not self._trial):
+                self._trial = state == "half_open"
+                self.stats["calls"] += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.stats["failures"] += 1
+            self._consecutive += 1
+            if self._trial or self._consecutive >= self.failures:
+                if self._opened_at is None or self._trial:
+                    self.stats["opened"] += 1
+                self._opened_at = self.clock()
+            self._trial = False
+
+    def release(self):
+        """
+        A call ended without a verdict (cancelled): free the trial slot.
+        """
+        with self._lock:
+            self._trial = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self._state(),
+                "consecutive_failures": self._consecutive,
+                **self.stats
+            }
+
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(upstream):
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(upstream)
+        if breaker is None:
+            breaker = _BREAKERS[upstream] = CircuitBreaker(upstream)
+        return breaker
+
+
+def breaker_states():
+    """
+    {upstream: snapshot} of every upstream called so far.
+    """
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+def reset_breakers():
+    with _BREAKERS_LOCK:
+        _BREAKERS.clear()
+
+
+@REGISTRY.register_collector
+def _collect_breakers():
+    states = sorted(breaker_states().items())
+    codes = {"closed": 0, "half_open": 1, "open": 2}
+
+    lines = family_header(
+        "swc_circuit_state", "gauge", "Circuit state per upstream (0 closed, 1 half-open, 2 open)"
+    )
+    lines += [sample_line("swc_circuit_state", {"upstream": u}, codes[s["state"]]) for u, s in states]
+    for stat, help_text in (
+        ("rejected", "Calls failed fast by an open circuit"),
+        ("opened", "Times a circuit opened"),
+    ):
+        name = f"swc_circuit_{stat}_total"
+        lines += family_header(name, "counter", help_text)
+        lines += [sample_line(name, {"upstream": u}, s[stat]) for u, s in states]
+    return lines
+
+
+def source_circuit_open(source):
+    """
+    Whether the upstream behind a factor source is failing fast.
+    """
+    upstream = SOURCE_UPSTREAMS.get(source)
+    return upstream is not None and get_breaker(upstream).state == "open"
+
+
+# ------------------------------------------------------------------
+# GUARDED CALLS
+# ------------------------------------------------------------------
+
+def guarded(upstream, fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs) behind the upstream's circuit breaker.
+
+    Raises:
+        CircuitOpenError without calling fn while the circuit is open
+    """
+    breaker = get_breaker(upstream)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{upstream} circuit open")
+
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        if is_upstream_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+
+    breaker.record_success()
+    return result
+
+
+async def _hedged(make_call, hedge_after_s):
+    """
+    Await make_call(); if it has not finished after hedge_after_s, start
+    a second copy and take whichever succeeds first (the other is
+    cancelled). Fails only when every attempt failed.
+    """
+    tasks = [asyncio.ensure_future(make_call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after_s)
+        if not done:
+            tasks.append(asyncio.ensure_future(make_call()))
+
+        error = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def guarded_async(upstream, make_call, timeout=None, hedge_after_s=HEDGE_AFTER_S):
+    """
+    Async guarded: await make_call() (a coroutine factory, so hedging can
+    issue it twice) within `timeout` seconds. A timeout counts as a
+    failure of the upstream; cancellation by the caller does not.
+
+    Raises:
+        CircuitOpenError while the circuit is open,
+        asyncio.TimeoutError past the timeout
+    """
+    breaker = get_breaker(upstream)
+    if not breaker.allow():
+        raise CircuitOpenError(f"{upstream} circuit open")
+
+    if hedge_after_s and (timeout is None or hedge_after_s < timeout):
+        call = _hedged(make_call, hedge_after_s)
+    else:
+        call = make_call()
+
+    try:
+        result = await asyncio.wait_for(call, timeout)
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception as e:
+        if is_upstream_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+
+    breaker.record_success()
+    return result
@@ -1,17 +1,133 @@
-import requests
+import asyncio
+import os
 
+import numpy as np
 
-def fetch_rainfall_mm(lat, lon):
+from geo.aio import get_session
+from geo.http_client import http_get, http_get_async
+from geo.providers import PROVIDERS, Provider, record_provider
+from geo.resilience import guarded, guarded_async
+from geo.sensors.rainfall_store import (
+    POWER_LAT_STEP,
+    POWER_LON_STEP,
+    RainfallCellCache,
+    get_rainfall_pack,
+    power_cell,
+    power_cell_center
+)
+
+POWER_URL = os.getenv(
+    "SWC_POWER_URL", "https://power.larc.nasa.gov/api/temporal/climatology/point"
+)
+
+# Conservative India-wide climatological fallback
+RAINFALL_FALLBACK_MM = 1200.0
+
+# Longest single POWER request (seconds)
+POWER_TIMEOUT_S = float(os.getenv("SWC_POWER_TIMEOUT_S", 8))
+
+# Per-cell results shared across requests, workers and restarts
+CELL_CACHE = RainfallCellCache()
+
+
+def fetch_power_annual_mm(lat, lon):
     """
-    Fetch long-term mean ANNUAL rainfall (mm)
-    using NASA POWER climatology (PRECTOTCORR).
+    Query NASA POWER climatology (PRECTOTCORR) for one point.
 
     Units from API: mm/day (annual mean)
     Converted to: mm/year
     """
 
-    url = "https://power.larc.nasa.gov/api/temporal/climatology/point"
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "parameters": "PRECTOTCORR",
+        "community": "AG",
+        "format": "JSON"
+    }
+
+    response = http_get(POWER_URL, params=params, timeout=POWER_TIMEOUT_S)
+    response.raise_for_status()
+    data = response.json()
+
+    # NASA POWER climatology gives annual mean in mm/day
+    mm_per_day = data["properties"]["parameter"]["PRECTOTCORR"]["ANN"]
+
+    annual_mm = mm_per_day * 365.0
+
+    return round(float(annual_mm), 2)
+
+
+# ------------------------------------------------------------------
+# PROVIDERS
+# ------------------------------------------------------------------
+
+class RainfallPackProvider(Provider):
+    """
+    Offline pack (tools/build_rainfall_pack.py), memory-mapped.
+    """
+
+    name = "pack"
+
+    def available(self):
+        return get_rainfall_pack() is not None
+
+    def lookup(self, lat, lon):
+        pack = get_rainfall_pack()
+        return None if pack is None else pack.get(*power_cell(lat, lon))
+
+    async def lookup_async(self, lat, lon, **kwargs):
+        # A memory-mapped array read: cheaper inline than a thread hop
+        return self.lookup(lat, lon)
+
+
+class PowerCacheProvider(Provider):
+    """
+    POWER cells fetched before (persistent per-cell cache).
+    """
+
+    name = "power_cache"
+
+    def lookup(self, lat, lon):
+        return CELL_CACHE.get(*power_cell(lat, lon))
+
+
+class PowerProvider(Provider):
+    """
+    NASA POWER API at the cell centre (result stored in the cell cache),
+    unless its circuit is open.
+    """
+
+    name = "power"
+    network = True
+
+    def lookup(self, lat, lon):
+        i, j = power_cell(lat, lon)
+        annual_mm = guarded("power", fetch_power_annual_mm, *power_cell_center(i, j))
+        CELL_CACHE.set(i, j, annual_mm)
+        return annual_mm
+
+    async def lookup_async(self, lat, lon, session=None, timeout=POWER_TIMEOUT_S):
+        i, j = power_cell(lat, lon)
+        center = power_cell_center(i, j)
+        annual_mm = await guarded_async(
+            "power",
+            lambda: fetch_power_annual_mm_async(*center, session=session, timeout=timeout),
+            timeout=timeout
+        )
+        # The cell cache is SQLite: write it off the loop
+        await asyncio.to_thread(CELL_CACHE.set, i, j, annual_mm)
+        return annual_mm
+
 
+for _provider in (RainfallPackProvider(), PowerCacheProvider(), PowerProvider()):
+    PROVIDERS.register("rainfall", _provider)
+
+
+async def fetch_power_annual_mm_async(lat, lon, session=None, timeout=POWER_TIMEOUT_S):
+    """
+    Async fetch_power_annual_mm (cancellable).
+    """
     params = {
         "latitude": lat,
         "longitude": lon,
@@ -20,20 +136,92 @@ def fetch_rainfall_mm(lat, lon):
         "format": "JSON"
     }
 
+    response = await http_get_async(
+        session or get_session(), POWER_URL, params=params, timeout=timeout
+    )
+    response.raise_for_status()
+    data = await response.json(content_type=None)
+
+    mm_per_day = data["properties"]["parameter"]["PRECTOTCORR"]["ANN"]
+
+    return round(float(mm_per_day * 365.0), 2)
+
+
+async def fetch_rainfall_mm_async(lat, lon, session=None, timeout=None):
+    """
+    Async fetch_rainfall_mm: same providers, fallback and
+    (rainfall_mm, fell_back) result. Cancelling it aborts the POWER
+    request; `timeout` (seconds) caps the request below POWER_TIMEOUT_S.
+    """
+    timeout = POWER_TIMEOUT_S if timeout is None else min(timeout, POWER_TIMEOUT_S)
+
     try:
-        response = requests.get(url, params=params, timeout=20)
-        response.raise_for_status()
-        data = response.json()
+        annual_mm, _ = await PROVIDERS.resolve_async(
+            "rainfall", lat, lon, session=session, timeout=timeout
+        )
+        return annual_mm, False
+
+    except asyncio.CancelledError:
+        raise
+
+    except Exception as e:
+        print("Rainfall lookup failed:", e)
+
+        # Conservative India-wide climatological fallback
+        return RAINFALL_FALLBACK_MM, True
 
-        # NASA POWER climatology gives annual mean in mm/day
-        mm_per_day = data["properties"]["parameter"]["PRECTOTCORR"]["ANN"]
 
-        annual_mm = mm_per_day * 365.0
+def fetch_rainfall_mm(lat, lon):
+    """
+    Fetch long-term mean ANNUAL rainfall (mm).
 
-        return round(float(annual_mm), 2)
+    Lookups are snapped to the POWER grid cell and answered by the
+    configured rainfall providers (geo/providers.py): by default the
+    offline pack, then cells fetched before, then the NASA POWER
+    climatology API (PRECTOTCORR).
+
+    Returns:
+        (rainfall_mm, fell_back: True when RAINFALL_FALLBACK_MM was used)
+    """
+
+    try:
+        annual_mm, _ = PROVIDERS.resolve("rainfall", lat, lon)
+        return annual_mm, False
 
     except Exception as e:
-        print("NASA POWER rainfall API failed:", e)
+        print("Rainfall lookup failed:", e)
 
         # Conservative India-wide climatological fallback
-        return 1200.0
+        return RAINFALL_FALLBACK_MM, True
+
+
+def fetch_rainfall_mm_many(lats, lons):
+    """
+    Array version of fetch_rainfall_mm: each distinct POWER cell
+    is resolved once.
+
+    Returns:
+        (rainfall_mm: float array,
+         fell_back: bool array, True where RAINFALL_FALLBACK_MM was used)
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+
+    # Same snapping as power_cell (round half to even, like round())
+    i = np.round((lats + 90.0) / POWER_LAT_STEP).astype(np.int64)
+    j = np.round((lons + 180.0) / POWER_LON_STEP).astype(np.int64)
+
+    cells, inverse = np.unique(np.stack([i, j], axis=1), axis=0, return_inverse=True)
+    values, names = PROVIDERS.resolve_many(
+        "rainfall",
+        -90.0 + cells[:, 0] * POWER_LAT_STEP,
+        -180.0 + cells[:, 1] * POWER_LON_STEP
+    )
+
+    inverse = inverse.reshape(-1)
+    values, names = values[inverse], names[inverse]
+    record_provider("rainfall", names)
+
+    fell_back = np.isnan(values)
+    values[fell_back] = RAINFALL_FALLBACK_MM
+    return values, fell_back
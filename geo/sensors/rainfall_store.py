@@ -0,0 +1,168 @@
+# geo/sensors/rainfall_store.py
+# NASA POWER grid snapping, persistent per-cell cache and offline pack
+
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data"
+)
+
+RAINFALL_CACHE_PATH = os.getenv(
+    "SWC_RAINFALL_CACHE",
+    os.path.join(DATA_DIR, "cache", "rainfall_cells.sqlite")
+)
+
+RAINFALL_PACK_PATH = os.getenv(
+    "SWC_RAINFALL_PACK",
+    os.path.join(DATA_DIR, "rainfall", "power_climatology.npy")
+)
+
+# NASA POWER (MERRA-2) grid: 0.5° latitude x 0.625° longitude
+POWER_LAT_STEP = 0.5
+POWER_LON_STEP = 0.625
+
+
+# ------------------------------------------------------------------
+# GRID SNAPPING
+# ------------------------------------------------------------------
+
+def power_cell(lat, lon):
+    """
+    Index (i, j) of the POWER grid cell containing a point.
+    """
+    i = int(round((lat + 90.0) / POWER_LAT_STEP))
+    j = int(round((lon + 180.0) / POWER_LON_STEP))
+    return i, j
+
+
+def power_cell_center(i, j):
+    return -90.0 + i * POWER_LAT_STEP, -180.0 + j * POWER_LON_STEP
+
+
+# ------------------------------------------------------------------
+# PERSISTENT CELL CACHE
+# ------------------------------------------------------------------
+
+class RainfallCellCache:
+    """
+    SQLite-backed cache of annual rainfall (mm) per POWER grid cell.
+    Shared by all worker processes; survives restarts.
+    """
+
+    def __init__(self, path=RAINFALL_CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rainfall ("
+                "i INTEGER, j INTEGER, annual_mm REAL, PRIMARY KEY (i, j))"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, i, j):
+        row = self._conn().execute(
+            "SELECT annual_mm FROM rainfall WHERE i = ? AND j = ?", (i, j)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, i, j, annual_mm):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO rainfall (i, j, annual_mm) VALUES (?, ?, ?)",
+                (i, j, annual_mm)
+            )
+
+
+# ------------------------------------------------------------------
+# OFFLINE PACK
+# ------------------------------------------------------------------
+
+class RainfallPack:
+    """
+    Dense float32 grid of annual rainfall (mm) over the service region,
+    read through a memory map. NaN marks cells without data.
+
+    Sidecar JSON: {"i0": int, "j0": int, "rows": int, "cols": int, ...}
+    """
+
+    def __init__(self, path=RAINFALL_PACK_PATH):
+        with open(path + ".json") as f:
+            meta = json.load(f)
+
+        self.i0 = meta["i0"]
+        self.j0 = meta["j0"]
+        self.grid = np.load(path, mmap_mode="r")
+
+    def get(self, i, j):
+        r, c = i - self.i0, j - self.j0
+        if not (0 <= r < self.grid.shape[0] and 0 <= c < self.grid.shape[1]):
+            return None
+
+        value = float(self.grid[r, c])
+        return None if np.isnan(value) else round(value, 2)
+
+
+def write_rainfall_pack(cells, path=RAINFALL_PACK_PATH, source="NASA POWER PRECTOTCORR ANN"):
+    """
+    Write {(i, j): annual_mm} as a dense pack (+ JSON sidecar).
+    """
+    if not cells:
+        raise ValueError("No rainfall cells to pack")
+
+    i0 = min(i for i, _ in cells)
+    j0 = min(j for _, j in cells)
+    rows = max(i for i, _ in cells) - i0 + 1
+    cols = max(j for _, j in cells) - j0 + 1
+
+    grid = np.full((rows, cols), np.nan, dtype=np.float32)
+    for (i, j), value in cells.items():
+        grid[i - i0, j - j0] = value
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, grid)
+    os.replace(tmp, path)
+
+    with open(path + ".json", "w") as f:
+        json.dump({
+            "i0": i0,
+            "j0": j0,
+            "rows": rows,
+            "cols": cols,
+            "lat_step": POWER_LAT_STEP,
+            "lon_step": POWER_LON_STEP,
+            "source": source
+        }, f, indent=2)
+
+
+_PACK = None
+_PACK_LOADED = False
+
+
+def get_rainfall_pack(path=RAINFALL_PACK_PATH):
+    """
+    Process-wide RainfallPack, or None when no pack has been built.
+    """
+    global _PACK, _PACK_LOADED
+
+    if not _PACK_LOADED:
+        _PACK = RainfallPack(path) if os.path.exists(path) else None
+        _PACK_LOADED = True
+
+    return _PACK
@@ -1,16 +1,53 @@
+import asyncio
 import math
-import requests
+import os
 import numpy as np
 from io import BytesIO
 from PIL import Image
+from dotenv import load_dotenv
+
+from geo.dem.dem_utils import (
+    decode_terrain_rgb,
+    slope_percent_grid,
+    tile_row_resolution
+)
+from geo.aio import get_session
+from geo.http_client import http_get, http_get_async
+from geo.metrics import REGISTRY, family_header, sample_line
+from geo.providers import PROVIDERS, Provider, record_provider
+from geo.resilience import guarded, guarded_async
+from geo.dem.mosaic import SlopeMosaic, latlon_to_pixel
+from geo.dem.slope_raster import get_slope_raster
+from geo.dem.tile_cache import TILE_CACHE_DIR, TerrainTileCache
+
+load_dotenv()
 
 # ------------------------------------------------------------------
 # CONFIG
 # ------------------------------------------------------------------
 
-MAPBOX_TOKEN = "pk.eyJ1IjoicHJhdGVlazk0NTYiLCJhIjoiY21qaTkwZjd0MDNtNzNmcjB1Y2I4NGFqMSJ9.Whh4fHjS_jpVx95gqtGayA"
+# Mapbox access token (from the environment or .env); without it the
+# Terrain-RGB provider only serves tiles already in the tile cache
+MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN")
 DEFAULT_ZOOM = 12  # ICAR-appropriate landform scale
 
+# Terrain-RGB tile endpoint ({z}/{x}/{y} filled in per tile)
+TERRAIN_URL = os.getenv(
+    "SWC_TERRAIN_URL", "https://api.mapbox.com/v4/mapbox.terrain-rgb/{z}/{x}/{y}.pngraw"
+)
+
+# Averaging window around the sampled pixel (5x5)
+SLOPE_WINDOW_RADIUS = 2
+
+# Conservative ICAR-safe fallback
+SLOPE_FALLBACK_PERCENT = 5.0
+
+# Terrain-RGB tile edge (pixels)
+TERRAIN_TILE_SIZE = 256
+
+# Longest single tile download (seconds)
+TERRAIN_TIMEOUT_S = float(os.getenv("SWC_TERRAIN_TIMEOUT_S", 5))
+
 
 # ------------------------------------------------------------------
 # TILE & ELEVATION UTILITIES
@@ -41,71 +78,264 @@ def rgb_to_elevation(r, g, b):
     return (r * 256 * 256 + g * 256 + b) * 0.1 - 10000
 
 
+def _download_elevation_tile(zoom, x, y):
+    """
+    Download one Terrain-RGB tile and decode it to elevations (meters).
+    """
+    response = http_get(_terrain_url(zoom, x, y), timeout=TERRAIN_TIMEOUT_S)
+    response.raise_for_status()
+
+    img = Image.open(BytesIO(response.content))
+
+    return decode_terrain_rgb(np.array(img))
+
+
+def _terrain_url(zoom, x, y):
+    url = TERRAIN_URL.format(z=zoom, x=x, y=y)
+    return f"{url}?access_token={MAPBOX_TOKEN}" if MAPBOX_TOKEN else url
+
+
+def _token_missing():
+    return not MAPBOX_TOKEN and "api.mapbox.com" in TERRAIN_URL
+
+
+def _guarded_download(zoom, x, y):
+    if _token_missing():
+        raise RuntimeError("MAPBOX_TOKEN is not set")
+    return guarded("terrain", _download_elevation_tile, zoom, x, y)
+
+
+def _publish_tile(zoom, x, y, content):
+    elev = decode_terrain_rgb(np.array(Image.open(BytesIO(content))))
+    TILE_CACHE.put(zoom, x, y, elev)
+
+
+async def _download_elevation_tile_async(zoom, x, y, session=None, timeout=TERRAIN_TIMEOUT_S):
+    """
+    Async _download_elevation_tile; the tile is decoded and published
+    to TILE_CACHE (an .npy write) off the loop.
+    """
+    response = await http_get_async(
+        session or get_session(), _terrain_url(zoom, x, y), timeout=timeout
+    )
+    response.raise_for_status()
+    content = await response.read()
+
+    await asyncio.to_thread(_publish_tile, zoom, x, y, content)
+
+
+def _compute_slope_tile(zoom, x, y):
+    """
+    Slope (%) raster for a whole tile, computed once from its elevations.
+    """
+    elev = TILE_CACHE.get(zoom, x, y)
+    res = tile_row_resolution(zoom, y, elev.shape[0])
+    return slope_percent_grid(elev, res, res)
+
+
+# Decoded tiles (and their slope rasters) are reused across requests and restarts
+TILE_CACHE = TerrainTileCache(fetch_tile=_guarded_download)
+SLOPE_TILE_CACHE = TerrainTileCache(
+    fetch_tile=_compute_slope_tile,
+    cache_dir=os.path.join(os.path.dirname(TILE_CACHE_DIR), "terrain_slope")
+)
+
+# Windows crossing a tile edge are read from stitched neighbour tiles
+SLOPE_MOSAIC = SlopeMosaic(TILE_CACHE, SLOPE_TILE_CACHE)
+
+
+@REGISTRY.register_collector
+def _collect_tile_caches():
+    name = "swc_tile_cache_lookups_total"
+    lines = family_header(name, "counter", "Terrain tile cache lookups by cache and result")
+    for cache_name, cache in (("terrain", TILE_CACHE), ("terrain_slope", SLOPE_TILE_CACHE)):
+        stats = dict(cache.stats)
+        for result in ("memory_hits", "disk_hits", "misses"):
+            lines.append(sample_line(name, {"cache": cache_name, "result": result}, stats[result]))
+    return lines
+
+
 # ------------------------------------------------------------------
-# MAIN SLOPE FUNCTION
+# PROVIDERS
 # ------------------------------------------------------------------
 
-def fetch_slope_percent(lat, lon, zoom=DEFAULT_ZOOM):
+def _window_tiles(lat, lon, zoom):
     """
-    Compute landform-scale slope (%) live from Mapbox Terrain-RGB tiles.
+    Terrain tiles the averaging window around a point reads (its own
+    tile plus any neighbour its Horn halo crosses into).
+    """
+    x, y, row, col = latlon_to_pixel(lat, lon, zoom, TERRAIN_TILE_SIZE)
+    reach = SLOPE_WINDOW_RADIUS + 1
 
-    Method:
-    - Fetch terrain tile
-    - Decode elevations
-    - Compute slope over a local neighborhood
-    - Average slopes to remove micro-relief noise
+    xs = range(
+        x + math.floor((col - reach) / TERRAIN_TILE_SIZE),
+        x + math.floor((col + reach) / TERRAIN_TILE_SIZE) + 1
+    )
+    ys = range(
+        y + math.floor((row - reach) / TERRAIN_TILE_SIZE),
+        y + math.floor((row + reach) / TERRAIN_TILE_SIZE) + 1
+    )
+    return [(zoom, tx, ty) for ty in ys for tx in xs]
 
-    This matches ICAR slope interpretation.
+
+class SlopeRasterProvider(Provider):
+    """
+    Precomputed slope raster (tools/build_slope_raster.py), 5x5 window mean.
     """
 
-    x, y = latlon_to_tile(lat, lon, zoom)
+    name = "raster"
 
-    url = (
-        f"https://api.mapbox.com/v4/mapbox.terrain-rgb/"
-        f"{zoom}/{x}/{y}.pngraw?access_token={MAPBOX_TOKEN}"
-    )
+    def available(self):
+        return get_slope_raster() is not None
 
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+    def lookup(self, lat, lon):
+        raster = get_slope_raster()
+        return None if raster is None else raster.sample(lat, lon, SLOPE_WINDOW_RADIUS)
+
+    def lookup_many(self, lats, lons):
+        raster = get_slope_raster()
+        if raster is None:
+            return np.full(len(lats), np.nan)
+        return raster.sample_many(lats, lons, SLOPE_WINDOW_RADIUS)
+
+
+class TerrainRgbProvider(Provider):
+    """
+    Terrain-RGB tiles at DEFAULT_ZOOM (decoded and slope rasters kept in
+    the tile caches), Horn slope averaged over a 5x5 window, stitching
+    neighbour tiles when the window crosses a tile edge.
+    """
+
+    name = "terrain_rgb"
+    network = True
+
+    def __init__(self, zoom=DEFAULT_ZOOM):
+        self.zoom = zoom
+
+    def available(self):
+        return not _token_missing()
+
+    def lookup(self, lat, lon):
+        return SLOPE_MOSAIC.slope_at(lat, lon, self.zoom, SLOPE_WINDOW_RADIUS)
+
+    async def lookup_async(self, lat, lon, session=None, timeout=TERRAIN_TIMEOUT_S):
+        """
+        Missing tiles are downloaded concurrently (cancellable, each
+        within `timeout`); the slope is then read from the warm caches
+        off the loop.
+        """
+        zoom = self.zoom
+        x, y, _, _ = latlon_to_pixel(lat, lon, zoom, TERRAIN_TILE_SIZE)
+        missing = []
+        if not _token_missing():
+            # TILE_CACHE.has may stat the disk cache
+            missing = await asyncio.to_thread(
+                lambda: [t for t in _window_tiles(lat, lon, zoom) if not TILE_CACHE.has(*t)]
+            )
+
+        results = await asyncio.gather(
+            *(
+                guarded_async(
+                    "terrain",
+                    lambda t=t: _download_elevation_tile_async(*t, session=session, timeout=timeout),
+                    timeout=timeout
+                )
+                for t in missing
+            ),
+            return_exceptions=True
+        )
+
+        for tile, result in zip(missing, results):
+            if isinstance(result, Exception):
+                # Neighbours are optional (stitched as NaN); the point's own tile is not
+                if tile == (zoom, x, y):
+                    raise result
+                print("Terrain tile download failed:", tile, result)
+
+        return await asyncio.to_thread(
+            SLOPE_MOSAIC.slope_at, lat, lon, zoom, SLOPE_WINDOW_RADIUS
+        )
+
+    def lookup_many(self, lats, lons):
+        return SLOPE_MOSAIC.slope_many(lats, lons, self.zoom, SLOPE_WINDOW_RADIUS)
+
+
+PROVIDERS.register("slope", SlopeRasterProvider())
+PROVIDERS.register("slope", TerrainRgbProvider())
+
+
+# ------------------------------------------------------------------
+# MAIN SLOPE FUNCTION
+# ------------------------------------------------------------------
 
-        img = Image.open(BytesIO(response.content))
-        arr = np.array(img)
+def fetch_slope_percent(lat, lon):
+    """
+    Landform-scale slope (%) from the configured slope providers
+    (geo/providers.py): by default the precomputed slope raster, then
+    Mapbox Terrain-RGB tiles.
 
-        height, width, _ = arr.shape
-        cx, cy = width // 2, height // 2
+    Method (Terrain-RGB):
+    - Fetch terrain tile (decoded, from the local tile cache when seen before)
+    - Compute the tile's slope raster once (Horn's method)
+    - Locate the pixel containing the point (stitching neighbour
+      tiles when the window crosses a tile edge)
+    - Average slopes over a local neighborhood to remove micro-relief noise
 
-        # Pixel resolution in meters (Web Mercator)
-        resolution = 156543.03 * math.cos(math.radians(lat)) / (2 ** zoom)
+    This matches ICAR slope interpretation.
 
-        slopes = []
+    Returns:
+        (slope_percent, fell_back: True when SLOPE_FALLBACK_PERCENT was used)
+    """
 
-        # Sample a 5x5 grid around the center pixel
-        for dx in range(-2, 3):
-            for dy in range(-2, 3):
-                try:
-                    zc = rgb_to_elevation(*arr[cy + dy, cx + dx][:3])
-                    zx = rgb_to_elevation(*arr[cy + dy, cx + dx + 1][:3])
-                    zy = rgb_to_elevation(*arr[cy + dy + 1, cx + dx][:3])
+    try:
+        slope_percent, _ = PROVIDERS.resolve("slope", lat, lon)
 
-                    dzdx = (zx - zc) / resolution
-                    dzdy = (zy - zc) / resolution
+        return round(float(slope_percent), 2), False
 
-                    slope_rad = math.atan(math.sqrt(dzdx ** 2 + dzdy ** 2))
-                    slopes.append(math.tan(slope_rad) * 100)
+    except Exception as e:
+        print("Slope lookup failed:", e)
 
-                except IndexError:
-                    continue
+        # Conservative ICAR-safe fallback
+        return SLOPE_FALLBACK_PERCENT, True
 
-        if not slopes:
-            raise ValueError("Slope sampling failed")
 
-        slope_percent = sum(slopes) / len(slopes)
+async def fetch_slope_percent_async(lat, lon, session=None, timeout=None):
+    """
+    Async fetch_slope_percent: same providers, window, fallback and
+    (slope_percent, fell_back) result.
+    `timeout` caps each tile download below TERRAIN_TIMEOUT_S.
+    """
+    timeout = TERRAIN_TIMEOUT_S if timeout is None else min(timeout, TERRAIN_TIMEOUT_S)
 
-        return round(float(slope_percent), 2)
+    try:
+        slope_percent, _ = await PROVIDERS.resolve_async(
+            "slope", lat, lon, session=session, timeout=timeout
+        )
+
+        return round(float(slope_percent), 2), False
+
+    except asyncio.CancelledError:
+        raise
 
     except Exception as e:
-        print("Slope API failed:", e)
+        print("Slope lookup failed:", e)
 
         # Conservative ICAR-safe fallback
-        return 5.0
+        return SLOPE_FALLBACK_PERCENT, True
+
+
+def fetch_slope_percent_many(lats, lons):
+    """
+    Array version of fetch_slope_percent (same providers and window).
+
+    Returns:
+        (slope_percent: float array rounded to 2 decimals,
+         fell_back: bool array, True where SLOPE_FALLBACK_PERCENT was used)
+    """
+    slopes, names = PROVIDERS.resolve_many("slope", lats, lons)
+    record_provider("slope", names)
+
+    fell_back = np.isnan(slopes)
+    slopes[fell_back] = SLOPE_FALLBACK_PERCENT
+
+    return np.round(slopes, 2), fell_back
@@ -1,5 +1,8 @@
 # geo/sensors/soil_depth_sensor.py
 
+import numpy as np
+
+
 def fetch_soil_depth_class(slope_percent):
     """
     Returns ICAR soil depth class:
@@ -23,3 +26,16 @@ def fetch_soil_depth_class(slope_percent):
 
     # ICAR: dissected / steeper terrain
     return "SHALLOW"
+
+
+def fetch_soil_depth_class_many(slope_percent):
+    """
+    Array version of fetch_soil_depth_class (object array of classes).
+    """
+    slope_percent = np.asarray(slope_percent, dtype=np.float64)
+
+    return np.select(
+        [slope_percent <= 3.0, slope_percent <= 15.0],
+        ["DEEP", "MODERATE"],
+        "SHALLOW"
+    ).astype(object)
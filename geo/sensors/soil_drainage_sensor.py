@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def fetch_soil_drainage(slope_percent, rainfall_mm):
     """
     ICAR-aligned soil drainage classification.
@@ -14,3 +17,17 @@ def fetch_soil_drainage(slope_percent, rainfall_mm):
 
     # Sloping land drains well
     return "GOOD"
+
+
+def fetch_soil_drainage_many(slope_percent, rainfall_mm):
+    """
+    Array version of fetch_soil_drainage (object array of classes).
+    """
+    slope_percent = np.asarray(slope_percent, dtype=np.float64)
+    rainfall_mm = np.asarray(rainfall_mm, dtype=np.float64)
+
+    return np.select(
+        [(rainfall_mm > 2000) & (slope_percent < 5), slope_percent < 8],
+        ["POOR", "MODERATE"],
+        "GOOD"
+    ).astype(object)
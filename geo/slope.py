@@ -1,15 +1,25 @@
 # geo/slope.py
 # Terrain-averaged slope computation (ICAR-safe)
 
-import requests
 import math
+import os
 import statistics
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from geo.http_client import http_get
+
+load_dotenv()
 
 # =========================
 # CONFIGURATION (TUNABLE)
 # =========================
 
-MAPBOX_TOKEN = "<pk.eyJ1IjoicHJhdGVlazk0NTYiLCJhIjoiY21qaTkwZjd0MDNtNzNmcjB1Y2I4NGFqMSJ9.Whh4fHjS_jpVx95gqtGayA>"
+# Mapbox access token, from the environment or .env
+MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN")
 MAPBOX_URL = "https://api.mapbox.com/v4/mapbox.mapbox-terrain-v2/tilequery/{lon},{lat}.json"
 
 # Terrain window ~120 m
@@ -21,6 +31,28 @@ GRID_SIZE = 5
 # Max physically meaningful terrain slope for agriculture
 MAX_VALID_SLOPE = 60.0  # percent
 
+# Concurrent tilequery calls in flight (per process)
+MAX_CONCURRENCY = 8
+
+# Elevation samples remembered for overlapping grids of nearby points
+ELEVATION_CACHE_SIZE = 20_000
+
+# Cached elevations are keyed by the sample position snapped to this
+# lattice (degrees, ~5 m), so overlapping grids of nearby points reuse
+# them while every grid stays centred on its own point
+SAMPLE_SNAP_DEG = 0.00005
+
+# =========================
+# SHARED STATE
+# =========================
+
+# Tilequery calls share the process-wide keep-alive pool (geo/http_client.py)
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY)
+
+_ELEVATIONS = OrderedDict()
+_ELEVATIONS_LOCK = threading.Lock()
+
+
 # =========================
 # INTERNAL UTILITIES
 # =========================
@@ -37,13 +69,16 @@ def _get_elevation(lat, lon):
     """
     Fetch nearest terrain elevation from Mapbox contours
     """
+    if not MAPBOX_TOKEN:
+        raise RuntimeError("MAPBOX_TOKEN is not set")
+
     url = MAPBOX_URL.format(lat=lat, lon=lon)
     params = {
         "layers": "contour",
         "access_token": MAPBOX_TOKEN
     }
 
-    resp = requests.get(url, params=params, timeout=10)
+    resp = http_get(url, params=params, timeout=10)
     resp.raise_for_status()
 
     data = resp.json()
@@ -55,6 +90,59 @@ def _get_elevation(lat, lon):
     return features[0]["properties"]["ele"]
 
 
+def _cached_elevation(key):
+    with _ELEVATIONS_LOCK:
+        ele = _ELEVATIONS.get(key)
+        if ele is not None:
+            _ELEVATIONS.move_to_end(key)
+        return ele
+
+
+def _remember_elevation(key, ele):
+    with _ELEVATIONS_LOCK:
+        _ELEVATIONS[key] = ele
+        while len(_ELEVATIONS) > ELEVATION_CACHE_SIZE:
+            _ELEVATIONS.popitem(last=False)
+
+
+def _sample_elevations(points):
+    """
+    Fetch elevations for {(i, j): (lat, lon)} concurrently.
+
+    Returns:
+        (elevations: dict, stats: dict)
+    """
+    elevations = {}
+    pending = {}
+
+    for ij, (lat, lon) in points.items():
+        key = (round(lat / SAMPLE_SNAP_DEG), round(lon / SAMPLE_SNAP_DEG))
+        ele = _cached_elevation(key)
+        if ele is not None:
+            elevations[ij] = ele
+        else:
+            pending[ij] = (key, _EXECUTOR.submit(_get_elevation, lat, lon))
+
+    errors = []
+    for ij, (key, fut) in pending.items():
+        try:
+            ele = fut.result()
+        except Exception as e:
+            errors.append(str(e))
+            continue
+        elevations[ij] = ele
+        _remember_elevation(key, ele)
+
+    stats = {
+        "samples": len(points),
+        "cache_hits": len(points) - len(pending),
+        "fetched": len(pending) - len(errors),
+        "failed": len(errors),
+        "errors": errors[:3]
+    }
+    return elevations, stats
+
+
 def _compute_local_slope(z_center, z_north, z_east, dx, dy):
     dz_dx = (z_east - z_center) / dx
     dz_dy = (z_north - z_center) / dy
@@ -65,9 +153,16 @@ def _compute_local_slope(z_center, z_north, z_east, dx, dy):
 # PUBLIC API
 # =========================
 
-def get_slope(lat, lon):
+def get_slope_with_stats(lat, lon):
     """
-    Compute terrain-averaged slope (%) using median aggregation
+    Compute terrain-averaged slope (%) and report sampling statistics.
+
+    Samples that fail are skipped; local slopes are computed wherever
+    the centre, north and east samples are all available. With none,
+    the slope is 0.0 (as get_slope has always returned).
+
+    Returns:
+        {"slope_percent": float, "local_slopes": int, "samples": ...}
     """
 
     # Convert window to degrees
@@ -79,14 +174,14 @@ def get_slope(lat, lon):
     lat_step = (2 * dlat) / (GRID_SIZE - 1)
     lon_step = (2 * dlon) / (GRID_SIZE - 1)
 
-    elevations = {}
+    points = {
+        (i, j): (lat - dlat + i * lat_step, lon - dlon + j * lon_step)
+        for i in range(GRID_SIZE)
+        for j in range(GRID_SIZE)
+    }
 
-    # 1️⃣ Sample elevations
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            sample_lat = lat - dlat + i * lat_step
-            sample_lon = lon - dlon + j * lon_step
-            elevations[(i, j)] = _get_elevation(sample_lat, sample_lon)
+    # 1️⃣ Sample elevations (concurrently, cached)
+    elevations, stats = _sample_elevations(points)
 
     # Convert degree step to meters
     dx = lon_step * 111_320 * math.cos(math.radians(lat))
@@ -97,21 +192,33 @@ def get_slope(lat, lon):
     # 2️⃣ Compute local slopes (central difference)
     for i in range(1, GRID_SIZE - 1):
         for j in range(1, GRID_SIZE - 1):
-            zc = elevations[(i, j)]
-            zn = elevations[(i + 1, j)]
-            ze = elevations[(i, j + 1)]
+            zc = elevations.get((i, j))
+            zn = elevations.get((i + 1, j))
+            ze = elevations.get((i, j + 1))
+
+            if zc is None or zn is None or ze is None:
+                continue
 
             s = _compute_local_slope(zc, zn, ze, dx, dy)
             slopes.append(s)
 
+    stats["local_slopes"] = len(slopes)
     if not slopes:
-        return 0.0
+        stats["slope_percent"] = 0.0
+        return stats
 
     # 3️⃣ Median slope (robust)
     median_slope = statistics.median(slopes)
 
     # 4️⃣ Sanity clamp (terrain artifact filter)
-    if median_slope > MAX_VALID_SLOPE:
-        return round(MAX_VALID_SLOPE, 2)
+    median_slope = min(median_slope, MAX_VALID_SLOPE)
+
+    stats["slope_percent"] = round(median_slope, 2)
+    return stats
+
 
-    return round(median_slope, 2)
+def get_slope(lat, lon):
+    """
+    Compute terrain-averaged slope (%) using median aggregation
+    """
+    return get_slope_with_stats(lat, lon)["slope_percent"]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+
+@pytest.fixture(autouse=True)
+def no_factor_cache(monkeypatch):
+    """
+    Tests measure every lookup; ones exercising the cache enable it.
+    """
+    from geo.cache import FACTOR_CACHE
+
+    FACTOR_CACHE.clear()
+    monkeypatch.setattr(FACTOR_CACHE, "enabled", False)
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    """
+    Upstream failures of one test must not open circuits for the next.
+    """
+    from geo.resilience import reset_breakers
+
+    reset_breakers()
+    yield
+    reset_breakers()
+
+
+def _write_tile(path, crs, transform, classes):
+    profile = {
+        "driver": "GTiff",
+        "width": classes.shape[1],
+        "height": classes.shape[0],
+        "count": 1,
+        "dtype": "uint8",
+        "crs": crs,
+        "transform": transform,
+        "nodata": 0
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write(classes, 1)
+
+
+@pytest.fixture
+def landcover_dir(tmp_path):
+    """
+    Two synthetic ESRI land cover tiles in different UTM zones.
+
+    Zone 43N tile: left half CROPLAND (5), right half TREES (2),
+                   a nodata (0) block at rows/cols 0..9.
+    Zone 44N tile: all BUILT_UP (7).
+    """
+    d = tmp_path / "landcover"
+    d.mkdir()
+
+    west = np.full((200, 200), 5, dtype=np.uint8)
+    west[:, 100:] = 2
+    west[:10, :10] = 0
+    _write_tile(str(d / "43N.tif"), "EPSG:32643",
+                from_origin(700000, 3400000, 10, 10), west)
+
+    east = np.full((200, 200), 7, dtype=np.uint8)
+    _write_tile(str(d / "44N.tif"), "EPSG:32644",
+                from_origin(300000, 3400000, 10, 10), east)
+
+    return str(d)
+
+
+def utm_to_latlon(epsg, x, y):
+    from rasterio.warp import transform
+
+    lon, lat = transform(f"EPSG:{epsg}", "EPSG:4326", [x], [y])
+    return lat[0], lon[0]
@@ -0,0 +1,144 @@
+import geo.arable_classifier as arable_classifier
+from geo.landcover_catalog import LandcoverCatalog
+from tests.conftest import utm_to_latlon
+
+
+def _use_catalog(monkeypatch, catalog):
+    monkeypatch.setattr(arable_classifier, "landcover_catalog", lambda: catalog)
+
+
+def test_catalog_touches_only_the_containing_tile(monkeypatch, landcover_dir):
+    catalog = LandcoverCatalog(landcover_dir)
+    _use_catalog(monkeypatch, catalog)
+
+    lat, lon = utm_to_latlon(32643, 700500, 3399000)
+    assert arable_classifier.is_arable_land(lat, lon, 4.0) == (
+        True, "Cropland (ESRI Land Cover)"
+    )
+
+    opened = [t for t in catalog.tiles if t._src is not None]
+    assert [t.path for t in opened] == [catalog.tiles[0].path]
+
+
+def test_reasons(monkeypatch, landcover_dir):
+    _use_catalog(monkeypatch, LandcoverCatalog(landcover_dir))
+    is_arable_land = arable_classifier.is_arable_land
+
+    trees = utm_to_latlon(32643, 701500, 3399000)
+    built = utm_to_latlon(32644, 301000, 3399000)
+    nodata = utm_to_latlon(32643, 700045, 3399955)
+
+    assert is_arable_land(*trees, 4.0) == (False, "Non-arable land cover (TREES)")
+    assert is_arable_land(*built, 4.0) == (False, "Non-arable land cover (BUILT_UP)")
+    assert is_arable_land(*nodata, 4.0) == (False, "Invalid land cover data")
+    assert is_arable_land(10.0, 70.0, 4.0) == (False, "Location outside land cover coverage")
+    assert is_arable_land(*trees, 40.0) == (False, "Slope > 33% (ICAR non-arable)")
+
+
+def test_vectorized_majority_matches_counter():
+    import numpy as np
+
+    from geo.landcover_catalog import majority_3x3
+
+    rng = np.random.default_rng(3)
+    # 16 and 200 lie outside the vectorized classes
+    classes = rng.choice([0, 1, 2, 5, 5, 7, 16, 200], size=(40, 40)).astype(np.uint8)
+    padded = np.pad(classes, 1)
+
+    fast = majority_3x3(padded)
+
+    for r in range(40):
+        for c in range(40):
+            expected = arable_classifier.majority_class(padded[r:r + 3, c:c + 3])
+            assert fast[r, c] == (expected or 0)
+
+
+def test_mask_matches_raster_path(monkeypatch, landcover_dir, tmp_path):
+    import geo.landcover_mask as landcover_mask
+    from tools.build_landcover_mask import build_mask
+
+    mask_dir = str(tmp_path / "mask")
+    assert build_mask(landcover_dir, mask_dir, workers=2) == 0
+
+    points = [
+        utm_to_latlon(32643, 700500, 3399000),
+        utm_to_latlon(32643, 701005, 3399000),
+        utm_to_latlon(32643, 700045, 3399955),
+        utm_to_latlon(32644, 301000, 3398100),
+        (10.0, 70.0),
+    ]
+
+    _use_catalog(monkeypatch, LandcoverCatalog(landcover_dir))
+    monkeypatch.setattr(arable_classifier, "get_landcover_mask", lambda: None)
+    expected = [arable_classifier.is_arable_land(lat, lon, 4.0) for lat, lon in points]
+
+    mask = landcover_mask.LandcoverMask(mask_dir)
+    monkeypatch.setattr(arable_classifier, "get_landcover_mask", lambda: mask)
+    actual = [arable_classifier.is_arable_land(lat, lon, 4.0) for lat, lon in points]
+
+    assert actual == expected
+
+
+def test_batch_matches_scalar(monkeypatch, landcover_dir, tmp_path):
+    import numpy as np
+
+    import geo.landcover_mask as landcover_mask
+    from tools.build_landcover_mask import build_mask
+
+    rng = np.random.default_rng(5)
+    points = [utm_to_latlon(32643, x, y) for x, y in zip(
+        rng.uniform(699900, 702100, 60), rng.uniform(3397900, 3400100, 60)
+    )]
+    points += [utm_to_latlon(32644, 301000, 3399000), (10.0, 70.0)]
+    lats = np.array([p[0] for p in points])
+    lons = np.array([p[1] for p in points])
+    slopes = np.where(np.arange(len(points)) % 7 == 0, 40.0, 4.0)
+
+    _use_catalog(monkeypatch, LandcoverCatalog(landcover_dir))
+    monkeypatch.setattr(arable_classifier, "get_landcover_mask", lambda: None)
+    expected = [
+        arable_classifier.is_arable_land(lat, lon, s)
+        for lat, lon, s in zip(lats, lons, slopes)
+    ]
+
+    ok, reasons = arable_classifier.is_arable_land_batch(lats, lons, slopes)
+    assert list(zip(ok.tolist(), reasons.tolist())) == expected
+
+    mask_dir = str(tmp_path / "mask")
+    build_mask(landcover_dir, mask_dir, workers=1)
+    mask = landcover_mask.LandcoverMask(mask_dir)
+    monkeypatch.setattr(arable_classifier, "get_landcover_mask", lambda: mask)
+
+    ok, reasons = arable_classifier.is_arable_land_batch(lats, lons, slopes)
+    assert list(zip(ok.tolist(), reasons.tolist())) == expected
+
+
+def test_index_projects_with_one_transformer_per_crs(landcover_dir):
+    catalog = LandcoverCatalog(landcover_dir)
+    assert len(catalog.index._transformers) == 2
+
+    lat, lon = utm_to_latlon(32644, 301000, 3399000)
+    tile, x, y = catalog.locate(lat, lon)
+
+    assert tile is catalog.tiles[1]
+    assert abs(x - 301000) < 1e-3 and abs(y - 3399000) < 1e-3
+    assert catalog.locate(10.0, 70.0) is None
+
+
+def test_mask_index_is_not_written_when_a_tile_fails(landcover_dir, tmp_path):
+    import os
+    import shutil
+
+    from tools.build_landcover_mask import build_mask
+
+    source = tmp_path / "partial"
+    shutil.copytree(landcover_dir, source)
+    (source / "broken.tif").write_bytes(b"not a tiff")
+
+    mask_dir = str(tmp_path / "mask")
+    assert build_mask(str(source), mask_dir, workers=1) == 1
+    assert not os.path.exists(os.path.join(mask_dir, "index.json"))
+
+    os.remove(source / "broken.tif")
+    assert build_mask(str(source), mask_dir, workers=1) == 0
+    assert os.path.exists(os.path.join(mask_dir, "index.json"))
@@ -0,0 +1,175 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+import engine.pipeline as pipeline
+import geo.factor_builder as factor_builder
+import geo.sensors.rainfall_sensor as rainfall_sensor
+from geo.aio import RUNTIME
+from geo.sensors.rainfall_store import RainfallCellCache
+
+
+def _sensor(value, delay, log):
+    async def sensor(lat, lon, **kwargs):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append("cancelled")
+            raise
+        return value
+    return sensor
+
+
+def test_sensors_run_concurrently_and_deadline_cancels(monkeypatch):
+    log = []
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm_async", _sensor((2100.0, False), 5.0, log))
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent_async", _sensor((4.0, False), 0.05, log))
+
+    start = time.perf_counter()
+    factors = RUNTIME.run(factor_builder.build_factors_async(30.3, 78.0, "PADDY", deadline_s=0.2))
+
+    assert time.perf_counter() - start < 1.0
+    assert factors.rainfall_mm == factor_builder.RAINFALL_FALLBACK_MM
+    assert factors.slope_percent == 4.0
+    assert factors.timings["timed_out"] == ["rainfall"]
+    assert log == ["cancelled"]
+
+
+def test_sync_wrapper(monkeypatch):
+    log = []
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm_async", _sensor((2100.0, False), 0.01, log))
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent_async", _sensor((4.0, False), 0.01, log))
+
+    factors = factor_builder.build_factors(30.3, 78.0, "PADDY")
+
+    assert (factors.rainfall_mm, factors.slope_percent) == (2100.0, 4.0)
+    assert (factors.soil_depth, factors.drainage) == ("MODERATE", "POOR")
+
+
+def test_cancelling_caller_aborts_upstream(monkeypatch):
+    log = []
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm_async", _sensor((2100.0, False), 5.0, log))
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent_async", _sensor((4.0, False), 5.0, log))
+    monkeypatch.setattr(pipeline, "is_arable_land_async", _sensor((True, "ok"), 0, log))
+
+    async def client():
+        task = asyncio.ensure_future(RUNTIME.run_async(
+            pipeline.analyze_point_async(30.3, 78.0, "PADDY", "unused.json")
+        ))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(client())
+
+    deadline = time.time() + 2
+    while len(log) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert log == ["cancelled", "cancelled"]
+
+
+def test_rainfall_async_against_stub(monkeypatch, tmp_path):
+    async def power(request):
+        assert request.query["parameters"] == "PRECTOTCORR"
+        return web.json_response(
+            {"properties": {"parameter": {"PRECTOTCORR": {"ANN": 4.0}}}}
+        )
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/power", power)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        monkeypatch.setattr(rainfall_sensor, "POWER_URL", f"http://127.0.0.1:{port}/power")
+        try:
+            first = await rainfall_sensor.fetch_rainfall_mm_async(30.3, 78.0)
+            monkeypatch.setattr(rainfall_sensor, "POWER_URL", "http://127.0.0.1:1/down")
+            cached = await rainfall_sensor.fetch_rainfall_mm_async(30.3, 78.0)
+            missing = await rainfall_sensor.fetch_rainfall_mm_async(10.0, 76.0)
+        finally:
+            await runner.cleanup()
+        return first, cached, missing
+
+    monkeypatch.setattr(rainfall_sensor, "get_rainfall_pack", lambda: None)
+    monkeypatch.setattr(rainfall_sensor, "CELL_CACHE", RainfallCellCache(str(tmp_path / "r.sqlite")))
+
+    first, cached, missing = RUNTIME.run(run())
+
+    assert first == cached == (1460.0, False)
+    assert missing == (rainfall_sensor.RAINFALL_FALLBACK_MM, True)
+
+
+def test_async_endpoint(monkeypatch):
+    import app
+
+    async def analyze(lat, lon, land_use, rule_file):
+        return {"status": "OK", "input": {"lat": lat, "lon": lon, "land_use": land_use}}
+
+    monkeypatch.setattr(app, "analyze_point_async", analyze)
+
+    response = app.app.test_client().post(
+        "/analyze/async", json={"lat": 30.3, "lon": 78.0, "land_use": "PADDY"}
+    )
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "OK"
+
+
+def test_async_endpoint_deadline_cancels_upstream(monkeypatch):
+    import app
+
+    log = []
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm_async", _sensor((2100.0, False), 5.0, log))
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent_async", _sensor((4.0, False), 0.01, log))
+    monkeypatch.setattr(pipeline, "is_arable_land_async", _sensor((True, "ok"), 0, log))
+    monkeypatch.setattr(
+        app, "analyze_point_async",
+        lambda *args: pipeline.analyze_point_async(*args, deadline_s=0.2)
+    )
+
+    start = time.perf_counter()
+    response = app.app.test_client().post(
+        "/analyze/async", json={"lat": 30.3, "lon": 78.0, "land_use": "PADDY"}
+    )
+
+    assert time.perf_counter() - start < 1.0
+    assert response.get_json()["fallbacks"] == {"rainfall_mm": "timed_out"}
+    assert log == ["cancelled"]
+
+
+def test_shared_factor_cache_is_read_off_the_loop(monkeypatch):
+    import threading
+
+    from geo.cache import FACTOR_CACHE
+
+    threads = []
+
+    class Store:
+        def get(self, source, cell, now):
+            threads.append(threading.current_thread())
+            return None
+
+        def set(self, source, cell, value, expires):
+            threads.append(threading.current_thread())
+
+    log = []
+    monkeypatch.setattr(FACTOR_CACHE, "enabled", True)
+    monkeypatch.setattr(FACTOR_CACHE, "shared", Store())
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm_async", _sensor((2100.0, False), 0.01, log))
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent_async", _sensor((4.0, False), 0.01, log))
+
+    async def run():
+        await factor_builder.build_factors_async(30.3, 78.0, "PADDY")
+        return threading.current_thread()
+
+    loop_thread = RUNTIME.run(run())
+
+    assert len(threads) == 4
+    assert loop_thread not in threads
@@ -0,0 +1,61 @@
+import json
+
+import geo.sensors.rainfall_sensor as rainfall_sensor
+import geo.sensors.slope_sensor as slope_sensor
+from benchmarks import run
+from benchmarks.stubs import fixture_path, offline_environment, sample_points
+from engine.pipeline import analyze_point
+from tests.test_rule_engine import RULES_FILE
+
+
+def test_offline_environment_serves_every_stage(tmp_path):
+    power_url = rainfall_sensor.POWER_URL
+
+    with offline_environment(str(tmp_path), landcover_px=512) as env:
+        lat, lon = sample_points(env["bounds"], 1, seed=3)[0]
+        body = analyze_point(lat, lon, "PADDY", RULES_FILE)
+
+        assert body["status"] in ("OK", "NON_ARABLE")
+        assert body.get("fallbacks", {}) == {}
+        assert env["stub"].requests["terrain"] >= 1
+        assert env["stub"].requests["power"] == 1
+
+    assert rainfall_sensor.POWER_URL == power_url
+    assert "127.0.0.1" not in slope_sensor.TERRAIN_URL
+
+
+def test_recorded_fixtures_take_precedence(tmp_path):
+    fixtures = tmp_path / "fixtures"
+
+    with offline_environment(str(tmp_path / "work"), landcover_px=256, fixtures_dir=str(fixtures)) as env:
+        # A POWER cell centre, as queried by the sensor
+        lat, lon = 30.0, 78.125
+        path = fixture_path(str(fixtures), "power", lat=lat, lon=lon)
+        (fixtures / "power").mkdir(parents=True)
+        with open(path, "w") as f:
+            json.dump({"properties": {"parameter": {"PRECTOTCORR": {"ANN": 10.0}}}}, f)
+
+        assert rainfall_sensor.fetch_rainfall_mm(lat, lon) == (3650.0, False)
+        assert env["stub"].requests["fixture_hits"] == 1
+
+
+def test_runner_writes_and_compares_results(tmp_path):
+    out = tmp_path / "results.json"
+    code = run.main([
+        "--scenario", "analyze", "--scenario", "engine", "--concurrency", "2",
+        "--requests", "6", "--engine-points", "500", "--engine-repeats", "2",
+        "--landcover-px", "512", "--out", str(out)
+    ])
+    assert code == 0
+
+    report = json.loads(out.read_text())
+    analyze = report["results"]["analyze"]["c2"]
+    assert analyze["calls"] == 6 and analyze["errors"] == 0
+    assert {"factors", "arability", "total"} <= set(analyze["stages"])
+    assert report["results"]["engine"]["c2"]["vectorized"]["points_per_s"] > 0
+
+    slower = json.loads(out.read_text())
+    slower["results"]["analyze"]["c2"]["p50_ms"] *= 2
+    rows, regressions = run.compare(report, slower, threshold=0.2)
+    assert ("analyze", "c2", "p50_ms") in regressions
+    assert all(path[-1] in run.COMPARED for path, *_ in rows)
@@ -0,0 +1,89 @@
+import numpy as np
+from affine import Affine
+
+from geo.dem.dem_utils import (
+    compute_slope_percent,
+    decode_terrain_rgb,
+    sample_window,
+    slope_percent_grid
+)
+from geo.sensors.slope_sensor import rgb_to_elevation
+
+
+def test_decode_matches_scalar_decoder():
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 256, size=(8, 8, 3), dtype=np.uint8)
+    # Real terrain: R channel 1..2 covers -3446 m .. 9000 m
+    rgb[..., 0] = rng.integers(1, 3, size=(8, 8))
+
+    elev = decode_terrain_rgb(rgb)
+
+    for r in range(8):
+        for c in range(8):
+            expected = rgb_to_elevation(*rgb[r, c])
+            assert abs(float(elev[r, c]) - expected) < 1e-2
+
+
+def test_plane_slope_is_exact():
+    # z rises 5 m per 10 m pixel eastwards and 2 m southwards -> hypot(50%, 20%)
+    cols, rows = np.meshgrid(np.arange(20), np.arange(20))
+    dem = (cols * 5.0 + rows * 2.0).astype(np.float32)
+
+    slope = slope_percent_grid(dem, 10.0, 10.0, pad=False)
+
+    assert slope.shape == (18, 18)
+    assert np.allclose(slope, np.hypot(50.0, 20.0))
+    assert abs(sample_window(slope, 5, 5, radius=2) - np.hypot(50.0, 20.0)) < 1e-4
+
+
+def test_compute_slope_percent_uses_transform_resolution():
+    cols, _ = np.meshgrid(np.arange(10), np.arange(10))
+    dem = cols * 3.0
+
+    transform = Affine(30.0, 0, 0, 0, -30.0, 0)
+
+    assert abs(compute_slope_percent(dem, transform) - 10.0) < 1.5
+
+
+def test_streaming_slope_raster_matches_in_memory(tmp_path):
+    import rasterio
+    from rasterio.transform import from_origin
+
+    from geo.dem.dem_utils import compute_slope_raster
+
+    rng = np.random.default_rng(1)
+    dem = np.cumsum(rng.normal(0, 2, size=(150, 170)), axis=1).astype(np.float32)
+    profile = {
+        "driver": "GTiff", "width": 170, "height": 150, "count": 1,
+        "dtype": "float32", "crs": "EPSG:32643",
+        "transform": from_origin(500000, 2000000, 30, 30)
+    }
+    dem_path = str(tmp_path / "dem.tif")
+    out_path = str(tmp_path / "slope.tif")
+    with rasterio.open(dem_path, "w", **profile) as dst:
+        dst.write(dem, 1)
+
+    stats = compute_slope_raster(dem_path, out_path, block_size=64, workers=2)
+
+    expected = slope_percent_grid(dem, 30.0, 30.0)
+    with rasterio.open(out_path) as src:
+        assert np.allclose(src.read(1), expected, atol=1e-4)
+
+    assert stats["count"] == expected.size
+    assert abs(stats["mean"] - float(expected.mean())) < 1e-3
+    assert abs(stats["median"] - float(np.median(expected))) < 0.1
+    assert sum(stats["histogram"]["counts"]) + stats["histogram"]["overflow"] == expected.size
+
+
+def test_slope_stats_are_valid_json_with_overflow():
+    import json
+
+    from geo.dem.dem_utils import SlopeStats
+
+    stats = SlopeStats()
+    stats.update(np.array([[1.0, 2.0, np.nan], [150.0, 180.0, 250.0]], dtype=np.float32))
+    result = json.loads(json.dumps(stats.as_dict(), allow_nan=False))
+
+    assert result["histogram"]["overflow"] == 3
+    assert sum(result["histogram"]["counts"]) == 2
+    assert 100.0 <= result["median"] <= 180.0
@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+
+from engine.erosion_risk_engine import compute_erosion_risk, compute_erosion_risk_array
+from engine.factor_arrays import MISSING, encode_categories
+from engine.rule_engine import evaluate_rules_array, get_rule_set, load_rules, measures_from_matrix
+from geo.location_contract import LocationFactors
+from tests.test_rule_engine import RULES_FILE, random_factors
+
+
+def _columns(factors):
+    vocabs, codes = {}, {}
+    for field in ("soil_depth", "drainage", "land_use"):
+        codes[field], vocabs[field] = encode_categories([getattr(f, field) for f in factors])
+    return (
+        np.array([f.slope_percent for f in factors]),
+        np.array([f.rainfall_mm for f in factors]),
+        codes, vocabs
+    )
+
+
+def test_rule_arrays_match_scalar():
+    rules = load_rules(RULES_FILE)
+    rng = random.Random(11)
+    factors = [random_factors(rng, rules) for _ in range(3000)]
+    factors.append(LocationFactors(
+        latitude=0.0, longitude=0.0, land_use="PADDY", rainfall_mm=float("nan"),
+        slope_percent=float("nan"), soil_depth="DEEP", drainage="GOOD"
+    ))
+
+    rule_set = get_rule_set(RULES_FILE)
+    slope, rainfall, codes, vocabs = _columns(factors)
+    result = evaluate_rules_array(
+        rule_set, slope, rainfall,
+        codes["soil_depth"], codes["drainage"], codes["land_use"], vocabs
+    )
+
+    for n, f in enumerate(factors):
+        expected = rule_set.evaluate(f)
+        assert ("STRICT" if result["strict"][n] else "RELAXED") == expected["mode"]
+        assert measures_from_matrix(rule_set, result["matches"], n) == expected["measures"]
+
+
+def test_erosion_array_matches_scalar():
+    rng = random.Random(5)
+    rows = []
+    for _ in range(5000):
+        rows.append({
+            "rainfall_mm": rng.choice([499.99, 500, 1000, float("nan"), rng.uniform(0, 3000)]),
+            "slope_percent": rng.choice([3, 8, 15, 2.999, float("nan"), rng.uniform(0, 40)]),
+            "soil_depth": rng.choice(["DEEP", "MODERATE", "SHALLOW", "MEDIUM"]),
+            "drainage": rng.choice(["GOOD", "MODERATE", "POOR", "WELL_DRAINED"])
+        })
+
+    soil_codes, soil_vocab = encode_categories([r["soil_depth"] for r in rows])
+    drainage_codes, drainage_vocab = encode_categories([r["drainage"] for r in rows])
+    result = compute_erosion_risk_array(
+        np.array([r["rainfall_mm"] for r in rows]),
+        np.array([r["slope_percent"] for r in rows]),
+        soil_codes, drainage_codes,
+        {"soil_depth": soil_vocab, "drainage": drainage_vocab}
+    )
+
+    for n, r in enumerate(rows):
+        expected = compute_erosion_risk(r)
+        assert result["score"][n] == expected["score"]
+        assert result["level"][n] == expected["level"]
+
+
+def test_missing_categories_get_the_sentinel_code():
+    codes, vocab = encode_categories(["DEEP", None, "None", "DEEP"])
+
+    assert vocab == ["DEEP", "None"]
+    assert codes.tolist() == [0, MISSING, 1, 0]
+
+    rows = [
+        {"rainfall_mm": 1200.0, "slope_percent": 9.0, "soil_depth": soil, "drainage": drainage}
+        for soil in ("SHALLOW", None) for drainage in ("POOR", None)
+    ]
+    soil_codes, soil_vocab = encode_categories([r["soil_depth"] for r in rows])
+    drainage_codes, drainage_vocab = encode_categories([r["drainage"] for r in rows])
+    result = compute_erosion_risk_array(
+        np.array([r["rainfall_mm"] for r in rows]),
+        np.array([r["slope_percent"] for r in rows]),
+        soil_codes, drainage_codes,
+        {"soil_depth": soil_vocab, "drainage": drainage_vocab}
+    )
+
+    assert result["score"].tolist() == [compute_erosion_risk(r)["score"] for r in rows]
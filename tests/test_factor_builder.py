@@ -0,0 +1,52 @@
+import time
+
+import geo.factor_builder as factor_builder
+
+
+def _slow(value, delay):
+    def sensor(lat, lon):
+        time.sleep(delay)
+        return value, False
+    return sensor
+
+
+def test_sensors_run_in_parallel(monkeypatch):
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm", _slow(2100.0, 0.2))
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent", _slow(4.0, 0.2))
+
+    start = time.perf_counter()
+    factors = factor_builder.build_factors_concurrent(30.3, 78.0, "PADDY")
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.35
+    assert factors.rainfall_mm == 2100.0
+    assert factors.slope_percent == 4.0
+    assert factors.soil_depth == "MODERATE"
+    assert factors.drainage == "POOR"
+    assert set(factors.timings) >= {"rainfall_ms", "slope_ms", "total_ms"}
+
+
+def test_deadline_falls_back(monkeypatch):
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm", _slow(2100.0, 0.5))
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent", _slow(4.0, 0.0))
+
+    factors = factor_builder.build_factors_concurrent(
+        30.3, 78.0, "PADDY", deadline_s=0.1
+    )
+
+    assert factors.rainfall_mm == factor_builder.RAINFALL_FALLBACK_MM
+    assert factors.slope_percent == 4.0
+    assert factors.timings["timed_out"] == ["rainfall"]
+
+
+def test_overrides_skip_sensors(monkeypatch):
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm", _slow(2100.0, 5.0))
+
+    factors = factor_builder.build_factors(
+        30.3, 78.0, "PADDY",
+        overrides={"rainfall_mm": 900.0, "slope_percent": 12.0}
+    )
+
+    assert factors.rainfall_mm == 900.0
+    assert factors.drainage == "GOOD"
+    assert "rainfall_ms" not in factors.timings
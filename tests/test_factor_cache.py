@@ -0,0 +1,131 @@
+import multiprocessing
+
+import geo.arable_classifier as arable_classifier
+import geo.factor_builder as factor_builder
+from geo.cache import FACTOR_CACHE, FactorCache, SQLiteFactorStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_quantized_keys_lru_and_ttl():
+    clock = _Clock()
+    cache = FactorCache(max_entries=2, decimals=4, ttls={"rainfall": 60, "slope": None}, clock=clock)
+
+    cache.set("rainfall", 30.3165, 78.0, 1500.0)
+    assert cache.get("rainfall", 30.31650001, 78.00001) == 1500.0
+    assert cache.get("slope", 30.3165, 78.0) is None
+
+    cache.set("slope", 30.3165, 78.0, 4.2)
+    clock.now += 61
+    assert cache.get("rainfall", 30.3165, 78.0) is None
+    assert cache.get("slope", 30.3165, 78.0) == 4.2
+
+    cache.set("slope", 1.0, 1.0, 1.0)
+    cache.set("slope", 2.0, 2.0, 2.0)
+    assert cache.get("slope", 30.3165, 78.0) is None
+
+    assert cache.stats["hits"] == 2
+    assert cache.stats["expired"] == 1
+    assert cache.stats["evictions"] == 1
+    assert cache.source_stats["slope"]["misses"] == 2
+
+
+def _writer(path):
+    FactorCache(shared=SQLiteFactorStore(path)).set("slope", 10.0, 76.0, 7.5)
+
+
+def test_shared_store_across_processes(tmp_path):
+    path = str(tmp_path / "factors.sqlite")
+
+    proc = multiprocessing.get_context("spawn").Process(target=_writer, args=(path,))
+    proc.start()
+    proc.join(30)
+
+    cache = FactorCache(shared=SQLiteFactorStore(path))
+    assert cache.get("slope", 10.0, 76.0) == 7.5
+    assert cache.stats["shared_hits"] == 1
+    assert cache.get("slope", 10.0, 76.0) == 7.5
+    assert cache.stats["hits"] == 1
+
+
+def test_build_factors_and_arability_use_cache(monkeypatch):
+    monkeypatch.setattr(FACTOR_CACHE, "enabled", True)
+    calls = []
+
+    def rainfall(lat, lon):
+        calls.append("rainfall")
+        return 1400.0, False
+
+    def slope(lat, lon):
+        calls.append("slope")
+        return factor_builder.SLOPE_FALLBACK_PERCENT, True
+
+    async def rainfall_async(lat, lon, **kwargs):
+        return rainfall(lat, lon)
+
+    async def slope_async(lat, lon, **kwargs):
+        return slope(lat, lon)
+
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm", rainfall)
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent", slope)
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm_async", rainfall_async)
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent_async", slope_async)
+
+    factor_builder.build_factors(30.3165, 78.0, "PADDY")
+    factors = factor_builder.build_factors_concurrent(30.31650001, 78.0, "PADDY")
+
+    # Fallback values are never cached
+    assert sorted(calls) == ["rainfall", "slope", "slope"]
+    assert factors.rainfall_mm == 1400.0
+
+    majorities = []
+
+    def majority(lat, lon):
+        majorities.append((lat, lon))
+        return 5
+
+    monkeypatch.setattr(arable_classifier, "landcover_majority", majority)
+    assert arable_classifier.is_arable_land(30.3165, 78.0, 4.0)[0]
+    assert arable_classifier.is_arable_land(30.31651, 78.0, 4.0)[0]
+    assert len(majorities) == 1
+
+
+def test_measurement_equal_to_the_fallback_is_cached(monkeypatch):
+    monkeypatch.setattr(FACTOR_CACHE, "enabled", True)
+    calls = []
+
+    def rainfall(lat, lon):
+        calls.append("rainfall")
+        return factor_builder.RAINFALL_FALLBACK_MM, False
+
+    def slope(lat, lon):
+        calls.append("slope")
+        return factor_builder.SLOPE_FALLBACK_PERCENT, False
+
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm", rainfall)
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent", slope)
+
+    first = factor_builder.build_factors_concurrent(12.3456, 77.0, "PADDY")
+    second = factor_builder.build_factors_concurrent(12.3456, 77.0, "PADDY")
+
+    assert first.fallbacks == second.fallbacks == {}
+    assert sorted(calls) == ["rainfall", "slope"]
+
+
+def test_clear_resets_stats():
+    cache = FactorCache()
+    cache.set("slope", 10.0, 76.0, 7.5)
+    cache.get("slope", 10.0, 76.0)
+    cache.get("slope", 11.0, 76.0)
+
+    cache.clear()
+
+    assert len(cache) == 0
+    assert set(cache.stats.values()) == {0}
+    assert cache.source_stats == {}
@@ -0,0 +1,127 @@
+import asyncio
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+
+from geo.aio import get_session
+from geo.http_client import HttpClient, HttpMetrics, aiohttp_trace_config, http_get_async
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = {}
+
+    def do_GET(self):
+        # /flaky/<n> answers 503 n times before succeeding
+        if self.path.startswith("/flaky/"):
+            left = self.failures.setdefault(self.path, int(self.path.rsplit("/", 1)[1]))
+            if left:
+                self.failures[self.path] = left - 1
+                return self._send(503, b"{}")
+
+        body = json.dumps({"path": self.path}).encode()
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            return self._send(200, gzip.compress(body), {"Content-Encoding": "gzip"})
+        self._send(200, body)
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused_and_gzip_decoded(server):
+    metrics = HttpMetrics()
+    client = HttpClient(backoff_s=0, metrics=metrics)
+
+    for k in range(3):
+        response = client.get(f"{server}/power?k={k}", timeout=5)
+        assert response.json() == {"path": f"/power?k={k}"}
+        assert response.headers["Content-Encoding"] == "gzip"
+
+    host = metrics.snapshot()["127.0.0.1"]
+    assert host["requests"] == 3
+    assert host["new_connections"] == 1
+    assert host["reused_connections"] == 2
+    assert host["statuses"] == {"2xx": 3}
+    assert sum(host["latency_ms"]["counts"]) == 3
+
+
+def test_retries_on_5xx(server):
+    metrics = HttpMetrics()
+    client = HttpClient(retries=2, backoff_s=0, metrics=metrics)
+
+    assert client.get(f"{server}/flaky/2", timeout=5).status_code == 200
+    assert client.get(f"{server}/flaky/3", timeout=5).status_code == 503
+
+    host = metrics.snapshot()["127.0.0.1"]
+    assert host["retries"] == 4
+    assert host["errors"] == 1
+    assert host["statuses"] == {"2xx": 1, "5xx": 1}
+
+
+def test_retries_stop_at_the_timeout(server):
+    metrics = HttpMetrics()
+    client = HttpClient(retries=5, backoff_s=0.2, metrics=metrics)
+
+    # Backoffs of 0.2 + 0.4 s fit in 0.7 s; the next 0.8 s one does not
+    start = time.perf_counter()
+    assert client.get(f"{server}/flaky/9", timeout=0.7).status_code == 503
+    assert time.perf_counter() - start < 0.7
+    assert metrics.snapshot()["127.0.0.1"]["retries"] == 2
+
+
+def test_async_retries_on_5xx(server):
+    metrics = HttpMetrics()
+
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            ok = await http_get_async(session, f"{server}/flaky/1", timeout=5, backoff_s=0, metrics=metrics)
+            failed = await http_get_async(session, f"{server}/flaky/4", timeout=5, backoff_s=0, metrics=metrics)
+            return ok.status, await ok.json(), failed.status
+
+    assert asyncio.run(run()) == (200, {"path": "/flaky/1"}, 503)
+    assert metrics.snapshot()["127.0.0.1"]["retries"] == 3
+
+
+def test_async_requests_feed_metrics(server, monkeypatch):
+    metrics = HttpMetrics()
+    import geo.aio as aio
+    monkeypatch.setattr(aio, "aiohttp_trace_config", lambda: aiohttp_trace_config(metrics))
+
+    async def run():
+        # A fresh loop gets a fresh session
+        session = get_session()
+        try:
+            for k in range(2):
+                async with session.get(f"{server}/tile/{k}") as response:
+                    assert (await response.json())["path"] == f"/tile/{k}"
+        finally:
+            await session.close()
+
+    asyncio.run(run())
+
+    host = metrics.snapshot()["127.0.0.1"]
+    assert host["requests"] == 2
+    assert (host["new_connections"], host["reused_connections"]) == (1, 1)
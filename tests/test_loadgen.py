@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+
+from werkzeug.serving import make_server
+
+from app import app
+from benchmarks.stubs import offline_environment, sample_points
+from engine.traffic import TrafficRecorder
+from tools import loadgen
+
+
+def test_parse_prometheus_and_delta():
+    before = loadgen.parse_prometheus(
+        '# TYPE swc_factor_cache_lookups_total counter\n'
+        'swc_factor_cache_lookups_total{source="slope",result="hits"} 2\n'
+        'swc_factor_cache_lookups_total{source="slope",result="misses"} 3\n'
+    )
+    after = loadgen.parse_prometheus(
+        'swc_factor_cache_lookups_total{source="slope",result="hits"} 8\n'
+        'swc_factor_cache_lookups_total{source="slope",result="misses"} 5\n'
+        'swc_fallbacks_total{factor="rainfall",reason="timed_out"} 1\n'
+        'swc_upstream_requests_total{host="a\\"b",status="2xx"} 4\n'
+    )
+    summary = loadgen.server_summary(loadgen.metric_delta(before, after))
+
+    assert summary["factor_cache"]["slope"] == {"hits": 6, "misses": 2, "hit_rate": 0.75}
+    assert summary["fallbacks"] == {"rainfall:timed_out": 1}
+    assert summary["upstream_requests"] == {'a"b': {"2xx": 4}}
+
+
+def test_synthetic_payloads_repeat_points_inside_india():
+    payloads = loadgen.synthetic_payloads(500, ["PADDY", "WHEAT"], seed=1, repeat_fraction=0.5)
+    west, south, east, north = loadgen.INDIA_BBOX
+
+    assert all(south <= p["lat"] <= north and west <= p["lon"] <= east for p in payloads)
+    distinct = {(p["lat"], p["lon"], p["land_use"]) for p in payloads}
+    assert len(distinct) < 350
+    assert payloads == loadgen.synthetic_payloads(500, ["PADDY", "WHEAT"], seed=1, repeat_fraction=0.5)
+
+
+def test_recorded_traffic_replays(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    recorder = TrafficRecorder(str(path))
+    recorder.record("/analyze", {"lat": 30.1, "lon": 78.0, "land_use": "PADDY"})
+    recorder.record("/analyze", {"lat": 30.2, "lon": 78.1, "land_use": "WHEAT", "extra": 1})
+    with open(path, "a") as f:
+        f.write("not json\n")
+
+    assert json.loads(path.read_text().splitlines()[0])["endpoint"] == "/analyze"
+    assert loadgen.load_replay(str(path)) == [
+        {"lat": 30.1, "lon": 78.0, "land_use": "PADDY"},
+        {"lat": 30.2, "lon": 78.1, "land_use": "WHEAT"}
+    ]
+
+
+def test_sampled_recorder_skips_requests(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    draws = iter([0.1, 0.9, 0.3])
+    recorder = TrafficRecorder(str(path), sample_rate=0.5, rng=lambda: next(draws))
+    for lat in (1, 2, 3):
+        recorder.record("/analyze", {"lat": lat, "lon": 78.0, "land_use": "PADDY"})
+
+    assert [json.loads(line)["lat"] for line in path.read_text().splitlines()] == [1, 3]
+
+
+def test_load_run_against_live_server(tmp_path):
+    with offline_environment(str(tmp_path), landcover_px=512) as env:
+        payloads = [
+            {"lat": lat, "lon": lon, "land_use": "PADDY"}
+            for lat, lon in sample_points(env["bounds"], 3, seed=2)
+        ]
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}"
+        try:
+            closed = loadgen.run(url, loadgen.payload_stream(payloads, 6), concurrency=2)
+            opened = loadgen.run(url, loadgen.payload_stream(payloads, 4), rate=50, concurrency=2)
+        finally:
+            server.shutdown()
+
+    assert closed["requests"] == 6 and closed["error_rate"] == 0
+    assert closed["latency_ms"]["p50"] <= closed["latency_ms"]["p99"]
+    assert sum(closed["outcomes"].values()) == 6
+    assert "factors" in closed["stage_mean_ms"]
+    # 3 distinct points sent twice: every repeat is a factor cache hit
+    assert closed["server"]["factor_cache"]["slope"]["hit_rate"] == 0.5
+    assert "terrain" in closed["server"]["tile_cache"]
+
+    assert opened["config"]["mode"] == "open" and opened["requests"] == 4
+
+
+def test_batch_is_recorded_with_one_write(tmp_path, monkeypatch):
+    import engine.traffic as traffic
+
+    path = tmp_path / "traffic.jsonl"
+    writes = []
+    write = os.write
+    monkeypatch.setattr(traffic.os, "write", lambda fd, data: writes.append(data) or write(fd, data))
+
+    TrafficRecorder(str(path)).record_many("/analyze/batch", [
+        {"lat": lat, "lon": 78.0, "land_use": "PADDY"} for lat in (1, 2, 3)
+    ] + ["not a dict"])
+
+    assert len(writes) == 1
+    assert [json.loads(line)["lat"] for line in path.read_text().splitlines()] == [1, 2, 3]
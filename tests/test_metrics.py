@@ -0,0 +1,93 @@
+import re
+
+import geo.factor_builder as factor_builder
+from geo.metrics import Registry, server_timing
+
+
+def _fast(value):
+    def sensor(lat, lon):
+        return value
+    return sensor
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    hits = registry.counter("swc_test_total", "Test counter", ["source"])
+    latency = registry.histogram("swc_test_seconds", "Test latency", ["stage"], buckets=(0.1, 1))
+    registry.register_collector(lambda: ["# TYPE swc_extra gauge", "swc_extra 3"])
+
+    hits.inc(source="rain\"fall")
+    hits.inc(2, source="rain\"fall")
+    latency.observe(0.05, stage="rules")
+    latency.observe(0.5, stage="rules")
+    latency.observe(5, stage="rules")
+
+    text = registry.render()
+
+    assert 'swc_test_total{source="rain\\"fall"} 3' in text
+    assert 'swc_test_seconds_bucket{stage="rules",le="0.1"} 1' in text
+    assert 'swc_test_seconds_bucket{stage="rules",le="1"} 2' in text
+    assert 'swc_test_seconds_bucket{stage="rules",le="+Inf"} 3' in text
+    assert 'swc_test_seconds_count{stage="rules"} 3' in text
+    assert "swc_extra 3" in text
+
+
+def test_server_timing_sums_repeated_stages():
+    assert server_timing([("rules", 1.0), ("erosion", 0.5), ("rules", 2.0)]) == \
+        "rules;dur=3.00, erosion;dur=0.50"
+
+
+def test_analyze_reports_stages_and_metrics(monkeypatch):
+    import app
+
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm", _fast((factor_builder.RAINFALL_FALLBACK_MM, True)))
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent", _fast((4.0, False)))
+    monkeypatch.setattr("engine.pipeline.is_arable_land", lambda lat, lon, slope_percent: (True, "ok"))
+
+    client = app.app.test_client()
+    response = client.post("/analyze", json={"lat": 30.3, "lon": 78.0, "land_use": "PADDY"})
+
+    assert response.status_code == 200
+    assert response.get_json()["fallbacks"] == {"rainfall_mm": "unavailable"}
+
+    stages = dict(
+        part.split(";dur=") for part in response.headers["Server-Timing"].split(", ")
+    )
+    assert {"rainfall", "slope", "factors", "arability", "rules", "erosion", "serialize", "total"} <= set(stages)
+    assert float(stages["total"]) >= float(stages["factors"])
+
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert re.search(r'swc_fallbacks_total\{factor="rainfall_mm",reason="unavailable"\} [1-9]', text)
+    assert re.search(r'swc_stage_duration_seconds_count\{stage="rules"\} [1-9]', text)
+    assert re.search(r'swc_request_duration_seconds_count\{endpoint="/analyze",status="200"\} [1-9]', text)
+    assert "# TYPE swc_factor_cache_lookups_total counter" in text
+    assert "# TYPE swc_upstream_request_duration_seconds histogram" in text
+    assert "swc_tile_cache_lookups_total" in text
+
+
+def test_async_stages_reach_server_timing(monkeypatch):
+    import app
+
+    async def rainfall(lat, lon, timeout=None):
+        return 1500.0, False
+
+    async def slope(lat, lon, timeout=None):
+        return 4.0, False
+
+    async def arable(lat, lon, slope_percent):
+        return True, "ok"
+
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm_async", rainfall)
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent_async", slope)
+    monkeypatch.setattr("engine.pipeline.is_arable_land_async", arable)
+
+    response = app.app.test_client().post(
+        "/analyze/async", json={"lat": 30.3, "lon": 78.0, "land_use": "PADDY"}
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["fallbacks"] == {}
+    timing = response.headers["Server-Timing"]
+    for name in ("rainfall;", "factors;", "arability;", "rules;", "serialize;"):
+        assert name in timing
@@ -0,0 +1,104 @@
+import numpy as np
+
+import engine.pipeline as pipeline
+import geo.arable_classifier as arable_classifier
+import geo.factor_builder as factor_builder
+from geo.landcover_catalog import LandcoverCatalog
+from tests.conftest import utm_to_latlon
+from tests.test_rule_engine import RULES_FILE
+
+
+def _slope(lat, lon):
+    return round(abs(lon * 1000) % 12, 2)
+
+
+def _setup(monkeypatch, landcover_dir):
+    catalog = LandcoverCatalog(landcover_dir)
+    monkeypatch.setattr(arable_classifier, "landcover_catalog", lambda: catalog)
+    monkeypatch.setattr(arable_classifier, "get_landcover_mask", lambda: None)
+
+    calls = []
+
+    def slope_many(lats, lons):
+        calls.append(len(lats))
+        return np.array([_slope(a, b) for a, b in zip(lats, lons)]), np.zeros(len(lats), bool)
+
+    def rainfall_many(lats, lons):
+        return np.full(len(lats), 1500.0), np.zeros(len(lats), bool)
+
+    monkeypatch.setattr(pipeline, "fetch_slope_percent_many", slope_many)
+    monkeypatch.setattr(pipeline, "fetch_rainfall_mm_many", rainfall_many)
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent", lambda lat, lon: (_slope(lat, lon), False))
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm", lambda lat, lon: (1500.0, False))
+    return calls
+
+
+def test_batch_matches_single_point_pipeline(monkeypatch, landcover_dir):
+    calls = _setup(monkeypatch, landcover_dir)
+
+    crop = utm_to_latlon(32643, 700500, 3399000)
+    trees = utm_to_latlon(32643, 701500, 3399000)
+    built = utm_to_latlon(32644, 301000, 3399000)
+
+    records = [
+        {"lat": crop[0], "lon": crop[1], "land_use": "PADDY"},
+        {"lat": trees[0], "lon": trees[1], "land_use": "PADDY"},
+        {"lat": "x", "lon": 1, "land_use": "PADDY"},
+        {"lat": crop[0] + 1e-7, "lon": crop[1], "land_use": "PADDY"},
+        {"lat": crop[0], "lon": crop[1], "land_use": "TEA"},
+        {"lat": built[0], "lon": built[1]},
+        {"lat": built[0], "lon": built[1], "land_use": "MAIZE"},
+    ]
+
+    batch = pipeline.analyze_batch(records, RULES_FILE)
+    results = batch["results"]
+
+    assert [r["index"] for r in results] == list(range(len(records)))
+    assert [r["status"] for r in results] == [
+        "OK", "NON_ARABLE", "ERROR", "OK", "OK", "ERROR", "NON_ARABLE"
+    ]
+    assert batch["summary"]["counts"] == {"OK": 3, "NON_ARABLE": 2, "ERROR": 2}
+
+    # Duplicates (after quantization) are measured once, in one call
+    assert batch["summary"]["unique_points"] == 3
+    assert calls == [3]
+
+    for record, result in zip(records, results):
+        if result["status"] == "ERROR":
+            continue
+        single = pipeline.analyze_point(record["lat"], record["lon"], record["land_use"], RULES_FILE)
+        assert {k: v for k, v in result.items() if k not in ("index", "input")} == \
+            {k: v for k, v in single.items() if k != "input"}
+        assert result["input"] == record
+
+
+def test_measurement_failure_marks_items(monkeypatch, landcover_dir):
+    _setup(monkeypatch, landcover_dir)
+
+    def broken(lats, lons):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(pipeline, "fetch_slope_percent_many", broken)
+
+    batch = pipeline.analyze_batch([{"lat": 20.0, "lon": 78.0, "land_use": "PADDY"}], RULES_FILE)
+    assert batch["results"][0]["status"] == "ERROR"
+
+
+def test_batch_counts_a_fallback_once_per_point(monkeypatch, landcover_dir):
+    from geo.metrics import FALLBACKS
+
+    _setup(monkeypatch, landcover_dir)
+    monkeypatch.setattr(
+        pipeline, "fetch_rainfall_mm_many",
+        lambda lats, lons: (np.full(len(lats), 1200.0), np.ones(len(lats), bool))
+    )
+    before = FALLBACKS.value(factor="rainfall_mm", reason="unavailable")
+
+    crop = utm_to_latlon(32643, 700500, 3399000)
+    batch = pipeline.analyze_batch([
+        {"lat": crop[0], "lon": crop[1], "land_use": "PADDY"},
+        {"lat": crop[0], "lon": crop[1], "land_use": "UPLAND"},
+    ], RULES_FILE)
+
+    assert [r["fallbacks"] for r in batch["results"]] == [{"rainfall_mm": "unavailable"}] * 2
+    assert FALLBACKS.value(factor="rainfall_mm", reason="unavailable") == before + 1
@@ -0,0 +1,192 @@
+import json
+
+import numpy as np
+import pytest
+
+import engine.pipeline as pipeline
+import geo.arable_classifier as arable_classifier
+import geo.geocoder as geocoder
+import geo.sensors.rainfall_sensor as rainfall_sensor
+import geo.sensors.slope_sensor as slope_sensor
+from geo.admin_boundaries import AdminBoundaries
+from geo.cache import FACTOR_CACHE
+from geo.factor_builder import build_factors_concurrent
+from geo.landcover_catalog import LandcoverCatalog
+from geo.providers import PROVIDERS, NoProviderError, Provider, ProviderRegistry, collect_providers
+from geo.sensors.rainfall_store import RainfallPack, power_cell, write_rainfall_pack
+from tests.conftest import utm_to_latlon
+from tests.test_rule_engine import RULES_FILE
+
+
+class Fixed(Provider):
+    def __init__(self, name, value, network=False, covers=lambda lat, lon: True):
+        self.name = name
+        self.value = value
+        self.network = network
+        self.covers = covers
+        self.calls = 0
+
+    def lookup(self, lat, lon):
+        self.calls += 1
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value if self.covers(lat, lon) else None
+
+
+def test_chain_order_fallthrough_and_offline():
+    registry = ProviderRegistry(order={"slope": ["pack", "broken", "api"]})
+    registry.register("slope", Fixed("pack", 2.0, covers=lambda lat, lon: lat > 0))
+    broken = registry.register("slope", Fixed("broken", RuntimeError("down")))
+    registry.register("slope", Fixed("api", 7.0, network=True))
+    registry.register("slope", Fixed("unlisted", 9.0))
+
+    with collect_providers() as answered:
+        assert registry.resolve("slope", 10.0, 78.0) == (2.0, "pack")
+        assert answered == {"slope": "pack"}
+    assert registry.resolve("slope", -10.0, 78.0) == (7.0, "api")
+    assert broken.calls == 1
+
+    values, names = registry.resolve_many("slope", [10.0, -10.0], [78.0, 78.0])
+    assert values.tolist() == [2.0, 7.0]
+    assert names.tolist() == ["pack", "api"]
+
+    registry.offline = True
+    assert [p.name for p in registry.chain("slope")] == ["pack", "broken"]
+    with pytest.raises(RuntimeError, match="down"):
+        registry.resolve("slope", -10.0, 78.0)
+
+    values, names = registry.resolve_many("slope", [10.0, -10.0], [78.0, 78.0])
+    assert values[0] == 2.0 and np.isnan(values[1]) and names[1] is None
+
+    with pytest.raises(NoProviderError):
+        ProviderRegistry(order={}).resolve("rainfall", 10.0, 78.0)
+
+
+def _square(x0, y0, size):
+    return [[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]
+
+
+def test_providers_must_implement_lookup():
+    class Incomplete(Provider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_admin_boundaries_lookup(tmp_path):
+    path = tmp_path / "districts.geojson"
+    path.write_text(json.dumps({
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"ST_NM": "Uttarakhand", "DISTRICT": "Dehradun"},
+                # Outer square with a hole in the middle
+                "geometry": {"type": "Polygon", "coordinates": [_square(77.5, 30.0, 1.0), _square(77.9, 30.4, 0.2)]}
+            },
+            {
+                "type": "Feature",
+                "properties": {"state": "Uttarakhand", "district": "Tehri"},
+                "geometry": {"type": "MultiPolygon", "coordinates": [
+                    [_square(77.9, 30.4, 0.2)], [_square(79.0, 30.0, 0.5)]
+                ]}
+            },
+            {"type": "Feature", "properties": {"name": "no state"}, "geometry": None},
+        ]
+    }))
+
+    boundaries = AdminBoundaries(str(path))
+    assert len(boundaries.regions) == 2
+    assert boundaries.lookup(30.1, 77.6) == {"state": "Uttarakhand", "district": "Dehradun"}
+    assert boundaries.lookup(30.5, 78.0) == {"state": "Uttarakhand", "district": "Tehri"}
+    assert boundaries.lookup(30.2, 79.2) == {"state": "Uttarakhand", "district": "Tehri"}
+    assert boundaries.lookup(30.2, 80.0) is None
+
+
+def test_offline_geocoder_never_calls_nominatim(tmp_path, monkeypatch):
+    path = tmp_path / "states.geojson"
+    path.write_text(json.dumps({"features": [{
+        "properties": {"state": "Punjab"},
+        "geometry": {"type": "Polygon", "coordinates": [_square(74.0, 29.5, 2.5)]}
+    }]}))
+    boundaries = AdminBoundaries(str(path))
+
+    def nominatim(*args):
+        raise AssertionError("network call while offline")
+
+    monkeypatch.setattr(geocoder, "get_admin_boundaries", lambda: boundaries)
+    monkeypatch.setattr(geocoder, "_fetch_address", nominatim)
+    monkeypatch.setattr(PROVIDERS, "offline", True)
+
+    assert geocoder.reverse_geocode(30.9, 75.85) == {"state": "Punjab", "district": None}
+    with pytest.raises(NoProviderError):
+        geocoder.reverse_geocode(20.0, 85.0)
+
+
+class FlatRaster:
+    def sample(self, lat, lon, radius=0):
+        return 2.0
+
+    def sample_many(self, lats, lons, radius=0):
+        return np.full(len(lats), 2.0)
+
+
+def _local_packs(tmp_path, monkeypatch, landcover_dir, lat, lon):
+    path = str(tmp_path / "rainfall.npy")
+    write_rainfall_pack({power_cell(lat, lon): 900.0}, path)
+    pack = RainfallPack(path)
+
+    catalog = LandcoverCatalog(landcover_dir)
+    monkeypatch.setattr(arable_classifier, "landcover_catalog", lambda: catalog)
+    monkeypatch.setattr(arable_classifier, "get_landcover_mask", lambda: None)
+    monkeypatch.setattr(rainfall_sensor, "get_rainfall_pack", lambda: pack)
+    monkeypatch.setattr(slope_sensor, "get_slope_raster", lambda: FlatRaster())
+    monkeypatch.setattr(PROVIDERS, "offline", True)
+
+
+def test_zero_network_analysis_reports_providers(tmp_path, monkeypatch, landcover_dir):
+    lat, lon = utm_to_latlon(32643, 700500, 3399000)
+    _local_packs(tmp_path, monkeypatch, landcover_dir, lat, lon)
+
+    single = pipeline.analyze_point(lat, lon, "PADDY", RULES_FILE)
+    assert single["status"] == "OK"
+    assert single["factors"]["rainfall_mm"] == 900.0
+    assert single["factors"]["slope_percent"] == 2.0
+    assert single["fallbacks"] == {}
+    assert single["providers"] == {"rainfall_mm": "pack", "slope_percent": "raster"}
+
+    batch = pipeline.analyze_batch([{"lat": lat, "lon": lon, "land_use": "PADDY"}], RULES_FILE)
+    assert batch["results"][0]["providers"] == single["providers"]
+
+    # A point outside the rainfall pack falls back, with no provider reported
+    far = build_factors_concurrent(lat + 5, lon, "PADDY")
+    assert far.rainfall_mm == rainfall_sensor.RAINFALL_FALLBACK_MM
+    assert far.fallbacks == {"rainfall_mm": "unavailable"}
+    assert far.providers == {"slope_percent": "raster"}
+
+
+def test_cached_factors_keep_their_provider(tmp_path, monkeypatch, landcover_dir):
+    lat, lon = utm_to_latlon(32643, 700500, 3399000)
+    _local_packs(tmp_path, monkeypatch, landcover_dir, lat, lon)
+    monkeypatch.setattr(FACTOR_CACHE, "enabled", True)
+
+    first = build_factors_concurrent(lat, lon, "PADDY")
+    second = build_factors_concurrent(lat, lon, "PADDY")
+
+    assert FACTOR_CACHE.source_stats["slope"]["hits"] == 1
+    assert second.providers == first.providers == {"rainfall_mm": "pack", "slope_percent": "raster"}
+
+
+def test_mapbox_token_comes_from_the_environment(monkeypatch):
+    monkeypatch.setattr(slope_sensor, "TERRAIN_URL", "https://api.mapbox.com/v4/t/{z}/{x}/{y}.pngraw")
+
+    monkeypatch.setattr(slope_sensor, "MAPBOX_TOKEN", None)
+    assert slope_sensor._terrain_url(12, 1, 2) == "https://api.mapbox.com/v4/t/12/1/2.pngraw"
+    with pytest.raises(RuntimeError, match="MAPBOX_TOKEN"):
+        slope_sensor._guarded_download(12, 1, 2)
+    assert not slope_sensor.TerrainRgbProvider().available()
+
+    monkeypatch.setattr(slope_sensor, "MAPBOX_TOKEN", "pk.test")
+    assert slope_sensor._terrain_url(12, 1, 2).endswith("?access_token=pk.test")
+    assert slope_sensor.TerrainRgbProvider().available()
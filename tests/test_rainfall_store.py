@@ -0,0 +1,43 @@
+import geo.sensors.rainfall_sensor as rainfall_sensor
+import geo.sensors.rainfall_store as rainfall_store
+from geo.sensors.rainfall_store import (
+    RainfallCellCache,
+    RainfallPack,
+    power_cell,
+    write_rainfall_pack
+)
+
+
+def test_nearby_points_share_a_power_cell():
+    assert power_cell(30.3165, 78.0322) == power_cell(30.4, 78.2)
+    assert power_cell(30.3165, 78.0322) != power_cell(30.9, 78.0322)
+
+
+def test_sensor_fetches_each_cell_once(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_power(lat, lon):
+        calls.append((lat, lon))
+        return 1650.5
+
+    monkeypatch.setattr(rainfall_sensor, "fetch_power_annual_mm", fake_power)
+    monkeypatch.setattr(rainfall_sensor, "CELL_CACHE",
+                        RainfallCellCache(str(tmp_path / "cells.sqlite")))
+    monkeypatch.setattr(rainfall_store, "_PACK_LOADED", True)
+    monkeypatch.setattr(rainfall_store, "_PACK", None)
+
+    assert rainfall_sensor.fetch_rainfall_mm(30.3165, 78.0322) == (1650.5, False)
+    assert rainfall_sensor.fetch_rainfall_mm(30.4, 78.2) == (1650.5, False)
+    assert len(calls) == 1
+
+
+def test_pack_roundtrip(tmp_path):
+    path = str(tmp_path / "pack.npy")
+    write_rainfall_pack({(240, 412): 1650.5, (241, 414): 820.25}, path)
+
+    pack = RainfallPack(path)
+
+    assert pack.get(240, 412) == 1650.5
+    assert pack.get(241, 414) == 820.25
+    assert pack.get(241, 413) is None
+    assert pack.get(10, 10) is None
@@ -0,0 +1,162 @@
+import io
+import json
+
+import numpy as np
+import rasterio
+
+import engine.region as region
+import geo.arable_classifier as arable_classifier
+from engine.erosion_risk_engine import compute_erosion_risk
+from engine.rule_engine import evaluate_rules
+from geo.landcover_catalog import LandcoverCatalog
+from geo.location_contract import LocationFactors
+from geo.sensors.soil_depth_sensor import fetch_soil_depth_class
+from geo.sensors.soil_drainage_sensor import fetch_soil_drainage
+from tests.conftest import utm_to_latlon
+from tests.test_rule_engine import RULES_FILE
+
+
+def _fake_slope(lats, lons):
+    # Varies across the region and crosses the 33 % arability cut
+    slopes = np.round(np.abs(lons - np.floor(lons)) * 1000 % 40, 2)
+    return slopes, np.zeros(len(lats), dtype=bool)
+
+
+def _fake_rainfall(lats, lons):
+    return np.full(len(lats), 1800.0), np.zeros(len(lats), dtype=bool)
+
+
+def _setup(monkeypatch, landcover_dir):
+    catalog = LandcoverCatalog(landcover_dir)
+    monkeypatch.setattr(arable_classifier, "landcover_catalog", lambda: catalog)
+    monkeypatch.setattr(arable_classifier, "get_landcover_mask", lambda: None)
+    monkeypatch.setattr(region, "fetch_slope_percent_many", _fake_slope)
+    monkeypatch.setattr(region, "fetch_rainfall_mm_many", _fake_rainfall)
+
+
+def _bbox():
+    # Covers the 43N tile (cropland / trees) and some area outside it
+    s, w = utm_to_latlon(32643, 699900, 3397900)
+    n, e = utm_to_latlon(32643, 702100, 3400100)
+    return (w, s, e, n)
+
+
+def test_region_cells_match_point_pipeline(monkeypatch, landcover_dir):
+    _setup(monkeypatch, landcover_dir)
+
+    result = region.analyze_region(
+        _bbox(), 60, "PADDY", RULES_FILE, chunk_cells=500
+    )
+    grid = result.grid
+    grids = result.grids
+    legends = result.legends
+
+    assert result.summary["counts"]["OK"] > 0
+    assert result.summary["counts"]["NON_ARABLE"] > 0
+
+    for r in range(grid.height):
+        lat = float(grid.lats(r, r + 1)[0])
+        lons = grid.lons()
+        slopes, _ = _fake_slope(np.full(len(lons), lat), lons)
+
+        for c in range(0, grid.width, 3):
+            lon, slope = float(lons[c]), float(slopes[c])
+            ok, reason = arable_classifier.is_arable_land(lat, lon, slope)
+
+            if not ok:
+                assert legends["status"][grids["status"][r, c]] == "NON_ARABLE"
+                assert legends["reason"][grids["reason"][r, c]] == reason
+                continue
+
+            factors = LocationFactors(
+                latitude=lat, longitude=lon, land_use="PADDY",
+                rainfall_mm=1800.0, slope_percent=slope,
+                soil_depth=fetch_soil_depth_class(slope),
+                drainage=fetch_soil_drainage(slope, 1800.0)
+            )
+            erosion = compute_erosion_risk({
+                "rainfall_mm": 1800.0, "slope_percent": slope,
+                "soil_depth": factors.soil_depth, "drainage": factors.drainage
+            })
+
+            assert legends["status"][grids["status"][r, c]] == "OK"
+            assert legends["recommendation"][grids["recommendation"][r, c]] == \
+                evaluate_rules(factors, RULES_FILE)
+            assert legends["erosion_level"][grids["erosion_level"][r, c]] == erosion["level"]
+            assert np.isclose(grids["erosion_score"][r, c], erosion["score"])
+
+
+def test_polygon_mask_and_encodings(monkeypatch, landcover_dir):
+    _setup(monkeypatch, landcover_dir)
+    w, s, e, n = _bbox()
+
+    # Triangle over the bbox: cells above the diagonal are outside
+    polygon = {
+        "type": "Feature",
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[w, s], [e, s], [e, n], [w, s]]]
+        }
+    }
+    bbox, rings = region.parse_region({"polygon": polygon})
+    result = region.analyze_region(bbox, 60, "PADDY", RULES_FILE, rings=rings)
+
+    status = result.grids["status"]
+    assert status[0, 0] == 0 and status[-3, -3] != 0
+    assert result.summary["counts"]["OUTSIDE"] > 0
+
+    encoded = region.to_rle_json(result)
+    json.dumps(encoded)
+    try:
+        region.to_rle_json(result, budget_mb=1e-6)
+    except ValueError as e:
+        assert "npz" in str(e)
+    else:
+        raise AssertionError("oversized RLE accepted")
+    decoded = region.run_length_decode(encoded["grids"]["status"], status.shape)
+    assert np.array_equal(decoded, status)
+
+    npz = np.load(io.BytesIO(region.to_npz(result)))
+    assert np.array_equal(npz["recommendation"], result.grids["recommendation"])
+    assert json.loads(str(npz["header"]))["width"] == result.grid.width
+
+    with rasterio.MemoryFile(region.to_geotiff(result)) as mem:
+        with mem.open() as src:
+            band = src.descriptions.index("status") + 1
+            assert np.array_equal(src.read(band), status.astype(np.float32))
+
+
+def test_region_budget_is_enforced():
+    try:
+        region.analyze_region((70, 10, 90, 30), 10, "PADDY", RULES_FILE, budget_mb=1)
+    except ValueError as e:
+        assert "budget" in str(e)
+    else:
+        raise AssertionError("oversized region accepted")
+
+
+def test_region_endpoint_rejects_non_numeric_resolution():
+    from app import app
+
+    client = app.test_client()
+    for resolution in ("ten", [10], {"m": 10}):
+        response = client.post("/analyze_region", json={
+            "bbox": [78.0, 30.0, 78.1, 30.1], "resolution_m": resolution, "land_use": "PADDY"
+        })
+        assert response.status_code == 400
+
+
+def test_region_endpoint_rejects_malformed_polygons():
+    from app import app
+
+    client = app.test_client()
+    for polygon in (
+        "x",
+        {"type": "Polygon", "coordinates": [[1, 2, 3]]},
+        {"type": "Polygon", "coordinates": [[[78.0, 30.0], [78.1], [78.1, 30.1], [78.0, 30.0]]]},
+        {"type": "MultiPolygon", "coordinates": "ring"},
+    ):
+        response = client.post("/analyze_region", json={
+            "polygon": polygon, "resolution_m": 100, "land_use": "PADDY"
+        })
+        assert response.status_code == 400
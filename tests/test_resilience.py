@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+import requests
+
+import geo.factor_builder as factor_builder
+import geo.sensors.rainfall_sensor as rainfall_sensor
+from geo.aio import RUNTIME
+from geo.resilience import (
+    Budget,
+    CircuitBreaker,
+    CircuitOpenError,
+    get_breaker,
+    guarded,
+    guarded_async
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_then_half_opens():
+    clock = Clock()
+    breaker = CircuitBreaker("power", failures=2, reset_s=30, clock=clock)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now = 31
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one trial call at a time
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 62
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.snapshot()["opened"] == 2
+
+
+def test_guarded_fails_fast_and_ignores_client_errors(monkeypatch):
+    monkeypatch.setattr(get_breaker("power"), "failures", 2)
+    calls = []
+
+    def not_found():
+        calls.append(1)
+        response = requests.Response()
+        response.status_code = 404
+        raise requests.HTTPError(response=response)
+
+    def down():
+        calls.append(1)
+        raise requests.ConnectionError("down")
+
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            guarded("power", not_found)
+    assert get_breaker("power").state == "closed"
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            guarded("power", down)
+    with pytest.raises(CircuitOpenError):
+        guarded("power", down)
+    assert len(calls) == 5
+
+
+def test_guarded_async_timeout_counts_and_hedge_wins(monkeypatch):
+    monkeypatch.setattr(get_breaker("terrain"), "failures", 1)
+    attempts = []
+
+    async def slow_then_fast():
+        attempts.append(1)
+        await asyncio.sleep(5.0 if len(attempts) == 1 else 0.01)
+        return len(attempts)
+
+    async def run():
+        hedged = await guarded_async("power", slow_then_fast, timeout=1.0, hedge_after_s=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await guarded_async("terrain", lambda: asyncio.sleep(5.0), timeout=0.05, hedge_after_s=0)
+        return hedged
+
+    assert RUNTIME.run(run(), timeout=5) == 2
+    assert get_breaker("terrain").state == "open"
+    assert get_breaker("power").state == "closed"
+
+
+def test_budget_stage_caps():
+    clock = Clock()
+    budget = Budget(10, {"rainfall": 4}, clock=clock)
+
+    clock.now = 1
+    assert budget.for_stage("rainfall") == 3
+    assert budget.for_stage("slope") == 9
+
+    clock.now = 12
+    assert budget.for_stage("slope") == budget.remaining() == 0
+
+
+def test_open_circuit_skips_upstream(monkeypatch, tmp_path):
+    from geo.sensors.rainfall_store import RainfallCellCache
+
+    monkeypatch.setattr(get_breaker("power"), "failures", 2)
+    monkeypatch.setattr(rainfall_sensor, "get_rainfall_pack", lambda: None)
+    monkeypatch.setattr(rainfall_sensor, "CELL_CACHE", RainfallCellCache(str(tmp_path / "r.sqlite")))
+    calls = []
+
+    def down(lat, lon):
+        calls.append((lat, lon))
+        raise requests.Timeout("slow")
+
+    monkeypatch.setattr(rainfall_sensor, "fetch_power_annual_mm", down)
+
+    values, fell_back = rainfall_sensor.fetch_rainfall_mm_many([10, 20, 30, 40], [70, 75, 80, 85])
+
+    assert fell_back.all()
+    assert (values == rainfall_sensor.RAINFALL_FALLBACK_MM).all()
+    assert len(calls) == 2
+
+
+def test_fallbacks_are_reported(monkeypatch):
+    for _ in range(get_breaker("terrain").failures):
+        get_breaker("terrain").record_failure()
+
+    async def rainfall(lat, lon, timeout=None):
+        await asyncio.sleep(5.0)
+
+    async def slope(lat, lon, timeout=None):
+        return factor_builder.SLOPE_FALLBACK_PERCENT, True
+
+    monkeypatch.setattr(factor_builder, "fetch_rainfall_mm_async", rainfall)
+    monkeypatch.setattr(factor_builder, "fetch_slope_percent_async", slope)
+
+    factors = RUNTIME.run(factor_builder.build_factors_async(30.3, 78.0, "PADDY", deadline_s=0.1))
+
+    assert factors.fallbacks == {"rainfall_mm": "timed_out", "slope_percent": "circuit_open"}
@@ -0,0 +1,101 @@
+import json
+import os
+import random
+
+from engine.decision_table import reference_evaluate
+from engine.rule_engine import evaluate_rules, get_rule_set, load_rules
+from geo.location_contract import LocationFactors
+
+RULES_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "rules",
+    "icar_table_4_1_mechanical_measures.json"
+)
+
+SOIL_DEPTHS = ["SHALLOW", "MEDIUM", "MODERATE", "DEEP", "UNKNOWN"]
+DRAINAGES = ["POOR", "MODERATE", "GOOD", "WELL_DRAINED"]
+LAND_USES = ["PADDY", "TEA", "VEGETABLES", "SMALL_MILLETS", "BANANA", "MAIZE", "UNLISTED"]
+
+
+def random_factors(rng, rules):
+    slope_points = [v for r in rules for v in r.get("slope_range", [])] + \
+        [r["slope_max"] for r in rules if "slope_max" in r]
+    rain_points = [v for r in rules for v in r.get("rainfall_range", [])] + \
+        [r[k] for r in rules for k in ("rainfall_min", "rainfall_max") if k in r]
+
+    # Mix exact thresholds with values in between
+    slope = rng.choice(slope_points) if rng.random() < 0.3 else round(rng.uniform(0, 40), 2)
+    rainfall = rng.choice(rain_points) if rng.random() < 0.3 else round(rng.uniform(0, 3500), 2)
+
+    return LocationFactors(
+        latitude=0.0, longitude=0.0,
+        land_use=rng.choice(LAND_USES),
+        rainfall_mm=rainfall,
+        slope_percent=slope,
+        soil_depth=rng.choice(SOIL_DEPTHS),
+        drainage=rng.choice(DRAINAGES)
+    )
+
+
+def test_compiled_rules_match_reference():
+    rules = load_rules(RULES_FILE)
+    rng = random.Random(7)
+
+    for _ in range(5000):
+        factors = random_factors(rng, rules)
+        assert evaluate_rules(factors, RULES_FILE) == reference_evaluate(factors, rules)
+
+
+def test_rainfall_range_is_honoured():
+    factors = LocationFactors(
+        latitude=0.0, longitude=0.0, land_use="PADDY",
+        rainfall_mm=400.0, slope_percent=5.0,
+        soil_depth="DEEP", drainage="GOOD"
+    )
+
+    result = evaluate_rules(factors, RULES_FILE)
+
+    # Conservation bench terracing needs 1200-2000 mm
+    assert "Conservation bench terracing" not in result["measures"]
+
+
+def test_rule_file_reloads_on_change(tmp_path):
+    path = tmp_path / "rules.json"
+    rule = {"measure": "A", "slope_max": 10, "soil_depth": ["DEEP"], "land_use": ["PADDY"]}
+    path.write_text(json.dumps([rule]))
+
+    first = get_rule_set(str(path))
+    assert get_rule_set(str(path)) is first
+
+    rule["measure"] = "B"
+    path.write_text(json.dumps([rule, dict(rule, measure="C")]))
+    os.utime(path, ns=(1, 1))
+
+    assert get_rule_set(str(path)).measures == ["B", "C"]
+
+
+def test_decision_table_verifies():
+    from engine.decision_table import DecisionTable, verify_decision_table
+
+    rules = load_rules(RULES_FILE)
+
+    assert verify_decision_table(DecisionTable(rules), rules, samples=5000, seed=11) == []
+
+
+def test_decision_table_unlisted_optional_value():
+    from engine.decision_table import DecisionTable, verify_decision_table
+
+    # List-valued drainage makes it an exact-membership field
+    rules = [
+        dict(r, drainage=[r["drainage"]]) if "drainage" in r else r
+        for r in load_rules(RULES_FILE)
+    ]
+    table = DecisionTable(rules)
+
+    factors = LocationFactors(
+        latitude=0.0, longitude=0.0, land_use="PADDY", rainfall_mm=1500.0,
+        slope_percent=20.0, soil_depth="DEEP", drainage="UNLISTED"
+    )
+    assert table.evaluate(factors) == reference_evaluate(factors, rules)
+    assert table.evaluate(factors)["measures"]
+    assert verify_decision_table(table, rules, samples=5000, seed=11) == []
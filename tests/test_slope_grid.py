@@ -0,0 +1,66 @@
+import threading
+import time
+
+import geo.slope as slope
+
+
+def test_grid_is_sampled_concurrently_and_reused(monkeypatch):
+    calls = []
+    in_flight = [0, 0]  # current, peak
+    lock = threading.Lock()
+
+    def fake_elevation(lat, lon):
+        with lock:
+            calls.append((lat, lon))
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        # 1 m rise per ~1.1 m northwards -> steep but finite
+        return lat * 100_000.0
+
+    monkeypatch.setattr(slope, "_get_elevation", fake_elevation)
+    slope._ELEVATIONS.clear()
+
+    first = slope.get_slope_with_stats(30.3165, 78.0322)
+    assert first["samples"] == 25
+    assert first["fetched"] == 25
+    assert first["failed"] == 0
+    assert in_flight[1] > 1
+
+    # The grid is centred on the point
+    lats, lons = zip(*calls)
+    assert abs(sum(lats) / 25 - 30.3165) < 1e-9
+    assert abs(sum(lons) / 25 - 78.0322) < 1e-9
+
+    # A point half a metre away shares most of its samples
+    second = slope.get_slope_with_stats(30.316505, 78.032205)
+    assert second["cache_hits"] >= 16
+    assert len(calls) < 50
+
+
+def test_no_elevations_give_zero_slope(monkeypatch):
+    def down(lat, lon):
+        raise RuntimeError("No elevation data from Mapbox")
+
+    monkeypatch.setattr(slope, "_get_elevation", down)
+    slope._ELEVATIONS.clear()
+
+    assert slope.get_slope(12.9716, 77.5946) == 0.0
+
+
+def test_partial_failures_are_reported(monkeypatch):
+    def flaky_elevation(lat, lon):
+        if round(lon * 1e6) % 3 == 0:
+            raise RuntimeError("No elevation data from Mapbox")
+        return 500.0
+
+    monkeypatch.setattr(slope, "_get_elevation", flaky_elevation)
+    slope._ELEVATIONS.clear()
+
+    stats = slope.get_slope_with_stats(12.9716, 77.5946)
+
+    assert stats["failed"] > 0
+    assert stats["fetched"] + stats["failed"] == 25
+    assert stats["slope_percent"] == 0.0
@@ -0,0 +1,105 @@
+import numpy as np
+
+from geo.dem.dem_utils import slope_percent_grid, tile_row_resolution
+from geo.dem.mosaic import SlopeMosaic, latlon_to_tile_fraction
+
+ZOOM = 12
+SIZE = 16
+
+
+class _Tiles:
+    def __init__(self, build):
+        self.build = build
+        self.calls = []
+
+    def get(self, z, x, y):
+        self.calls.append((z, x, y))
+        return self.build(z, x, y)
+
+
+def _plane_tile(z, x, y):
+    # Elevation is a plane in global pixel space: continuous across edges
+    rows, cols = np.mgrid[0:SIZE, 0:SIZE]
+    return ((x * SIZE + cols) * 2.0 + (y * SIZE + rows) * 1.0).astype(np.float32)
+
+
+def _slope_tile(z, x, y):
+    res = tile_row_resolution(z, y, SIZE)
+    return slope_percent_grid(_plane_tile(z, x, y), res, res)
+
+
+def _point_at(x, y, row, col):
+    # Lat/lon of the centre of pixel (row, col) in tile (x, y)
+    n = 2 ** ZOOM
+    tx = x + (col + 0.5) / SIZE
+    ty = y + (row + 0.5) / SIZE
+    lon = tx / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * ty / n))))
+    return float(lat), float(lon)
+
+
+def test_point_maps_to_its_own_pixel():
+    lat, lon = _point_at(2930, 1710, 3, 11)
+    tx, ty = latlon_to_tile_fraction(lat, lon, ZOOM)
+
+    assert int(tx) == 2930 and int(ty) == 1710
+    assert int((tx - 2930) * SIZE) == 11
+    assert int((ty - 1710) * SIZE) == 3
+
+
+def test_edge_window_is_stitched_and_cached():
+    elevation = _Tiles(_plane_tile)
+    mosaic = SlopeMosaic(elevation, _Tiles(_slope_tile))
+
+    interior = mosaic.slope_at(*_point_at(2930, 1710, 8, 8), ZOOM, 2)
+    corner = mosaic.slope_at(*_point_at(2930, 1710, 0, 15), ZOOM, 2)
+    nearby = mosaic.slope_at(*_point_at(2930, 1710, 1, 14), ZOOM, 2)
+
+    # A plane has the same slope everywhere; edge padding would bias it
+    assert abs(corner - interior) / interior < 0.01
+    assert abs(nearby - interior) / interior < 0.01
+
+    assert mosaic.stats["tile_samples"] == 1
+    assert mosaic.stats["block_builds"] == 1
+    assert mosaic.stats["block_hits"] == 1
+    assert len(set(elevation.calls)) == 4
+
+
+def test_slope_many_matches_slope_at():
+    rng = np.random.default_rng(1)
+    points = [
+        _point_at(int(x), int(y), int(r), int(c))
+        for x, y, r, c in zip(
+            rng.integers(2930, 2932, 60), rng.integers(1710, 1712, 60),
+            rng.integers(0, SIZE, 60), rng.integers(0, SIZE, 60)
+        )
+    ]
+    lats, lons = np.array(points).T
+
+    mosaic = SlopeMosaic(_Tiles(_plane_tile), _Tiles(_slope_tile))
+    many = mosaic.slope_many(lats, lons, ZOOM, 2)
+
+    for value, (lat, lon) in zip(many, points):
+        assert np.isclose(value, mosaic.slope_at(lat, lon, ZOOM, 2))
+
+
+def test_block_with_failed_neighbour_is_not_cached():
+    failures = [(ZOOM, 2931, 1709)]
+
+    def flaky(z, x, y):
+        if (z, x, y) in failures:
+            failures.remove((z, x, y))
+            raise OSError("timeout")
+        return _plane_tile(z, x, y)
+
+    mosaic = SlopeMosaic(_Tiles(flaky), _Tiles(_slope_tile))
+    point = _point_at(2930, 1710, 0, 15)
+
+    partial = mosaic.slope_at(*point, ZOOM, 2)
+    retried = mosaic.slope_at(*point, ZOOM, 2)
+    cached = mosaic.slope_at(*point, ZOOM, 2)
+
+    assert mosaic.stats["partial_blocks"] == 1
+    assert mosaic.stats["block_builds"] == 2
+    assert mosaic.stats["block_hits"] == 1
+    assert retried == cached and partial != retried
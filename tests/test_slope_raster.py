@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+import geo.sensors.slope_sensor as slope_sensor
+from geo.dem.slope_raster import SlopeRaster
+from tools.build_slope_raster import _build_tile_unit, _unit_path, build_from_dem
+
+
+def _write_plane_dem(path):
+    # 30 m UTM grid rising 3 m per pixel eastwards -> 10 % slope
+    cols, _ = np.meshgrid(np.arange(300), np.arange(200))
+    profile = {
+        "driver": "GTiff",
+        "width": 300,
+        "height": 200,
+        "count": 1,
+        "dtype": "float32",
+        "crs": "EPSG:32644",
+        "transform": from_origin(400000, 3300000, 30, 30)
+    }
+    with rasterio.open(path, "w", **profile) as dst:
+        dst.write((cols * 3.0).astype(np.float32), 1)
+
+
+def test_dem_build_is_resumable_and_served(tmp_path):
+    dem = str(tmp_path / "dem.tif")
+    out = str(tmp_path / "slope.tif")
+    work = str(tmp_path / "work")
+    _write_plane_dem(dem)
+
+    assert build_from_dem(dem, out, work, workers=2, block_size=64) == 0
+    assert build_from_dem(dem, out, work, workers=2, block_size=64) == 0
+
+    with rasterio.open(out) as src:
+        assert src.profile["tiled"]
+        assert src.compression is not None
+        assert src.overviews(1)
+        # Block seams are exact thanks to the halo reads
+        # (the outer columns see a replicated edge)
+        assert np.allclose(src.read(1)[:, 1:-1], 10.0, atol=1e-3)
+
+    raster = SlopeRaster(out)
+    with rasterio.open(dem) as src:
+        lon, lat = rasterio.warp.transform(src.crs, "EPSG:4326", [404500], [3297000])
+
+    assert abs(raster.sample(lat[0], lon[0], radius=2) - 10.0) < 1e-3
+    assert raster.sample(0.0, 0.0) is None
+
+    # Batch sampling agrees, including windows clipped at the raster edge
+    xs = [400015, 404500, 408985, 402000]
+    ys = [3299985, 3297000, 3294015, 3299000]
+    with rasterio.open(dem) as src:
+        lons, lats = rasterio.warp.transform(src.crs, "EPSG:4326", xs, ys)
+
+    many = raster.sample_many(lats + [0.0], lons + [0.0], radius=2)
+    for value, lat, lon in zip(many, lats, lons):
+        assert np.isclose(value, raster.sample(lat, lon, radius=2))
+    assert np.isnan(many[-1])
+
+
+class _Tiles:
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+
+    def get(self, z, x, y):
+        if (x, y) in self.missing:
+            self.missing.discard((x, y))
+            raise OSError("timeout")
+        return np.zeros((16, 16), dtype=np.float32)
+
+
+def test_tile_unit_with_missing_neighbour_is_retried(tmp_path, monkeypatch):
+    work = str(tmp_path)
+    monkeypatch.setattr(slope_sensor, "TILE_CACHE", _Tiles(missing=[(11, 20)]))
+    monkeypatch.setattr(slope_sensor, "SLOPE_TILE_CACHE", _Tiles())
+
+    with pytest.raises(RuntimeError):
+        _build_tile_unit(work, 12, 10, 20)
+    assert not os.path.exists(_unit_path(work, (12, 10, 20)))
+
+    # The neighbour is back: the rerun builds the unit
+    assert _build_tile_unit(work, 12, 10, 20) == (_unit_path(work, (12, 10, 20)), True)
+
+
+def test_work_dir_of_another_build_is_discarded(tmp_path):
+    dem = str(tmp_path / "dem.tif")
+    out = str(tmp_path / "slope.tif")
+    work = str(tmp_path / "work")
+    _write_plane_dem(dem)
+
+    assert build_from_dem(dem, out, work, workers=1, block_size=64) == 0
+    # A window of another build at an offset this one also uses
+    np.save(os.path.join(work, "0_0.npy"), np.full((64, 64), 99.0, dtype=np.float32))
+    os.remove(os.path.join(work, "manifest.json"))
+
+    assert build_from_dem(dem, out, work, workers=1, block_size=100) == 0
+    assert not os.path.exists(os.path.join(work, "0_64.npy"))
+    with rasterio.open(out) as src:
+        assert np.allclose(src.read(1)[:, 1:-1], 10.0, atol=1e-3)
@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+
+import engine.streaming as streaming
+from engine.region import RegionJob, analyze_region, run_length_decode
+from tests.test_pipeline import _setup as _setup_pipeline
+from tests.test_region import _bbox, _setup as _setup_region
+from tests.test_rule_engine import RULES_FILE
+
+
+def test_batch_stream_is_lazy_ordered_and_summarized(monkeypatch, landcover_dir):
+    _setup_pipeline(monkeypatch, landcover_dir)
+    pulled = []
+
+    def records():
+        for i in range(50):
+            pulled.append(i)
+            yield {"lat": 20.0 + i * 0.001, "lon": 78.0, "land_use": "PADDY"} if i != 7 else {}
+
+    stream = streaming.stream_batch(records(), RULES_FILE, chunk_items=4, max_in_flight=2)
+
+    first = next(stream)
+    assert first["index"] == 0
+    # Only the chunks in flight have been read from the input
+    assert len(pulled) <= 4 * 3
+
+    lines = [first] + list(stream)
+    results, summary = lines[:-1], lines[-1]
+
+    assert [r["index"] for r in results] == list(range(50))
+    assert results[7]["status"] == "ERROR"
+    assert summary["type"] == "summary"
+    assert summary["count"] == 50
+    assert sum(summary["counts"].values()) == 50
+    assert summary["counts"]["ERROR"] == 1
+    assert "slope_ms" in summary["timings"]
+
+
+def test_batch_stream_truncates(monkeypatch, landcover_dir):
+    _setup_pipeline(monkeypatch, landcover_dir)
+    records = [{"lat": 20.0, "lon": 78.0, "land_use": "PADDY"}] * 10
+
+    lines = list(streaming.stream_batch(records, RULES_FILE, chunk_items=4, max_items=6))
+
+    assert len(lines) == 7
+    assert lines[-1]["truncated"] and lines[-1]["count"] == 6
+
+
+def test_region_stream_matches_buffered(monkeypatch, landcover_dir):
+    _setup_region(monkeypatch, landcover_dir)
+
+    buffered = analyze_region(_bbox(), 60, "PADDY", RULES_FILE, chunk_cells=300)
+    job = RegionJob(_bbox(), 60, "PADDY", RULES_FILE, chunk_cells=300)
+    lines = [json.loads(line) for line in streaming.ndjson_lines(streaming.stream_region(job))]
+
+    header, rows, summary = lines[0], lines[1:-1], lines[-1]
+    assert header["type"] == "header" and summary["type"] == "summary"
+    assert len(rows) > 1
+
+    status = np.vstack([
+        run_length_decode(r["grids"]["status"], (r["row_end"] - r["row_start"], header["width"]))
+        for r in rows
+    ])
+    assert np.array_equal(status, buffered.grids["status"])
+    assert summary["counts"]["OK"] == buffered.summary["counts"]["OK"]
+    assert summary["counts"]["ERROR"] == 0
+    assert summary["legends"] == buffered.legends
+
+
+def test_ndjson_endpoint(monkeypatch, landcover_dir):
+    _setup_pipeline(monkeypatch, landcover_dir)
+    import app
+
+    body = "\n".join([
+        json.dumps({"lat": 20.0, "lon": 78.0, "land_use": "PADDY"}),
+        "not json",
+        ""
+    ])
+    response = app.app.test_client().post(
+        "/analyze/batch", data=body, content_type=streaming.NDJSON_MIMETYPE
+    )
+
+    assert response.mimetype == streaming.NDJSON_MIMETYPE
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["type"] for line in lines] == ["result", "result", "summary"]
+    assert lines[1]["status"] == "ERROR"
+
+
+def test_streamed_batches_are_recorded(monkeypatch, landcover_dir, tmp_path):
+    _setup_pipeline(monkeypatch, landcover_dir)
+    import app
+    from engine.traffic import TrafficRecorder
+
+    path = tmp_path / "traffic.jsonl"
+    monkeypatch.setattr(app, "TRAFFIC", TrafficRecorder(str(path)))
+
+    body = "\n".join(json.dumps({"lat": 20.0 + i, "lon": 78.0, "land_use": "PADDY"}) for i in range(3))
+    response = app.app.test_client().post(
+        "/analyze/batch", data=body, content_type=streaming.NDJSON_MIMETYPE
+    )
+    response.get_data()
+
+    recorded = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["lat"] for r in recorded] == [20.0, 21.0, 22.0]
+    assert {r["endpoint"] for r in recorded} == {"/analyze/batch"}
@@ -0,0 +1,45 @@
+import numpy as np
+
+from geo.dem.tile_cache import TerrainTileCache
+
+
+def _fake_fetcher(calls):
+    def fetch(z, x, y):
+        calls.append((z, x, y))
+        return np.full((4, 4), float(x + y), dtype=np.float64)
+    return fetch
+
+
+def test_tile_is_fetched_once_and_persisted(tmp_path):
+    calls = []
+    cache = TerrainTileCache(_fake_fetcher(calls), cache_dir=str(tmp_path))
+
+    first = cache.get(12, 10, 20)
+    second = cache.get(12, 10, 20)
+
+    assert calls == [(12, 10, 20)]
+    assert first.dtype == np.float32
+    assert float(second[0, 0]) == 30.0
+    assert cache.stats["memory_hits"] == 1
+
+    # New process (fresh memory) reads the .npy without refetching
+    restarted = TerrainTileCache(_fake_fetcher(calls), cache_dir=str(tmp_path))
+    tile = restarted.get(12, 10, 20)
+
+    assert calls == [(12, 10, 20)]
+    assert isinstance(tile, np.memmap)
+    assert restarted.stats["disk_hits"] == 1
+
+
+def test_lru_respects_byte_budget(tmp_path):
+    calls = []
+    # Each tile is 4x4 float32 = 64 bytes
+    cache = TerrainTileCache(
+        _fake_fetcher(calls), cache_dir=str(tmp_path), max_bytes=128
+    )
+
+    for x in range(3):
+        cache.get(12, x, 0)
+
+    assert cache.memory_bytes <= 128
+    assert cache.stats["evictions"] == 1
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+tools/build_decision_table.py
+
+Usage:
+  # build, verify against rule_matches and print a summary
+  python tools/build_decision_table.py --verify 100000
+
+  # also write the table as JSON for review / audit
+  python tools/build_decision_table.py --out data/decision_table.json
+
+This script:
+ - collects every slope / rainfall threshold of the rules file
+ - enumerates every slope x rainfall cell for every soil depth,
+   drainage and land use combination
+ - stores the STRICT / RELAXED measures of each cell
+ - optionally proves the table equals rule_matches on randomized inputs
+
+The API builds the same table in memory from the rules file (and
+rebuilds it when the file changes), so the JSON is informational.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from engine.decision_table import DecisionTable, verify_decision_table  # noqa: E402
+from engine.rule_engine import load_rules  # noqa: E402
+
+RULES_FILE = os.path.join(PROJECT_ROOT, "rules", "icar_table_4_1_mechanical_measures.json")
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rules", default=RULES_FILE, help="Rules JSON file")
+    p.add_argument("--out", help="Write the table as JSON")
+    p.add_argument("--verify", type=int, default=0, help="Randomized samples to verify")
+    p.add_argument("--seed", type=int, default=0, help="Verification seed")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    rules = load_rules(args.rules)
+
+    start = time.perf_counter()
+    table = DecisionTable(rules)
+    print(f"Built in {(time.perf_counter() - start) * 1000:.1f} ms")
+    print("Slope breakpoints:", table.slope_breakpoints)
+    print("Rainfall breakpoints:", table.rainfall_breakpoints)
+    print("Category combinations:", len(table.cells))
+    print("Distinct answers:", len(table.results))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(table.to_dict(), f)
+        print("Wrote", args.out)
+
+    if args.verify:
+        mismatches = verify_decision_table(table, rules, args.verify, args.seed)
+        if mismatches:
+            for m in mismatches[:10]:
+                print("MISMATCH:", m)
+            raise SystemExit(f"{len(mismatches)} of {args.verify} samples differ")
+        print(f"Verified {args.verify} randomized samples: table matches rule_matches")
+
+
+if __name__ == "__main__":
+    main()
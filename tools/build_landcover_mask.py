@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+tools/build_landcover_mask.py
+
+Usage:
+  python tools/build_landcover_mask.py
+  python tools/build_landcover_mask.py --out data/landcover_mask --workers 4
+
+This script:
+ - reads every ESRI land cover GeoTIFF in data/landcover in strips
+ - computes the 3x3 majority class of every pixel (the same rule
+   is_arable_land applies) with vectorized NumPy
+ - writes one 4-bit, page-blocked .c4 file per tile plus index.json
+   (see geo/landcover_mask.py for the format)
+ - skips tiles already built, so an interrupted run resumes
+ - writes index.json only once every tile is built
+
+is_arable_land answers from the mask through a memory map once
+index.json exists.
+"""
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import rasterio
+from rasterio.warp import transform_bounds
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from geo.arable_classifier import LANDCOVER_DIR  # noqa: E402
+from geo.landcover_catalog import MAX_CLASS, majority_3x3  # noqa: E402
+from geo.landcover_mask import BLOCK_ROWS, LANDCOVER_MASK_DIR, pack_block_row  # noqa: E402
+
+
+def build_tile(tif, out_dir):
+    name = os.path.splitext(os.path.basename(tif))[0]
+    meta_path = os.path.join(out_dir, f"{name}.json")
+
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            return json.load(f), False
+
+    mask_file = f"{name}.c4"
+    tmp = os.path.join(out_dir, mask_file + ".tmp")
+
+    with rasterio.open(tif) as src, open(tmp, "wb") as out:
+        for row_off in range(0, src.height, BLOCK_ROWS):
+            rows = min(BLOCK_ROWS, src.height - row_off)
+
+            # One-pixel halo, nodata (0) outside the raster
+            strip = src.read(
+                1,
+                window=((row_off - 1, row_off + rows + 1), (-1, src.width + 1)),
+                boundless=True,
+                fill_value=0
+            )
+            strip = np.where(strip > MAX_CLASS, 0, strip).astype(np.uint8)
+
+            out.write(pack_block_row(majority_3x3(strip)))
+
+        meta = {
+            "name": name,
+            "file": mask_file,
+            "source": os.path.basename(tif),
+            "crs": src.crs.to_string(),
+            "transform": list(src.transform)[:6],
+            "width": src.width,
+            "height": src.height,
+            "bounds": list(src.bounds),
+            "wgs84_bounds": list(transform_bounds(src.crs, "EPSG:4326", *src.bounds))
+        }
+
+    os.replace(tmp, os.path.join(out_dir, mask_file))
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+
+    return meta, True
+
+
+def build_mask(landcover_dir=LANDCOVER_DIR, out_dir=LANDCOVER_MASK_DIR, workers=None):
+    os.makedirs(out_dir, exist_ok=True)
+
+    tifs = sorted(
+        os.path.join(landcover_dir, f)
+        for f in os.listdir(landcover_dir)
+        if f.lower().endswith(".tif")
+    )
+    print(f"{len(tifs)} land cover tiles")
+
+    metas = {}
+    failed = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(build_tile, tif, out_dir): tif for tif in tifs}
+
+        for fut in as_completed(futures):
+            try:
+                meta, fresh = fut.result()
+                metas[futures[fut]] = meta
+                print("Built" if fresh else "Resumed", meta["file"])
+            except Exception as e:
+                failed += 1
+                print("Tile failed:", futures[fut], e)
+
+    index_path = os.path.join(out_dir, "index.json")
+
+    # A partial index would answer "outside coverage" inside failed
+    # tiles: without an index, lookups keep using the GeoTIFF catalog
+    if failed:
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        print("index.json not written")
+        return failed
+
+    # Same tile order as the GeoTIFF catalog
+    index = {"tiles": [metas[t] for t in tifs]}
+    tmp = f"{index_path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, index_path)
+
+    print("Wrote", index_path)
+    return failed
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--landcover-dir", default=LANDCOVER_DIR, help="ESRI GeoTIFF directory")
+    p.add_argument("--out", default=LANDCOVER_MASK_DIR, help="Output mask directory")
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    failed = build_mask(args.landcover_dir, args.out, args.workers)
+    if failed:
+        raise SystemExit(f"{failed} tiles failed; rerun to resume them")
+
+
+if __name__ == "__main__":
+    main()
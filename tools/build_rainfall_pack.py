@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+tools/build_rainfall_pack.py
+
+Usage:
+  # whole of India (default bbox)
+  python tools/build_rainfall_pack.py
+
+  # selected states only
+  python tools/build_rainfall_pack.py --bbox 74.0,32.0,80.5,37.1 --bbox 77.5,28.7,81.1,31.5
+
+This script:
+ - enumerates every NASA POWER grid cell (0.5° x 0.625°) in the bboxes
+ - fetches each cell's annual climatology once, in parallel, into the
+   persistent per-cell cache (so an interrupted run resumes)
+ - writes a dense float32 pack (+ JSON sidecar) that fetch_rainfall_mm
+   reads through a memory map, with no network access
+"""
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from geo.sensors.rainfall_sensor import CELL_CACHE, fetch_power_annual_mm  # noqa: E402
+from geo.sensors.rainfall_store import (  # noqa: E402
+    RAINFALL_PACK_PATH,
+    power_cell,
+    power_cell_center,
+    write_rainfall_pack
+)
+
+INDIA_BBOX = (68.0, 6.0, 98.0, 37.5)
+
+
+def cells_for_bboxes(bboxes):
+    cells = set()
+    for min_lon, min_lat, max_lon, max_lat in bboxes:
+        i0, j0 = power_cell(min_lat, min_lon)
+        i1, j1 = power_cell(max_lat, max_lon)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cells.add((i, j))
+    return sorted(cells)
+
+
+def _fetch_cell(i, j):
+    annual_mm = CELL_CACHE.get(i, j)
+    if annual_mm is None:
+        annual_mm = fetch_power_annual_mm(*power_cell_center(i, j))
+        CELL_CACHE.set(i, j, annual_mm)
+    return annual_mm
+
+
+def build_pack(bboxes, out=RAINFALL_PACK_PATH, workers=8):
+    cells = cells_for_bboxes(bboxes)
+    print(f"{len(cells)} POWER cells")
+
+    values = {}
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_fetch_cell, i, j): (i, j) for i, j in cells}
+
+        for n, fut in enumerate(as_completed(futures), 1):
+            try:
+                values[futures[fut]] = fut.result()
+            except Exception as e:
+                failed += 1
+                print("Cell failed:", futures[fut], e)
+
+            if n % 100 == 0 or n == len(futures):
+                print(f"{n}/{len(futures)} cells (failed={failed})")
+
+    write_rainfall_pack(values, out)
+    print("Wrote", out)
+    return failed
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--bbox", action="append", default=[],
+                   help="min_lon,min_lat,max_lon,max_lat (repeatable, default: India)")
+    p.add_argument("--out", default=RAINFALL_PACK_PATH, help="Output .npy pack")
+    p.add_argument("--workers", type=int, default=8, help="Concurrent POWER requests")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    bboxes = [tuple(float(v) for v in b.split(",")) for b in args.bbox] or [INDIA_BBOX]
+
+    failed = build_pack(bboxes, args.out, args.workers)
+    if failed:
+        print(f"{failed} cells failed; rerun to resume them")
+
+
+if __name__ == "__main__":
+    main()
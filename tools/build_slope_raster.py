@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+tools/build_slope_raster.py
+
+Usage:
+  # Terrain-RGB tiles (zoom 12) covering one or more lon/lat boxes
+  python tools/build_slope_raster.py --bbox 74.0,32.0,80.5,37.1 --bbox 77.5,28.7,81.1,31.5
+
+  # any local DEM GeoTIFF
+  python tools/build_slope_raster.py --dem data/dem/uttarakhand.tif
+
+This script:
+ - computes slope (%) per Terrain-RGB tile (stitched with its neighbours so
+   tile seams are exact) or per DEM window (read with a one-pixel halo)
+ - runs the work units in parallel worker processes
+ - keeps each finished unit in --work-dir, so an interrupted build resumes
+   where it stopped
+ - assembles a tiled, DEFLATE-compressed float32 GeoTIFF with overviews,
+   which geo/dem/slope_raster.py serves to fetch_slope_percent
+"""
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import Affine
+from rasterio.windows import Window
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from geo.dem.dem_utils import compute_slope_raster, slope_raster_profile  # noqa: E402
+from geo.dem.slope_raster import SLOPE_RASTER_PATH  # noqa: E402
+
+WEB_MERCATOR_HALF = 20037508.342789244
+NODATA = -9999.0
+OVERVIEW_FACTORS = [2, 4, 8, 16, 32]
+
+
+# ------------------------------------------------------------------
+# WORK UNITS
+# ------------------------------------------------------------------
+
+def _unit_path(work_dir, unit):
+    return os.path.join(work_dir, "_".join(str(v) for v in unit) + ".npy")
+
+
+def _save_unit(path, arr):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, arr.astype(np.float32))
+    os.replace(tmp, path)
+
+
+def _build_tile_unit(work_dir, zoom, x, y):
+    """
+    Slope raster of one Terrain-RGB tile, stitched with its 8 neighbours.
+    Raises (leaving the unit to a rerun) when a neighbour is unavailable.
+    """
+    from geo.dem.mosaic import SlopeMosaic
+    from geo.sensors.slope_sensor import SLOPE_TILE_CACHE, TILE_CACHE
+
+    path = _unit_path(work_dir, (zoom, x, y))
+    if os.path.exists(path):
+        return path, False
+
+    size = TILE_CACHE.get(zoom, x, y).shape[0]
+    mosaic = SlopeMosaic(TILE_CACHE, SLOPE_TILE_CACHE, max_blocks=1)
+    block, complete = mosaic.slope_block(zoom, x - 1, y - 1, x + 1, y + 1, size)
+    if not complete:
+        raise RuntimeError("neighbour tile unavailable")
+
+    _save_unit(path, block[size:2 * size, size:2 * size])
+    return path, True
+
+
+def _run(units, fn, workers):
+    built = skipped = failed = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fn, *unit): unit for unit in units}
+
+        for n, fut in enumerate(as_completed(futures), 1):
+            try:
+                _, fresh = fut.result()
+                if fresh:
+                    built += 1
+                else:
+                    skipped += 1
+            except Exception as e:
+                failed += 1
+                print("Unit failed:", futures[fut][2:], e)
+
+            if n % 100 == 0 or n == len(futures):
+                print(f"{n}/{len(futures)} units (built={built}, resumed={skipped}, failed={failed})")
+
+    return failed
+
+
+# ------------------------------------------------------------------
+# OUTPUT
+# ------------------------------------------------------------------
+
+def _write_raster(out, profile, placements):
+    """
+    placements: iterable of (unit .npy path, row_off, col_off)
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = f"{out}.tmp.tif"
+
+    with rasterio.open(tmp, "w", **profile) as dst:
+        for path, row_off, col_off in placements:
+            if not os.path.exists(path):
+                continue
+            arr = np.load(path)
+            arr = np.where(np.isnan(arr), NODATA, arr).astype(np.float32)
+            dst.write(arr, 1, window=Window(col_off, row_off, arr.shape[1], arr.shape[0]))
+
+    _publish(tmp, out)
+
+
+def _publish(tmp, out):
+    """
+    Add overviews to a finished raster and move it into place.
+    """
+    with rasterio.open(tmp, "r+") as dst:
+        dst.build_overviews(OVERVIEW_FACTORS, Resampling.average)
+        dst.update_tags(ns="rio_overview", resampling="average")
+
+    os.replace(tmp, out)
+    print("Wrote", out)
+
+
+# ------------------------------------------------------------------
+# BUILDERS
+# ------------------------------------------------------------------
+
+def _tiles_for_bboxes(bboxes, zoom):
+    from geo.sensors.slope_sensor import latlon_to_tile
+
+    tiles = set()
+    for min_lon, min_lat, max_lon, max_lat in bboxes:
+        x0, y0 = latlon_to_tile(max_lat, min_lon, zoom)
+        x1, y1 = latlon_to_tile(min_lat, max_lon, zoom)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                tiles.add((x, y))
+    return sorted(tiles)
+
+
+def build_from_terrain_rgb(bboxes, zoom, out, work_dir, workers, tile_size=256):
+    os.makedirs(work_dir, exist_ok=True)
+    tiles = _tiles_for_bboxes(bboxes, zoom)
+    print(f"{len(tiles)} Terrain-RGB tiles at zoom {zoom}")
+
+    failed = _run(
+        [(work_dir, zoom, x, y) for x, y in tiles],
+        _build_tile_unit,
+        workers
+    )
+
+    xs = [t[0] for t in tiles]
+    ys = [t[1] for t in tiles]
+    x0, y0 = min(xs), min(ys)
+
+    tile_m = 2 * WEB_MERCATOR_HALF / (2 ** zoom)
+    transform = Affine(
+        tile_m / tile_size, 0, -WEB_MERCATOR_HALF + x0 * tile_m,
+        0, -tile_m / tile_size, WEB_MERCATOR_HALF - y0 * tile_m
+    )
+
+    profile = slope_raster_profile(
+        (max(xs) - x0 + 1) * tile_size,
+        (max(ys) - y0 + 1) * tile_size,
+        "EPSG:3857",
+        transform,
+        tile_size,
+        NODATA
+    )
+
+    _write_raster(out, profile, (
+        (_unit_path(work_dir, (zoom, x, y)), (y - y0) * tile_size, (x - x0) * tile_size)
+        for x, y in tiles
+    ))
+    return failed
+
+
+def build_from_dem(dem_path, out, work_dir, workers, block_size=1024):
+    """
+    Slope raster of a local DEM through dem_utils.compute_slope_raster;
+    finished windows are kept in work_dir, so a failed build resumes.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = f"{out}.tmp.tif"
+
+    stats = compute_slope_raster(
+        dem_path, tmp, block_size=block_size, workers=workers,
+        work_dir=work_dir, nodata=NODATA
+    )
+    print(f"{stats['count']} slope pixels, mean {stats['mean']}, median {stats['median']}")
+
+    _publish(tmp, out)
+    return 0
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--bbox", action="append", default=[],
+                   help="min_lon,min_lat,max_lon,max_lat (repeatable)")
+    p.add_argument("--dem", help="Local DEM GeoTIFF (instead of Terrain-RGB tiles)")
+    p.add_argument("--zoom", type=int, default=12, help="Terrain-RGB zoom (default 12)")
+    p.add_argument("--out", default=SLOPE_RASTER_PATH, help="Output GeoTIFF")
+    p.add_argument("--work-dir", help="Resumable per-unit results (default: <out>.work)")
+    p.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    p.add_argument("--block-size", type=int, default=1024, help="DEM window size in pixels")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    work_dir = args.work_dir or f"{args.out}.work"
+
+    if args.dem:
+        failed = build_from_dem(args.dem, args.out, work_dir, args.workers, args.block_size)
+    elif args.bbox:
+        bboxes = [tuple(float(v) for v in b.split(",")) for b in args.bbox]
+        failed = build_from_terrain_rgb(bboxes, args.zoom, args.out, work_dir, args.workers)
+    else:
+        raise SystemExit("No input provided. Use --bbox or --dem")
+
+    if failed:
+        raise SystemExit(f"{failed} units failed; rerun to resume them")
+
+
+if __name__ == "__main__":
+    main()
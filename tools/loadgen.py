@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+tools/loadgen.py
+
+Usage:
+  # replay traffic recorded by a server run with SWC_TRAFFIC_LOG=traffic.jsonl
+  python tools/loadgen.py --url http://localhost:5000 --replay traffic.jsonl --concurrency 16
+
+  # 40 requests/s of synthetic farmland coordinates for two minutes
+  python tools/loadgen.py --synthetic 5000 --rate 40 --duration 120 --out report.json
+
+This script:
+ - replays a JSONL file of /analyze payloads ({"lat", "lon", "land_use"}
+   per line, the format engine/traffic.py records), or generates points
+   clustered around India's main agricultural regions, with a share of
+   repeated points so caches see realistic locality
+ - drives a running instance either closed-loop (--concurrency clients,
+   each sending its next request when the last one returns) or
+   open-loop (--rate requests/s, latency counted from the scheduled send
+   time so a saturated server is not hidden by the client slowing down)
+ - reports latency percentiles, throughput, error / fallback rates and
+   per-stage Server-Timing means, plus cache hit rates, fallbacks and
+   upstream calls from the change in /metrics over the run
+"""
+import os
+import sys
+import re
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+RULES_FILE = os.path.join(PROJECT_ROOT, "rules", "icar_table_4_1_mechanical_measures.json")
+
+# (region, lat, lon, weight): centres of the synthetic distribution,
+# weighted roughly by cropped area
+AGRI_REGIONS = [
+    ("Punjab", 30.9, 75.85, 8),
+    ("Haryana", 29.15, 76.0, 6),
+    ("Western UP", 28.9, 77.7, 9),
+    ("Bihar", 25.6, 85.1, 7),
+    ("West Bengal", 23.2, 88.0, 6),
+    ("Vidarbha", 20.9, 77.75, 6),
+    ("North Karnataka", 15.3, 75.7, 6),
+    ("Cauvery delta", 10.8, 79.1, 4),
+    ("Coastal Andhra", 16.5, 80.6, 5),
+    ("Malwa", 23.2, 77.4, 7),
+    ("Gujarat plains", 22.3, 72.6, 6),
+    ("Eastern Rajasthan", 26.9, 75.8, 5),
+    ("Odisha", 20.3, 85.8, 4),
+    ("Assam valley", 26.2, 91.7, 3),
+    ("Uttarakhand hills", 30.3, 78.0, 3),
+]
+
+INDIA_BBOX = (68.0, 6.0, 98.0, 37.5)
+
+PERCENTILES = (50, 95, 99)
+
+
+# ------------------------------------------------------------------
+# WORKLOADS
+# ------------------------------------------------------------------
+
+def load_replay(path):
+    """
+    Payloads of a JSONL traffic file; lines without lat / lon / land_use
+    are skipped.
+    """
+    payloads, skipped = [], 0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                payloads.append({
+                    "lat": float(record["lat"]),
+                    "lon": float(record["lon"]),
+                    "land_use": str(record["land_use"])
+                })
+            except (ValueError, TypeError, KeyError):
+                skipped += 1
+    if skipped:
+        print(f"Skipped {skipped} malformed lines in {path}")
+    return payloads
+
+
+def rule_land_uses(rule_file=RULES_FILE):
+    with open(rule_file) as f:
+        rules = json.load(f)
+    return sorted({land_use for rule in rules for land_use in rule.get("land_use", [])})
+
+
+def synthetic_payloads(n, land_uses, seed=0, spread_deg=0.6, repeat_fraction=0.3):
+    """
+    n payloads scattered (gaussian, spread_deg) around AGRI_REGIONS;
+    repeat_fraction of them re-send an earlier point, as users
+    re-analysing the same field do.
+    """
+    rng = random.Random(seed)
+    weights = [w for _, _, _, w in AGRI_REGIONS]
+    west, south, east, north = INDIA_BBOX
+
+    payloads = []
+    for _ in range(n):
+        if payloads and rng.random() < repeat_fraction:
+            payloads.append(dict(rng.choice(payloads)))
+            continue
+        _, lat, lon, _ = rng.choices(AGRI_REGIONS, weights)[0]
+        payloads.append({
+            "lat": round(min(max(rng.gauss(lat, spread_deg), south), north), 5),
+            "lon": round(min(max(rng.gauss(lon, spread_deg), west), east), 5),
+            "land_use": rng.choice(land_uses)
+        })
+    return payloads
+
+
+def payload_stream(payloads, requests_n=None, cycle=False):
+    """
+    The payloads to send: the first requests_n (cycling if there are
+    fewer), or all of them, repeated forever when cycle is set (runs
+    bounded by --duration).
+    """
+    if requests_n:
+        return itertools.islice(itertools.cycle(payloads), requests_n)
+    return itertools.cycle(payloads) if cycle else iter(payloads)
+
+
+# ------------------------------------------------------------------
+# PROMETHEUS SCRAPING
+# ------------------------------------------------------------------
+
+_SAMPLE_RE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)")
+_LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+_ESCAPE_RE = re.compile(r"\\(.)")
+
+
+def parse_prometheus(text):
+    """
+    {(name, ((label, value), ...)): value} of every sample in a text
+    exposition (comments and unparseable lines ignored).
+    """
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        labels = tuple(sorted(
+            (k, _ESCAPE_RE.sub(lambda m: "\n" if m.group(1) == "n" else m.group(1), v))
+            for k, v in _LABEL_RE.findall(labels or "")
+        ))
+        try:
+            samples[(name, labels)] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+
+def metric_delta(before, after):
+    """
+    Change of every sample over the run (samples new in `after` count
+    from zero).
+    """
+    return {key: value - before.get(key, 0.0) for key, value in after.items()}
+
+
+def scrape_metrics(session, url, timeout=10):
+    try:
+        response = session.get(url.rstrip("/") + "/metrics", timeout=timeout)
+        response.raise_for_status()
+        return parse_prometheus(response.text)
+    except Exception as e:
+        print("Metrics scrape failed:", e)
+        return None
+
+
+def _by_label(delta, name, *labelnames):
+    """
+    {label values: delta} of one metric family.
+    """
+    out = {}
+    for (sample, labels), value in delta.items():
+        if sample != name:
+            continue
+        labels = dict(labels)
+        key = tuple(labels.get(n, "") for n in labelnames)
+        out[key] = out.get(key, 0.0) + value
+    return out
+
+
+def _hit_rate(hits, total):
+    return round(hits / total, 4) if total else None
+
+
+def server_summary(delta):
+    """
+    Cache hit rates, fallbacks and upstream calls from a /metrics delta.
+    """
+    summary = {"factor_cache": {}, "tile_cache": {}, "fallbacks": {}, "upstream_requests": {}}
+
+    lookups = _by_label(delta, "swc_factor_cache_lookups_total", "source", "result")
+    for source in sorted({s for s, _ in lookups}):
+        counts = {r: int(v) for (s, r), v in lookups.items() if s == source}
+        total = sum(counts.values())
+        hits = counts.get("hits", 0) + counts.get("shared_hits", 0)
+        summary["factor_cache"][source] = {**counts, "hit_rate": _hit_rate(hits, total)}
+
+    lookups = _by_label(delta, "swc_tile_cache_lookups_total", "cache", "result")
+    for cache in sorted({c for c, _ in lookups}):
+        counts = {r: int(v) for (c, r), v in lookups.items() if c == cache}
+        total = sum(counts.values())
+        hits = counts.get("memory_hits", 0) + counts.get("disk_hits", 0)
+        summary["tile_cache"][cache] = {**counts, "hit_rate": _hit_rate(hits, total)}
+
+    for (factor, reason), value in sorted(_by_label(delta, "swc_fallbacks_total", "factor", "reason").items()):
+        if value:
+            summary["fallbacks"][f"{factor}:{reason}"] = int(value)
+
+    for (host, status), value in sorted(_by_label(delta, "swc_upstream_requests_total", "host", "status").items()):
+        if value:
+            summary["upstream_requests"].setdefault(host, {})[status] = int(value)
+
+    return summary
+
+
+# ------------------------------------------------------------------
+# CLIENT
+# ------------------------------------------------------------------
+
+def parse_server_timing(header):
+    """
+    {stage: ms} of a Server-Timing header.
+    """
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        match = re.search(r"dur=([0-9.]+)", params)
+        if name and match:
+            stages[name] = float(match.group(1))
+    return stages
+
+
+def make_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def send(session, url, payload, timeout):
+    """
+    POST one payload; returns a result dict (never raises).
+    """
+    start = time.perf_counter()
+    try:
+        response = session.post(url, json=payload, timeout=timeout)
+    except requests.RequestException as e:
+        return {"latency_ms": (time.perf_counter() - start) * 1000, "status": None,
+                "error": type(e).__name__}
+
+    result = {
+        "latency_ms": (time.perf_counter() - start) * 1000,
+        "status": response.status_code,
+        "stages": parse_server_timing(response.headers.get("Server-Timing"))
+    }
+    try:
+        body = response.json()
+        result["outcome"] = body.get("status")
+        result["fallbacks"] = body.get("fallbacks") or {}
+    except ValueError:
+        result["error"] = "invalid JSON"
+    return result
+
+
+def run_closed_loop(call, payloads, concurrency, duration_s=None):
+    """
+    `concurrency` workers, each sending its next payload as soon as the
+    previous response arrives.
+    """
+    results = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration_s if duration_s else None
+
+    def worker():
+        while deadline is None or time.perf_counter() < deadline:
+            with lock:
+                payload = next(payloads, None)
+            if payload is None:
+                return
+            result = call(payload)
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def run_open_loop(call, payloads, rate, max_in_flight, duration_s=None):
+    """
+    Send at a fixed rate regardless of response times. A request that
+    waits for a free slot (max_in_flight reached) is timed from when it
+    should have been sent.
+    """
+    results = []
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(max_in_flight)
+    start = time.perf_counter()
+
+    def timed(payload, scheduled):
+        try:
+            result = call(payload)
+            result["latency_ms"] = (time.perf_counter() - scheduled) * 1000
+            with lock:
+                results.append(result)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for k, payload in enumerate(payloads):
+            scheduled = start + k / rate
+            if duration_s and scheduled - start >= duration_s:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            slots.acquire()
+            pool.submit(timed, payload, scheduled)
+    return results
+
+
+# ------------------------------------------------------------------
+# REPORT
+# ------------------------------------------------------------------
+
+def summarize(results, elapsed_s):
+    n = len(results)
+    latencies = np.array([r["latency_ms"] for r in results]) if n else np.zeros(0)
+    errors = [r for r in results if r.get("error") or r["status"] is None or r["status"] >= 500]
+    with_fallback = [r for r in results if r.get("fallbacks")]
+
+    stage_ms = {}
+    for r in results:
+        for name, ms in r.get("stages", {}).items():
+            stage_ms.setdefault(name, []).append(ms)
+
+    fallback_factors = Counter(
+        f"{factor}:{reason}" for r in with_fallback for factor, reason in r["fallbacks"].items()
+    )
+
+    return {
+        "requests": n,
+        "elapsed_s": round(elapsed_s, 3),
+        "throughput_rps": round(n / elapsed_s, 2) if elapsed_s else None,
+        "latency_ms": {
+            **{f"p{p}": round(float(np.percentile(latencies, p)), 2) if n else None for p in PERCENTILES},
+            "mean": round(float(latencies.mean()), 2) if n else None,
+            "max": round(float(latencies.max()), 2) if n else None
+        },
+        "error_rate": round(len(errors) / n, 4) if n else None,
+        "statuses": dict(Counter(str(r["status"] or r.get("error")) for r in results)),
+        "outcomes": dict(Counter(r["outcome"] for r in results if r.get("outcome"))),
+        "fallback_rate": round(len(with_fallback) / n, 4) if n else None,
+        "fallbacks": dict(fallback_factors),
+        "stage_mean_ms": {name: round(sum(v) / len(v), 2) for name, v in sorted(stage_ms.items())}
+    }
+
+
+def print_report(report):
+    latency = report["latency_ms"]
+    print(f"\n{report['requests']} requests in {report['elapsed_s']}s "
+          f"({report['throughput_rps']} req/s)")
+    print("latency ms: " + "  ".join(f"{k}={v}" for k, v in latency.items()))
+    print(f"errors: {report['error_rate']}  statuses: {report['statuses']}")
+    print(f"outcomes: {report['outcomes']}")
+    print(f"fallback rate: {report['fallback_rate']}  {report['fallbacks']}")
+    if report["stage_mean_ms"]:
+        print("stage means ms: " + "  ".join(f"{k}={v}" for k, v in report["stage_mean_ms"].items()))
+
+    server = report.get("server")
+    if server:
+        for source, stats in server["factor_cache"].items():
+            print(f"factor cache [{source}]: hit rate {stats['hit_rate']}")
+        for cache, stats in server["tile_cache"].items():
+            print(f"tile cache [{cache}]: hit rate {stats['hit_rate']}")
+        if server["fallbacks"]:
+            print(f"server fallbacks: {server['fallbacks']}")
+        if server["upstream_requests"]:
+            print(f"upstream requests: {server['upstream_requests']}")
+
+
+def run(url, payloads, endpoint="/analyze", concurrency=8, rate=None,
+        duration_s=None, timeout_s=30.0, scrape=True):
+    """
+    Drive one load test and return its report.
+    """
+    target = url.rstrip("/") + endpoint
+    session = make_session(concurrency)
+
+    before = scrape_metrics(session, url) if scrape else None
+
+    def call(payload):
+        return send(session, target, payload, timeout_s)
+
+    start = time.perf_counter()
+    if rate:
+        results = run_open_loop(call, payloads, rate, concurrency, duration_s)
+    else:
+        results = run_closed_loop(call, payloads, concurrency, duration_s)
+    elapsed = time.perf_counter() - start
+
+    report = summarize(results, elapsed)
+    report["config"] = {
+        "url": target,
+        "mode": "open" if rate else "closed",
+        "rate": rate,
+        "concurrency": concurrency,
+        "duration_s": duration_s
+    }
+
+    after = scrape_metrics(session, url) if before is not None else None
+    if after is not None:
+        report["server"] = server_summary(metric_delta(before, after))
+
+    session.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running /analyze service")
+    parser.add_argument("--url", default="http://localhost:5000", help="Base URL of the service")
+    parser.add_argument("--endpoint", default="/analyze", choices=["/analyze", "/analyze/async"])
+
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--replay", help="JSONL file of {lat, lon, land_use} payloads")
+    source.add_argument("--synthetic", type=int, metavar="N",
+                        help="Generate N points around India's agricultural regions")
+    parser.add_argument("--repeat-fraction", type=float, default=0.3,
+                        help="Share of synthetic requests re-sending an earlier point")
+    parser.add_argument("--seed", type=int, default=0)
+
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Clients (closed loop) or max in-flight requests (with --rate)")
+    parser.add_argument("--rate", type=float, help="Requests/s, open loop")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout (s)")
+    parser.add_argument("--no-metrics", action="store_true", help="Do not scrape /metrics")
+    parser.add_argument("--out", help="Write the report as JSON")
+
+    args = parser.parse_args()
+
+    if args.replay:
+        payloads = load_replay(args.replay)
+    else:
+        payloads = synthetic_payloads(
+            args.synthetic, rule_land_uses(), seed=args.seed, repeat_fraction=args.repeat_fraction
+        )
+    if not payloads:
+        print("No payloads to send")
+        sys.exit(1)
+
+    mode = f"{args.rate} req/s" if args.rate else f"{args.concurrency} clients"
+    print(f"Load testing {args.url}{args.endpoint} with {len(payloads)} payloads, {mode}")
+
+    report = run(
+        args.url,
+        payload_stream(payloads, args.requests, cycle=bool(args.duration)),
+        endpoint=args.endpoint,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        duration_s=args.duration,
+        timeout_s=args.timeout,
+        scrape=not args.no_metrics
+    )
+
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()